@@ -66,8 +66,8 @@ class Application(Cmd):
         self._client.stop()
 
     def do_play1(self, arg):
-        """Play singleplayer"""
-        game = Game(app_config)
+        """Play singleplayer against a bot, W/S moves your paddle"""
+        game = Game(app_config, bot=1)
         game.main_loop()
 
     def do_exit(self, arg):
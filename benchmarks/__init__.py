@@ -0,0 +1 @@
+"""Benchmarks. Run one with `python -m benchmarks.<name>` from the project root."""
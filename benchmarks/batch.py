@@ -0,0 +1,58 @@
+"""Batched simulation benchmark: checks `BatchEngine` against scalar `Engine`s with
+overlap collision (`swept=False`), then reports match-steps per second. Requires numpy."""
+from random import Random
+from time import perf_counter
+
+import numpy as np
+
+from packs.sim import Engine
+from packs.sim.batch import BatchEngine
+
+COUNTS = (1000, 10000, 100000)
+STEPS = 200
+PARITY_MATCHES = 64
+PARITY_STEPS = 5000
+
+
+def parity(matches: int = PARITY_MATCHES, steps: int = PARITY_STEPS, seed: int = 0):
+    """Step both engines with the same random inputs. Return the first
+    (step, match) that differs, None if none does."""
+    rng = Random(seed)
+    batch = BatchEngine(matches)
+    engines = [Engine(swept=False) for _ in range(matches)]
+    inputs = np.zeros((matches, 2), dtype=np.int32)
+    for step in range(steps):
+        if step % 15 == 0:
+            inputs = np.array([[rng.choice((-1, 0, 1)) for _ in range(2)]
+                               for _ in range(matches)], dtype=np.int32)
+        batch.step(inputs)
+        for match, engine in enumerate(engines):
+            engine.step(tuple(int(value) for value in inputs[match]))
+            if engine.snapshot() != batch.row(match):
+                return step, match
+    return None
+
+
+def run(matches: int):
+    """Step matches matches STEPS times. Return match-steps per second."""
+    batch = BatchEngine(matches)
+    rng = np.random.default_rng(0)
+    inputs = rng.integers(-1, 2, size=(matches, 2), dtype=np.int32)
+    started = perf_counter()
+    for _ in range(STEPS):
+        batch.step(inputs)
+    return matches * STEPS / (perf_counter() - started)
+
+
+def main():
+    """Check parity, print a table"""
+    mismatch = parity()
+    print(f"parity over {PARITY_MATCHES} matches x {PARITY_STEPS} steps:",
+          "ok" if mismatch is None else f"differs at step {mismatch[0]}, match {mismatch[1]}")
+    print(f"{'matches':>8} {'match-steps/s':>14}")
+    for matches in COUNTS:
+        print(f"{matches:>8} {run(matches):>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Bot benchmark: cost of bot decisions with many bot-vs-bot matches in one process."""
+from time import perf_counter
+
+from packs.sim import Engine
+from packs.sim.bot import HARD, NORMAL, Bot
+
+COUNTS = (100, 500, 1000)
+STEPS = 600
+
+
+def run(matches: int):
+    """Play matches bot-vs-bot matches for STEPS ticks. Return (decisions per second,
+    engine steps per second with bots, predictions per decision)."""
+    games = []
+    for index in range(matches):
+        engine = Engine()
+        games.append((engine, Bot(engine.state, 0, *HARD, seed=index),
+                      Bot(engine.state, 1, *NORMAL, seed=-index)))
+    started = perf_counter()
+    for _ in range(STEPS):
+        for engine, left, right in games:
+            engine.step((left.decide(), right.decide()))
+    elapsed = perf_counter() - started
+    predictions = sum(left.predictions + right.predictions for _, left, right in games)
+    decisions = matches * STEPS * 2
+    return decisions / elapsed, matches * STEPS / elapsed, predictions / decisions
+
+
+def main():
+    """Print a table"""
+    print(f"{STEPS} ticks per match")
+    print(f"{'matches':>8} {'decisions/s':>12} {'steps/s':>10} {'predict/decide':>15}")
+    for matches in COUNTS:
+        decisions, steps, ratio = run(matches)
+        print(f"{matches:>8} {decisions:>12.0f} {steps:>10.0f} {ratio:>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
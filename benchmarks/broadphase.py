@@ -0,0 +1,50 @@
+"""Broad phase benchmark: step time of a party match with half balls, half obstacles,
+every ball against every collider versus the uniform grid. The court grows with the
+entity count so density stays that of 100 entities on the default court."""
+from math import sqrt
+from random import Random
+from time import perf_counter
+
+from packs.sim import Court, Engine, SpatialGrid
+
+COUNTS = (10, 100, 1000)
+STEPS = 20
+OBSTACLE = 16
+
+
+def build(entities: int, grid: bool, seed: int = 0):
+    """Engine with entities balls and obstacles, half each, scattered over the court"""
+    rng = Random(seed)
+    scale = sqrt(max(entities, 100) / 100)
+    base = Court()
+    court = base._replace(width=round(base.width * scale), height=round(base.height * scale))
+    engine = Engine(court, grid=SpatialGrid() if grid else None)
+    for _ in range(entities // 2):
+        engine.add_obstacle(rng.randrange(100, court.width - 100 - OBSTACLE),
+                            rng.randrange(0, court.height - OBSTACLE), OBSTACLE, OBSTACLE)
+    for _ in range(entities // 2 - 1):
+        engine.add_ball(rng.randrange(100, court.width - 100), rng.randrange(0, court.height),
+                        rng.choice((-1, 1)), rng.choice((-1, 1)))
+    return engine
+
+
+def run(entities: int, grid: bool):
+    """Step time in milliseconds"""
+    engine = build(entities, grid)
+    started = perf_counter()
+    for _ in range(STEPS):
+        engine.step()
+    return (perf_counter() - started) / STEPS * 1e3
+
+
+def main():
+    """Print a table"""
+    print(f"{STEPS} steps per run, balls and {OBSTACLE}px obstacles half each")
+    print(f"{'entities':>8} {'all pairs ms':>13} {'grid ms':>9} {'grid us/entity':>15}")
+    for entities in COUNTS:
+        pairs, grid = run(entities, False), run(entities, True)
+        print(f"{entities:>8} {pairs:>13.3f} {grid:>9.3f} {grid / entities * 1e3:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+"""Dirty rectangles versus full redraws: frames per second of `packs.gui.Application`
+on the SDL dummy video driver, frame rate uncapped, one simulation step per frame so
+paddles and ball move on every frame. See `benchmarks.render` for the full per-frame
+distribution."""
+from .render import FRAMES, RESOLUTIONS, run
+
+
+def main():
+    """Print a table"""
+    print(f"{FRAMES} frames per run")
+    print(f"{'resolution':>12} {'full fps':>10} {'dirty fps':>10}")
+    for resolution in RESOLUTIONS:
+        full, dirty = run(resolution, False)[0], run(resolution, True)[0]
+        print(f"{'x'.join(map(str, resolution)):>12} {full:>10.0f} {dirty:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
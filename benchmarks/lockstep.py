@@ -0,0 +1,113 @@
+"""Lockstep benchmark: bytes per tick sent by a lockstep peer versus a server streaming
+the state, stalls at growing round trip times, and how soon an injected desync is
+caught. Two bot peers play through an in-process relay on a virtual clock, messages
+go through the binary codec and framing as on the wire."""
+from heapq import heappop, heappush
+from itertools import count
+
+from packs.connection import Message, frame, make_message
+from packs.lockstep import HASH_EVERY, INPUT_DELAY, Lockstep
+from packs.sim import Engine
+from packs.sim.bot import Bot
+
+RTTS = (0, 50, 100, 200)
+TICKRATE = 60
+SECONDS = 60
+SEED = 2024
+
+
+class Relay:
+    """Relay-only room: whatever a peer pushes reaches both peers half the round trip later"""
+
+    def __init__(self, rtt: float, clock) -> None:
+        self.latency = rtt / 2
+        self._clock = clock
+        self._order = count()
+        self._queue: list = []
+        self.inboxes: list[list] = []
+        self.sent = 0
+
+    def endpoint(self):
+        """Link of a new peer"""
+        inbox: list = []
+        self.inboxes.append(inbox)
+        return _Endpoint(self, inbox)
+
+    def push(self, data):
+        """Frame data like a client would and queue it"""
+        payload = frame(make_message(data, {}, "binary"))
+        self.sent += len(payload)
+        heappush(self._queue, (self._clock() + self.latency, next(self._order), payload[4:]))
+
+    def deliver(self):
+        """Hand what has arrived to every peer"""
+        while self._queue and self._queue[0][0] <= self._clock():
+            body = Message(heappop(self._queue)[2]).body()
+            for inbox in self.inboxes:
+                inbox.append(body)
+
+
+class _Endpoint:
+    def __init__(self, relay: Relay, inbox: list) -> None:
+        self._relay = relay
+        self._inbox = inbox
+
+    def push(self, data, headers=None):  # pylint: disable=unused-argument
+        """Send through the relay"""
+        self._relay.push(data)
+
+    def messages(self):
+        """Bodies arrived so far"""
+        bodies = self._inbox[:]
+        self._inbox.clear()
+        return bodies
+
+
+def run(rtt: float, corrupt_at: int | None = None):
+    """Play SECONDS of bot against bot. Return (bytes per tick per peer, stalled
+    share of frames, desync tick, score)."""
+    now = [0.]
+    relay = Relay(rtt, lambda: now[0])
+    peers = [Lockstep(relay.endpoint(), player, SEED) for player in (1, 2)]
+    bots = [Bot(peer.engine.state, peer.player - 1, seed=peer.player) for peer in peers]
+    interval = 1 / TICKRATE
+    due = [0., interval / 2]
+    frames = 0
+    while now[0] < SECONDS:
+        relay.deliver()
+        for index, peer in enumerate(peers):
+            if now[0] >= due[index]:
+                frames += 1
+                peer.advance(bots[index].decide())
+                due[index] += interval
+                if index == 1 and peer.tick == corrupt_at:
+                    peer.engine.state.ball.y += 1
+        now[0] += interval / 8
+    ticks = min(peer.tick for peer in peers)
+    stalls = sum(peer.stalls for peer in peers)
+    score = ":".join(str(paddle.score) for paddle in peers[0].engine.state.paddles)
+    return relay.sent / 2 / ticks, stalls / frames, peers[1].desync, score
+
+
+def streamed():
+    """Bytes per tick per client of a server sending the state every tick"""
+    return len(frame(make_message(Engine().snapshot(), {}, "binary")))
+
+
+def main():
+    """Print a table"""
+    print(f"{TICKRATE} Hz, input delay {INPUT_DELAY} ticks, digest every {HASH_EVERY} ticks, "
+          f"{SECONDS} s per run")
+    print(f"state streaming: {streamed()} bytes per tick per client")
+    print(f"{'rtt ms':>7} {'bytes/tick':>11} {'stalled':>8} {'in sync':>8} {'score':>6}")
+    for rtt in RTTS:
+        sent, stalled, desync, score = run(rtt / 1e3)
+        print(f"{rtt:>7} {sent:>11.2f} {stalled:>8.1%} {'yes' if desync is None else 'NO':>8} "
+              f"{score:>6}")
+    corrupt_at = TICKRATE * 10 + 7
+    _, _, desync, _ = run(0.05, corrupt_at)
+    print(f"\nball moved 1px on one peer at tick {corrupt_at}, desync caught at tick {desync}")
+
+
+if __name__ == "__main__":
+    main()
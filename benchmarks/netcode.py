@@ -0,0 +1,131 @@
+"""Netcode benchmark: perceived input latency of the local paddle, drawn from the last
+server state versus predicted, and age of the interpolated ball, over a simulated link
+with growing round trip time. Runs on a virtual clock, one match stepped in process."""
+from heapq import heappop, heappush
+from itertools import count
+from random import Random
+
+from packs.netcode import NetPlay
+from packs.rooms import TICKRATE, Match
+from packs.sim import DOWN, NONE, UP, Engine
+
+RTTS = (0, 50, 100, 200)
+JITTER = 0.01
+SECONDS = 30
+FPS = 60
+RESOLUTION = 0.001
+# Local player holds each movement this long
+PATTERN = ((DOWN, .5), (NONE, .5), (UP, .5), (NONE, .5))
+
+
+class LaggyLink:
+    """In process link to a match, each way delayed by half the round trip plus up to
+    JITTER. Delivery stays in order, like TCP."""
+
+    def __init__(self, match: Match, rtt: float, clock, seed: int = 0) -> None:
+        self.match = match
+        self.latency = rtt / 2
+        self._clock = clock
+        self._random = Random(seed)
+        self._order = count()
+        self._up: list = []
+        self._down: list = []
+        self._last = {"up": 0., "down": 0.}
+
+    def _due(self, way: str):
+        due = max(self._clock() + self.latency + self._random.uniform(0, JITTER),
+                  self._last[way])
+        self._last[way] = due
+        return due
+
+    def push(self, data, headers=None):  # pylint: disable=unused-argument
+        """Client to server"""
+        heappush(self._up, (self._due("up"), next(self._order), data))
+
+    def messages(self):
+        """Server to client, what has arrived"""
+        now, bodies = self._clock(), []
+        while self._down and self._down[0][0] <= now:
+            bodies.append(heappop(self._down)[2])
+        return bodies
+
+    def deliver(self):
+        """Hand the inputs that have arrived to the match"""
+        now = self._clock()
+        while self._up and self._up[0][0] <= now:
+            body = heappop(self._up)[2]
+            self.match.push_input(body["player"], body["movement"], now, body["seq"])
+
+    def publish(self, match: Match):
+        """on_tick of the match"""
+        heappush(self._down, (self._due("down"), next(self._order), match.snapshot()))
+
+
+def run(rtt: float):
+    """Play SECONDS against a still opponent. Return (ms until a press shows without
+    prediction, with prediction, age of the ball state drawn in ms, corrections)."""
+    now = [0.]
+    clock = lambda: now[0]  # pylint: disable=unnecessary-lambda-assignment
+    match = Match("bench", TICKRATE, engine=Engine.at(TICKRATE))
+    link = LaggyLink(match, rtt, clock)
+    match.on_tick = link.publish
+    play = NetPlay(link, 1, match.engine.court, TICKRATE, clock=clock)
+    interval = 1 / TICKRATE
+    next_server, next_client, next_frame = interval / 2, 0., 0.
+    pattern, phase_end, held = 0, PATTERN[0][1], NONE
+    # Press being timed: [time, predicted y, server y, predicted shown, server shown]
+    press: list | None = None
+    naive, predicted, ages, corrections = [], [], [], 0
+    while now[0] < SECONDS:
+        if now[0] >= phase_end:
+            pattern = (pattern + 1) % len(PATTERN)
+            phase_end += PATTERN[pattern][1]
+        link.deliver()
+        if now[0] >= next_server:
+            match.step()
+            next_server += interval
+        if now[0] >= next_client:
+            movement = PATTERN[pattern][0]
+            latest = play.snapshots.latest
+            if movement != NONE and held == NONE and latest is not None:
+                press = [now[0], play.prediction.y, latest["player1"], None, None]
+            held = movement
+            play.tick(movement)
+            next_client += interval
+        if now[0] >= next_frame:
+            play.poll()
+            corrections += play.prediction.error != 0
+            view = play.view()
+            if view is not None:
+                # Server steps tick k at (k - 1/2) intervals, the older state drawn
+                ages.append(now[0] - (view["tick"] - .5) * interval)
+            if press is not None and view is not None:
+                if press[3] is None and view["player1"] != press[1]:
+                    press[3] = now[0] - press[0]
+                if press[4] is None and play.snapshots.latest["player1"] != press[2]:
+                    press[4] = now[0] - press[0]
+                if press[3] is not None and press[4] is not None:
+                    predicted.append(press[3])
+                    naive.append(press[4])
+                    press = None
+            next_frame += 1 / FPS
+        now[0] += RESOLUTION
+
+    def mean(values):
+        return sum(values) / len(values) * 1e3 if values else float("nan")
+    return mean(naive), mean(predicted), mean(ages), corrections
+
+
+def main():
+    """Print a table"""
+    print(f"{TICKRATE} Hz match, {FPS} fps client, {JITTER * 1e3:.0f} ms jitter, "
+          f"{SECONDS} s per run")
+    print(f"{'rtt ms':>7} {'server echo ms':>15} {'predicted ms':>13} {'ball age ms':>12} "
+          f"{'corrections':>12}")
+    for rtt in RTTS:
+        naive, predicted, age, corrections = run(rtt / 1e3)
+        print(f"{rtt:>7} {naive:>15.1f} {predicted:>13.1f} {age:>12.1f} {corrections:>12}")
+
+
+if __name__ == "__main__":
+    main()
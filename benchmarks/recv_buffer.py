@@ -0,0 +1,68 @@
+"""Receive path benchmark: bytes copied per message, `bytes +=` drain versus
+the preallocated `recv_into` frame decoder."""
+from socket import socketpair
+from threading import Thread
+from time import perf_counter
+
+from packs.connection import RECV_SIZE, FrameDecoder, frame
+
+SIZES = (64, 2048, 16384)
+MESSAGES = 200
+
+
+def _sender(sock, payloads: list[bytes]):
+    for payload in payloads:
+        sock.sendall(frame(payload))
+    sock.close()
+
+
+def drain_concat(sock) -> tuple[int, int]:
+    """Old path: grow immutable bytes with `+=` until the peer closes.
+    Return (bytes received, bytes copied)."""
+    data = b""
+    copied = 0
+    while True:
+        chunk = sock.recv(1024)
+        if not chunk:
+            break
+        copied += len(data) + len(chunk)
+        data += chunk
+    return len(data), copied
+
+
+def drain_decoder(sock) -> tuple[int, int]:
+    """New path: `recv_into` a preallocated buffer, frames parsed through memoryview.
+    Return (frames received, bytes copied)."""
+    decoder = FrameDecoder()
+    frames = 0
+    while decoder.recv_into(sock):
+        frames += len(decoder.frames())
+    return frames, decoder.copied
+
+
+def run(size: int, reader):
+    """Run one reader against MESSAGES payloads of `size` bytes."""
+    left, right = socketpair()
+    payloads = [b"x" * size] * MESSAGES
+    thread = Thread(target=_sender, args=(left, payloads))
+    started = perf_counter()
+    thread.start()
+    _, copied = reader(right)
+    elapsed = perf_counter() - started
+    thread.join()
+    right.close()
+    return copied / MESSAGES, elapsed / MESSAGES * 1e6
+
+
+def main():
+    """Print a comparison table"""
+    print(f"{MESSAGES} messages per run, recv size {RECV_SIZE}")
+    print(f"{'size':>8} {'reader':>8} {'copied/msg':>14} {'us/msg':>10}")
+    for size in SIZES:
+        for name, reader in (("concat", drain_concat), ("decoder", drain_decoder)):
+            copied, micros = run(size, reader)
+            print(f"{size:>8} {name:>8} {copied:>14.0f} {micros:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Headless render benchmark: runs `packs.gui.Application` on the SDL dummy video driver,
+replaying scripted key presses for a fixed number of frames at several resolutions.
+Frames are uncapped, the simulation runs exactly one step per frame so paddles and ball
+move on every one. Reports frames per second and the per-frame time distribution.
+
+    python -m benchmarks.render [frames]"""
+# pylint: disable=wrong-import-position,protected-access
+from os import environ
+from pathlib import Path
+from statistics import quantiles
+from sys import argv
+from time import perf_counter
+
+from packs.envtoml import load_from_file
+
+load_from_file(str(Path(__file__).with_name("render.toml")))
+
+import pygame
+
+from packs._gui import BaseApp
+from packs._gui.config import AppConfig
+from packs.game_locals import K_DOWN, K_UP, K_s, K_w
+from packs.gui import Application
+
+RESOLUTIONS = ((900, 600), (1280, 720), (1920, 1080))
+FRAMES = 600
+# (frame, key, pressed), repeated every SCRIPT_LENGTH frames.
+SCRIPT = ((0, K_w, True), (0, K_DOWN, True), (40, K_w, False), (50, K_s, True),
+          (70, K_DOWN, False), (80, K_UP, True), (110, K_s, False), (120, K_UP, False))
+SCRIPT_LENGTH = 150
+
+
+class Scripted(Application):
+    """Application that replays SCRIPT and quits after `frames` frames, one simulation
+    step each"""
+
+    def __init__(self, config: AppConfig, frames: int = FRAMES) -> None:
+        super().__init__(config)
+        self.frames = frames
+        self.times: list[float] = []
+        self.steps = 0
+        self._started = 0.
+        self._calls = 0
+
+    def clock(self):
+        # A step of time between two frames, starting half a step in so rounding never
+        # runs none or two.
+        self._calls += 1
+        if self._calls == 1:
+            return 0.
+        return (self._calls - 0.5) / self._config.TICKRATE
+
+    def on_step(self):
+        super().on_step()
+        self.steps += 1
+
+    def _post(self, frame: int):
+        frame %= SCRIPT_LENGTH
+        for at, key, pressed in SCRIPT:
+            if at == frame:
+                pygame.event.post(pygame.event.Event(
+                    pygame.KEYDOWN if pressed else pygame.KEYUP, key=key))
+
+    def init(self):
+        super().init()
+        self._post(0)
+        self._started = perf_counter()
+
+    def wait(self):
+        super().wait()
+        now = perf_counter()
+        self.times.append(now - self._started)
+        self._started = now
+        if len(self.times) == self.frames:
+            self._running = False
+            return
+        self._post(len(self.times))
+
+
+def run(resolution: tuple[int, int], dirty: bool = True, frames: int = FRAMES):
+    """Run frames frames. Return (frames per second, p50 ms, p99 ms, max ms)."""
+    app = Scripted(AppConfig(resolution, False, 0, 60, dirty), frames)
+    app.init()
+    app.main_loop()
+    BaseApp._exit()
+    times = app.times
+    if app.steps != len(times):
+        raise RuntimeError(f"Simulated {app.steps} steps over {len(times)} frames")
+    cuts = quantiles(times, n=100)
+    return len(times) / sum(times), cuts[49] * 1e3, cuts[98] * 1e3, max(times) * 1e3
+
+
+def main():
+    """Print a table"""
+    frames = int(argv[1]) if len(argv) > 1 else FRAMES
+    print(f"{frames} frames per run, video driver {environ['SDL_VIDEODRIVER']}")
+    print(f"{'resolution':>12} {'mode':>6} {'fps':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for resolution in RESOLUTIONS:
+        for mode, dirty in (("full", False), ("dirty", True)):
+            fps, p50, p99, worst = run(resolution, dirty, frames)
+            print(f"{'x'.join(map(str, resolution)):>12} {mode:>6} {fps:>8.0f} "
+                  f"{p50:>8.2f} {p99:>8.2f} {worst:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
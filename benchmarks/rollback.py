@@ -0,0 +1,99 @@
+"""Rollback benchmark: cost of a snapshot save and restore, then two bot peers over an
+in-process relay at growing round trip times: stalls, rollbacks, ticks simulated again
+and the slowest frame against the frame budget. Peers must end on the same state."""
+from time import perf_counter
+from tracemalloc import get_traced_memory, start, stop
+
+from benchmarks.lockstep import Relay
+from packs.rollback import MAX_PREDICTION, ROLLBACK_DELAY, Rollback
+from packs.sim import Engine, SnapshotRing
+from packs.sim.bot import Bot
+
+RTTS = (0, 50, 100, 200, 300)
+TICKRATE = 60
+SECONDS = 30
+SEED = 2024
+REPEAT = 20000
+
+
+def snapshots():
+    """Microseconds per save and per restore, bytes left allocated by REPEAT of both"""
+    engine = Engine.deterministic(SEED)
+    ring = SnapshotRing(engine.state)
+    started = perf_counter()
+    for _ in range(REPEAT):
+        ring.save()
+    saved = perf_counter() - started
+    started = perf_counter()
+    for _ in range(REPEAT):
+        ring.restore(0)
+    restored = perf_counter() - started
+    start()
+    for _ in range(REPEAT):
+        ring.save()
+        ring.restore(0)
+    allocated = get_traced_memory()[0]
+    stop()
+    return saved / REPEAT * 1e6, restored / REPEAT * 1e6, allocated
+
+
+def run(rtt: float):
+    """Play SECONDS of bot against bot, then let both settle. Return (stalled share of
+    frames, rollbacks per second, mean and max ticks simulated again by a rollback,
+    slowest frame ms, in sync)."""
+    now = [0.]
+    relay = Relay(rtt, lambda: now[0])
+    peers = [Rollback(relay.endpoint(), player, SEED) for player in (1, 2)]
+    bots = [Bot(peer.engine.state, peer.player - 1, seed=peer.player) for peer in peers]
+    interval = 1 / TICKRATE
+    due = [0., interval / 2]
+    frames, slowest, longest = 0, 0., 0
+    while now[0] < SECONDS:
+        relay.deliver()
+        for index, peer in enumerate(peers):
+            if now[0] >= due[index]:
+                frames += 1
+                resimulated = peer.resimulated
+                started = perf_counter()
+                peer.advance(bots[index].decide())
+                slowest = max(slowest, perf_counter() - started)
+                longest = max(longest, peer.resimulated - resimulated)
+                due[index] += interval
+        now[0] += interval / 8
+    # Settle: both peers play on to the same tick, then take every input in flight.
+    relay.latency = 0
+    now[0] += rtt
+    end = max(peer.tick for peer in peers) + MAX_PREDICTION
+    while any(peer.tick < end for peer in peers):
+        relay.deliver()
+        for peer in peers:
+            if peer.tick < end:
+                peer.advance(0)
+    relay.deliver()
+    for peer in peers:
+        peer.poll()
+    rollbacks = sum(peer.rollbacks for peer in peers)
+    resimulated = sum(peer.resimulated for peer in peers)
+    stalls = sum(peer.stalls for peer in peers)
+    in_sync = peers[0].engine.digest() == peers[1].engine.digest()
+    return (stalls / frames, rollbacks / SECONDS / 2, resimulated / max(rollbacks, 1),
+            longest, slowest * 1e3, in_sync)
+
+
+def main():
+    """Print both tables"""
+    save, restore, allocated = snapshots()
+    print(f"snapshot save {save:.2f} us, restore {restore:.2f} us, "
+          f"{allocated} bytes allocated over {REPEAT} of both")
+    print(f"\n{TICKRATE} Hz, delay {ROLLBACK_DELAY} tick, prediction up to {MAX_PREDICTION} "
+          f"ticks, {SECONDS} s per run, frame budget {1e3 / TICKRATE:.1f} ms")
+    print(f"{'rtt ms':>7} {'stalled':>8} {'rollbacks/s':>12} {'mean ticks':>11} "
+          f"{'max ticks':>10} {'worst frame ms':>15} {'in sync':>8}")
+    for rtt in RTTS:
+        stalled, rollbacks, mean, longest, worst, in_sync = run(rtt / 1e3)
+        print(f"{rtt:>7} {stalled:>8.1%} {rollbacks:>12.1f} {mean:>11.1f} {longest:>10} "
+              f"{worst:>15.3f} {'yes' if in_sync else 'NO':>8}")
+
+
+if __name__ == "__main__":
+    main()
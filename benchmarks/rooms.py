@@ -0,0 +1,49 @@
+"""Room scheduler benchmark: matches per core and tick jitter with many matches hosted
+in one process, every match simulated at 60 Hz with bots on both paddles. Jitter is
+measured against deadlines that a match too late resets, look at the tick rate achieved
+against the target and the ticks skipped to see whether the process keeps up."""
+from statistics import quantiles
+from time import monotonic, process_time, sleep
+
+from packs.rooms import RoomManager
+from packs.sim import Engine
+
+COUNTS = (100, 1000, 5000)
+TICKRATE = 60
+DURATION = 2.
+
+
+def run(matches: int):
+    """Host `matches` matches for DURATION seconds. Return (steps per second, share of
+    the target tick rate achieved, ticks skipped, matches per core, jitter p50 ms, jitter
+    p99 ms)."""
+    rooms = RoomManager(engine=Engine.at)
+    for index in range(matches):
+        match = rooms.open(str(index), TICKRATE)
+        match.add_bot(1)
+        match.add_bot(2)
+    started, cpu = monotonic(), process_time()
+    while monotonic() - started < DURATION:
+        sleep(rooms.timeout(1))
+        rooms.advance()
+    elapsed, cpu = monotonic() - started, process_time() - cpu
+    cuts = quantiles(rooms.jitter, n=100)
+    per_core = rooms.steps / max(cpu, 1e-9) / TICKRATE
+    steps = rooms.steps / elapsed
+    return (steps, steps / (matches * TICKRATE), rooms.skipped, per_core,
+            cuts[49] * 1e3, cuts[98] * 1e3)
+
+
+def main():
+    """Print a table"""
+    print(f"{TICKRATE} Hz per match, {DURATION:.0f}s per run")
+    print(f"{'matches':>8} {'target/s':>10} {'steps/s':>10} {'achieved':>9} {'skipped':>9} "
+          f"{'per core':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for matches in COUNTS:
+        steps, achieved, skipped, per_core, p50, p99 = run(matches)
+        print(f"{matches:>8} {matches * TICKRATE:>10} {steps:>10.0f} {achieved:>9.1%} "
+              f"{skipped:>9} {per_core:>10.0f} {p50:>8.2f} {p99:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Headless engine benchmark: engine steps per second with many matches in one process."""
+from time import perf_counter
+
+from packs.sim import DOWN, NONE, UP, Engine
+
+COUNTS = (100, 1000, 5000)
+STEPS = 200
+PATTERN = (UP, UP, NONE, DOWN, DOWN, NONE)
+
+
+def run(matches: int):
+    """Step `matches` engines STEPS times. Return engine steps per second."""
+    engines = [Engine() for _ in range(matches)]
+    started = perf_counter()
+    for tick in range(STEPS):
+        movement = PATTERN[tick % len(PATTERN)]
+        inputs = (movement, -movement)
+        for engine in engines:
+            engine.step(inputs)
+    return matches * STEPS / (perf_counter() - started)
+
+
+def main():
+    """Print a table"""
+    print(f"{STEPS} steps per match")
+    print(f"{'matches':>8} {'steps/s':>12} {'60 Hz matches':>14}")
+    for matches in COUNTS:
+        steps = run(matches)
+        print(f"{matches:>8} {steps:>12.0f} {steps / 60:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
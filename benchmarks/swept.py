@@ -0,0 +1,55 @@
+"""Swept collision benchmark: tunnelling of the per-frame overlap test versus swept
+collision at growing ball speeds, and CPU per simulated match-second at each tick rate."""
+from time import process_time
+
+from packs.sim import HIT, Court, Engine
+from packs.sim.bot import Bot
+
+SPEEDS = (7, 14, 21, 28, 35, 42)
+TICKRATES = (120, 60, 30, 20)
+SECONDS = 60
+
+
+def tunnels(speed: int, swept: bool):
+    """Fire the ball straight at the middle of the left paddle from every sub-step
+    offset. Return how many of the shots went through it."""
+    through = 0
+    for offset in range(speed):
+        engine = Engine(Court(ball_speed=speed), swept)
+        ball, paddle = engine.state.ball, engine.state.paddles[0]
+        paddle.y = engine.court.height // 2 - paddle.height // 2
+        ball.x, ball.y, ball.dx, ball.dy = 300 + offset, engine.court.height // 2, -1, 0
+        while True:
+            events = engine.step()
+            if any(event.kind == HIT for event in events):
+                break
+            if ball.x <= paddle.x or engine.state.paddles[1].score:
+                through += 1
+                break
+    return through, speed
+
+
+def cost(tickrate: int):
+    """CPU seconds to simulate SECONDS of a bot-vs-bot match at tickrate"""
+    engine = Engine.at(tickrate)
+    left, right = Bot(engine.state, 0, seed=1), Bot(engine.state, 1, seed=2)
+    started = process_time()
+    for _ in range(tickrate * SECONDS):
+        engine.step((left.decide(), right.decide()))
+    return process_time() - started
+
+
+def main():
+    """Print both tables"""
+    print(f"{'speed':>6} {'overlap tunnels':>16} {'swept tunnels':>14}")
+    for speed in SPEEDS:
+        overlap, shots = tunnels(speed, False)
+        swept, _ = tunnels(speed, True)
+        print(f"{speed:>6} {overlap:>10}/{shots:<5} {swept:>8}/{shots:<5}")
+    print(f"\n{'rate':>6} {'CPU ms per match-second':>24}")
+    for tickrate in TICKRATES:
+        print(f"{tickrate:>6} {cost(tickrate) / SECONDS * 1e3:>24.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 """Basic GUI package"""
 # pylint: disable=no-member,too-many-instance-attributes,unused-argument,no-name-in-module
+from time import perf_counter
+
 import pygame
 from pygame.locals import QUIT, KEYDOWN, KEYUP
 from pygame.event import Event
@@ -7,6 +9,13 @@ from pygame.time import Clock
 
 from .typings import Resolution
 from .config import AppConfig
+from .layers import Compositor
+from .profiler import FrameProfiler
+
+# Simulation steps run per frame at most, a slower frame drops the rest of its time.
+MAX_STEPS = 5
+# Fullscreen keeps the logical resolution, SDL scales it to the monitor when presenting.
+FULLSCREEN_FLAGS = pygame.FULLSCREEN | pygame.SCALED
 
 
 class BaseApp:
@@ -20,6 +29,12 @@ class BaseApp:
         self._is_fullscreen = False
         self._clock_ = None
         self._title = ""
+        self._alpha = 0.
+        self._dirty: list[pygame.Rect] = []
+        self._redraw = True
+        self._layers = Compositor(self.on_background)
+        self._profiler: FrameProfiler | None = None
+        self._overlay: pygame.Rect | None = None
 
     @property
     def title(self):
@@ -36,15 +51,21 @@ class BaseApp:
         if BaseApp._INIT:
             pygame.display.set_caption(self._title)
 
+    @property
+    def resolution(self) -> Resolution:
+        """Logical resolution. Everything is drawn at this size whatever the window or
+        monitor size is, fullscreen scales it up once when presenting."""
+        return self._config.resolution
+
     def toggle_fullscreen(self):
         """Toggle fullscreen. Requires initialisation."""
         if not BaseApp._INIT:
             raise RuntimeError("Pygame is not loaded.")
         if not self._is_fullscreen:
-            self._init_display((0, 0), pygame.FULLSCREEN)
+            self._init_display(self.resolution, FULLSCREEN_FLAGS)
             self._is_fullscreen = True
             return
-        self._init_display(self._config.resolution)
+        self._init_display(self.resolution)
         self._is_fullscreen = False
 
     def _init_display(self,
@@ -58,6 +79,11 @@ class BaseApp:
             pygame.display.init()
         self._surface = pygame.display.set_mode(
             resolution, flags, depth, display, vsync)
+        pygame.display.set_caption(self._title or "Application")
+        self._layers.build(self._surface)
+        self._overlay = None
+        self.on_display()
+        self.invalidate()
 
     def init(self):
         """Do initializing"""
@@ -69,9 +95,9 @@ class BaseApp:
         self._clock = Clock()
         self._is_fullscreen = self._config.full
         if not self._config.full:
-            self._init_display(self._config.resolution)
+            self._init_display(self.resolution)
         else:
-            self._init_display((0, 0), pygame.FULLSCREEN)
+            self._init_display(self.resolution, FULLSCREEN_FLAGS)
 
     @property
     def _surface(self):
@@ -125,30 +151,137 @@ class BaseApp:
         """Keyup events"""
         return NotImplemented
 
+    def on_background(self, surface: pygame.Surface):
+        """Draw static decoration on the background layer. Called only when the display
+        is (re)created, not every frame."""
+        return NotImplemented
+
+    def on_display(self):
+        """Display was (re)created, anything holding the old surface should drop it."""
+        return NotImplemented
+
+    def on_step(self):
+        """Simulation step, called TICKRATE times per second whatever the frame rate is."""
+        return NotImplemented
+
     def on_main(self):
-        """Main something. Anything besides events, and updates."""
+        """Main something. Anything besides events, and updates. Draw here, `alpha` tells
+        how far the frame is between the last two simulation steps."""
         return NotImplemented
 
+    @property
+    def alpha(self):
+        """Fraction of a simulation step elapsed since the last one, in [0, 1)"""
+        return self._alpha
+
+    @property
+    def dirty_rects(self):
+        """Can this frame be drawn over the last one? False when the whole screen has to be
+        redrawn: DIRTY is off in the config, or the display was just (re)created."""
+        return self._config.DIRTY and not self._redraw
+
+    def mark(self, rect: pygame.Rect | None):
+        """Mark an area changed this frame, only marked areas are pushed to the display"""
+        if rect is not None:
+            self._dirty.append(rect)
+
+    def invalidate(self):
+        """Redraw and push the whole screen next frame"""
+        self._redraw = True
+
+    def present(self):
+        """Push the changed parts of the screen (all of it without dirty rects)"""
+        if self.dirty_rects:
+            pygame.display.update(self._dirty)
+        else:
+            pygame.display.update()
+            self._redraw = False
+        self._dirty.clear()
+
+    def wait(self):
+        """Tick the clock at MAXFPS (defined in your gconf.toml)"""
+        self._clock.tick(self._config.MAXFPS)
+
     def on_update(self):
         """Update function. You can override or using super() method.
-        It just updates the screen and ticks it at MAXFPS (defined in your gconf.toml)"""
-        pygame.display.update()
-        self._clock.tick(self._config.MAXFPS)
+        It presents the screen and ticks it at MAXFPS. Not called when profiling, the
+        profiler times `present` and `wait` on their own."""
+        self.present()
+        self.wait()
+
+    @property
+    def profiler(self):
+        """Frame profiler, None unless PROFILE is on in the config"""
+        return self._profiler
+
+    def _draw_profile(self, profiler: FrameProfiler, font: pygame.font.Font):
+        surface = self._surface
+        if self._overlay is not None and self.dirty_rects:
+            self.mark(self._layers.restore(surface, self._overlay))
+        self._overlay = profiler.draw(surface, font)
+        self.mark(self._overlay)
+
+    def clock(self) -> float:
+        """Seconds the fixed step simulation follows, wall time by default"""
+        return perf_counter()
 
     def main_loop(self):
-        """Run the program"""
+        """Run the program. Every phase of a frame is timed when profiling (PROFILE in
+        your gconf.toml), see `profiler`."""
         if BaseApp._INIT is False:
             self.init()
+        if not self._config.PROFILE:
+            self._loop()
+            return
+        self._profiler = FrameProfiler(trace=self._config.PROFILE_TRACE)
+        try:
+            self._loop(self._profiler)
+        finally:
+            self._profiler.close()
+
+    def _loop(self, profiler: FrameProfiler | None = None):
+        font = pygame.font.Font(pygame.font.get_default_font(), 14) \
+            if profiler is not None else None
         exit_request = None
+        step = 1 / self._config.TICKRATE
+        lag = 0.
+        previous = self.clock()
         while self._running:
+            if profiler is not None:
+                profiler.begin()
             for event in pygame.event.get():
                 exit_request = self.on_event(event)
 
             if exit_request:
                 break
+            if profiler is not None:
+                profiler.mark("events")
+            now = self.clock()
+            lag = min(lag + now - previous, step * MAX_STEPS)
+            previous = now
+            steps = 0
+            while lag >= step:
+                self.on_step()
+                steps += 1
+                lag -= step
+            self._alpha = lag / step
+            if profiler is not None:
+                profiler.steps += steps
+                profiler.mark("sim")
             self.on_main()
 
-            self.on_update()
+            if profiler is None:
+                self.on_update()
+                continue
+            # Timed apart from on_update, the overlay is drawn before presenting.
+            profiler.mark("draw")
+            self._draw_profile(profiler, font)  # type: ignore
+            profiler.skip()
+            self.present()
+            profiler.mark("present")
+            self.wait()
+            profiler.mark("wait")
+            profiler.end()
 
     @staticmethod
     def _exit():
@@ -8,3 +8,7 @@ class AppConfig(NamedTuple):
     resolution: tuple[int, int]
     full: bool
     MAXFPS: int
+    TICKRATE: int = 60
+    DIRTY: bool = True
+    PROFILE: bool = False
+    PROFILE_TRACE: str = ""
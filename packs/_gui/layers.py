@@ -0,0 +1,49 @@
+"""Layered drawing. Static decoration is drawn once on a background layer, moving things
+are drawn over it and erased by copying the background back."""
+from typing import Callable
+
+import pygame
+
+from .typings import Color
+
+Painter = Callable[[pygame.Surface], object]
+
+
+class Compositor:
+    """Holds the background layer. `painter` draws the static decoration on it, it is
+    called only when the layer is rebuilt."""
+
+    def __init__(self, painter: Painter | None = None, color: Color = (0, 0, 0)) -> None:
+        self._painter = painter
+        self._color = color
+        self._background: pygame.Surface | None = None
+        self.builds = 0
+
+    @property
+    def background(self):
+        """Background layer"""
+        if self._background is None:
+            raise RuntimeError("Background is not built")
+        return self._background
+
+    def build(self, screen: pygame.Surface):
+        """Rebuild the background for screen, in its pixel format. Call on resize."""
+        background = pygame.Surface(screen.get_size()).convert(screen)
+        background.fill(self._color)
+        if self._painter is not None:
+            self._painter(background)
+        self._background = background
+        self.builds += 1
+        return background
+
+    def clear(self, screen: pygame.Surface):
+        """Cover the whole screen with the background"""
+        screen.blit(self.background, (0, 0))
+
+    def restore(self, screen: pygame.Surface, rect: pygame.Rect):
+        """Cover rect of the screen with the background. Return rect."""
+        screen.blit(self.background, rect, rect)
+        return rect
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} builds={self.builds}>"
@@ -0,0 +1,98 @@
+"""Frame profiler. Times each phase of a frame, keeps a rolling window for the in-game
+overlay and can write every frame to a CSV trace."""
+# pylint: disable=consider-using-with
+from collections import deque
+from csv import writer
+from statistics import quantiles
+from time import perf_counter
+
+import pygame
+
+PHASES = ("events", "sim", "draw", "present", "wait")
+WINDOW = 240
+# Overlay text is rendered again every this many frames.
+OVERLAY_EVERY = 30
+
+
+class FrameProfiler:
+    """Call `begin` at the start of a frame, `mark` after each phase, `end` at the end."""
+
+    def __init__(self, window: int = WINDOW, trace: str = "") -> None:
+        self._samples = {phase: deque(maxlen=window) for phase in PHASES}
+        self._frame: dict[str, float] = {}
+        self._last = 0.
+        self._frames = 0
+        self._trace_file = open(trace, "w", newline='', encoding='utf-8') if trace else None
+        self._trace = writer(self._trace_file) if self._trace_file else None
+        if self._trace is not None:
+            self._trace.writerow(("frame", *(f"{phase}_ms" for phase in PHASES), "steps"))
+        self._overlay: pygame.Surface | None = None
+        self.steps = 0
+
+    @property
+    def frames(self):
+        """Frames profiled"""
+        return self._frames
+
+    def begin(self):
+        """Start a frame"""
+        self._frame.clear()
+        self.steps = 0
+        self._last = perf_counter()
+
+    def mark(self, phase: str):
+        """End phase, the next one starts now"""
+        now = perf_counter()
+        self._frame[phase] = self._frame.get(phase, 0.) + now - self._last
+        self._last = now
+
+    def skip(self):
+        """Leave the time since the last mark out of every phase"""
+        self._last = perf_counter()
+
+    def end(self):
+        """End the frame"""
+        frame = self._frame
+        for phase in PHASES:
+            self._samples[phase].append(frame.get(phase, 0.))
+        if self._trace is not None:
+            self._trace.writerow((self._frames,
+                                  *(f"{frame.get(phase, 0.) * 1e3:.3f}" for phase in PHASES),
+                                  self.steps))
+        self._frames += 1
+
+    def percentiles(self, phase: str) -> tuple[float, float]:
+        """(p50, p99) of phase over the window, in milliseconds"""
+        samples = self._samples[phase]
+        if len(samples) < 2:
+            value = samples[0] * 1e3 if samples else 0.
+            return value, value
+        cuts = quantiles(samples, n=100)
+        return cuts[49] * 1e3, cuts[98] * 1e3
+
+    def lines(self):
+        """Overlay text, one line per phase"""
+        return [f"{phase:>8} p50 {p50:6.2f} p99 {p99:6.2f} ms"
+                for phase, (p50, p99) in ((phase, self.percentiles(phase)) for phase in PHASES)]
+
+    def draw(self, surface: pygame.Surface, font: pygame.font.Font, pos=(8, 40)):
+        """Draw the overlay. Return its bounds."""
+        if self._overlay is None or self._frames % OVERLAY_EVERY == 0:
+            rendered = [font.render(line, False, (255, 255, 0)) for line in self.lines()]
+            height = font.get_linesize()
+            overlay = pygame.Surface((max(text.get_width() for text in rendered),
+                                      height * len(rendered)))
+            for index, text in enumerate(rendered):
+                overlay.blit(text, (0, index * height))
+            self._overlay = overlay
+        return surface.blit(self._overlay, pos)
+
+    def close(self):
+        """Flush and close the trace"""
+        if self._trace_file is not None:
+            self._trace_file.close()
+            self._trace_file = None
+            self._trace = None
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} frames={self._frames}>"
@@ -0,0 +1,53 @@
+"""Rendered text cache. Font rasterisation is slow and HUD text rarely changes."""
+from collections import OrderedDict
+
+import pygame
+
+from .typings import Color
+
+TEXT_CACHE_SIZE = 64
+
+
+class TextCache:
+    """LRU cache of rendered text surfaces keyed by (font, text, color, antialias)"""
+
+    def __init__(self, size: int = TEXT_CACHE_SIZE) -> None:
+        self._surfaces: OrderedDict[tuple, pygame.Surface] = OrderedDict()
+        self._size = size
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._surfaces)
+
+    @property
+    def hit_rate(self):
+        """Share of lookups served from the cache"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.
+
+    def render(self, font: pygame.font.Font, text: str, color: Color, antialias: bool = True):
+        """Return `font.render(text, antialias, color)`, rendered once while cached"""
+        key = (font, text, tuple(color), antialias)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self._size:
+            self._surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        """Drop every cached surface, counters are kept"""
+        self._surfaces.clear()
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {len(self)}/{self._size} hits={self.hits} \
+misses={self.misses}>"
+
+
+TEXT = TextCache()
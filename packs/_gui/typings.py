@@ -11,7 +11,7 @@ Color = tuple[int, int, int] | pygame.Color
 
 
 class CommonConstants(NamedTuple):
-    """Common constants"""
+    """Common constants. WIDTH and HEIGHT are the logical resolution, not the screen's."""
     WIDTH: int
     HEIGHT: int
     FONT: pygame.font.Font
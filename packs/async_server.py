@@ -0,0 +1,262 @@
+"""Asyncio server backend. Same public surface as `Server`, rooms included: simulated
+matches tick on its event loop, timers can share it with networking."""
+# pylint: disable=too-many-instance-attributes
+import asyncio
+from asyncio import AbstractEventLoop, BufferedProtocol, Transport
+from time import monotonic
+from typing import Callable
+
+from .backpressure import Backpressure
+from .connection import IOMessage, Message, frame
+from .errors import FrameError
+from .rooms import RoomManager
+from .server import BaseServer, Logger
+from .typings import ServerAddr
+from .utils import map_addr
+
+HEARTBEAT = 1
+
+
+class Repeating:
+    """Callback called every `interval` seconds on the server loop, without drift."""
+
+    def __init__(self, interval: float, callback: Callable[[], object]) -> None:
+        self.interval = interval
+        self.callback = callback
+        self._handle: asyncio.TimerHandle | None = None
+        self._deadline = 0.
+        self._cancelled = False
+
+    def start(self, loop: AbstractEventLoop):
+        """Schedule on loop"""
+        if self._cancelled:
+            return
+        self._deadline = loop.time() + self.interval
+        self._handle = loop.call_at(self._deadline, self._run, loop)
+
+    def _run(self, loop: AbstractEventLoop):
+        try:
+            self.callback()
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            Logger.error("Timer callback %s failed: %s", self.callback, exc)
+        if self._cancelled:
+            return
+        self._deadline = max(self._deadline + self.interval, loop.time())
+        self._handle = loop.call_at(self._deadline, self._run, loop)
+
+    def cancel(self):
+        """Stop calling back"""
+        self._cancelled = True
+        if self._handle is not None:
+            self._handle.cancel()
+
+
+class _Connection(BufferedProtocol):
+    """Client connection. Received data goes straight into the holder frame decoder,
+    data to send goes to the transport unless it has paused writing, then it waits in
+    the holder queue under the backpressure policy."""
+
+    def __init__(self, server: "AsyncServer") -> None:
+        self._server = server
+        self.transport: Transport | None = None
+        self.holder = IOMessage(("", 0))
+        self.paused = False
+
+    def connection_made(self, transport: Transport):  # type: ignore
+        self.transport = transport
+        self.holder = IOMessage(transport.get_extra_info("peername"), self._server.policy.budget)
+        transport.set_write_buffer_limits(self._server.policy.budget)
+        self._server.connected(self)
+
+    def get_buffer(self, sizehint: int):
+        return self.holder.decoder.writable(sizehint)
+
+    def buffer_updated(self, nbytes: int):
+        decoder = self.holder.decoder
+        decoder.commit(nbytes)
+        try:
+            frames = decoder.frames()
+        except FrameError:
+            self.abort()
+            return
+        for payload in frames:
+            if self.holder.closing:
+                return
+            self._server.do_read(self, Message(payload))
+
+    def eof_received(self):
+        return None
+
+    def connection_lost(self, exc: Exception | None):
+        self._server.disconnected(self)
+
+    def pause_writing(self):
+        self.paused = True
+
+    def resume_writing(self):
+        self.paused = False
+        self.flush()
+        self._server.policy.relieve(self.holder)
+
+    def send(self, data: bytes, force: bool = False, key: str | None = None):
+        """Send or queue data. Return False if the policy refused it."""
+        if self.transport is None:
+            return False
+        if not self.paused and not self.holder.queued:
+            self.transport.write(data)
+            return True
+        if force:
+            return self.holder.enqueue(data, True, key)
+        return self._server.policy.admit(self.holder, data, key)
+
+    def flush(self):
+        """Hand queued data to the transport while it accepts writes"""
+        while self.holder.queued and not self.paused and not self.holder.closing \
+                and self.transport:
+            view = self.holder.input
+            self.transport.write(view)
+            self.holder.advance(len(view))
+
+    def abort(self):
+        """Close now, drop anything unsent"""
+        if self.transport is not None:
+            self.transport.abort()
+
+
+class AsyncServer(BaseServer):
+    """Server on asyncio. Serves the same protocol as `Server`."""
+
+    def __init__(self,
+                 addr: ServerAddr,
+                 listen_for: int = 0,
+                 policy: Backpressure | None = None,
+                 rooms: RoomManager | None = None) -> None:
+        super().__init__(addr, listen_for, policy, rooms)
+        self._loop: AbstractEventLoop | None = None
+        self._stopping: asyncio.Event | None = None
+        self._closing: list[_Connection] = []
+        self._timers: list[Repeating] = []
+        self._rooms_handle: asyncio.TimerHandle | None = None
+
+    @property
+    def loop(self):
+        """Server event loop, None if not running"""
+        return self._loop
+
+    def call_every(self, interval: float, callback: Callable[[], object]):
+        """Call back every `interval` seconds on the server loop, heartbeats and game
+        ticks go here. Can be called before the server runs. Return the timer."""
+        timer = Repeating(interval, callback)
+        self._timers.append(timer)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(timer.start, self._loop)
+        return timer
+
+    def connected(self, conn: _Connection):
+        """New connection, reject it if the server is full"""
+        if self._full():
+            self._refuse(conn, conn.holder)
+            return
+        Logger.info("Connected at client: %s", map_addr(conn.holder.address))
+        self._add_client(conn, conn.holder)
+
+    def disconnected(self, conn: _Connection):
+        """Connection lost"""
+        Logger.info(
+            "Connection to client %s has been closed", map_addr(conn.holder.address))
+        self._remove_client(conn)
+        if conn in self._closing:
+            self._closing.remove(conn)
+
+    def _last_words(self, conn: _Connection, holder: IOMessage, data: bytes):
+        """Send data then close the connection, the transport flushes before closing."""
+        holder.closing = True
+        holder.closing_since = monotonic()
+        holder.drop_queued()
+        self._remove_client(conn)
+        self._closing.append(conn)
+        if conn.transport is not None:
+            conn.transport.write(frame(data))
+            conn.transport.close()
+
+    def _sweep(self):
+        """Abort evicted/rejected clients that could not flush in time"""
+        for conn in tuple(self._closing):
+            if self._policy.expired(conn.holder):
+                conn.abort()
+
+    def _do_send(self,
+                 conn: _Connection,
+                 data: bytes,
+                 force: bool = False,
+                 key: str | None = None):
+        if conn.send(data, force, key):
+            return True
+        Logger.warning("Outbound queue of %s is full (%s bytes), dropped %s bytes",
+                       map_addr(conn.holder.address), conn.holder.queued, len(data))
+        if self._policy.should_evict(conn.holder):
+            self._evict(conn, conn.holder)
+        return False
+
+    def do_read(self, conn: _Connection, request: Message):
+        """Handle a received frame"""
+        self._do_read(conn, conn.holder, request)
+
+    def _route_input(self, room: str, body):
+        """Hand paddle input to the match hosted in room, a woken match ticks again"""
+        match = self._rooms.get(room)  # type: ignore
+        asleep = match is not None and match.asleep
+        if self._rooms.route_input(room, body) is not None and asleep:  # type: ignore
+            self._plan_ticks()
+
+    def _join(self, conn: _Connection, holder: IOMessage, room, relay: bool = False):
+        super()._join(conn, holder, room, relay)
+        if self._rooms is not None and holder.room is not None:
+            self._plan_ticks()
+
+    def _plan_ticks(self):
+        """Call back when the next match tick is due, sooner than planned if woken"""
+        if self._rooms is None or self._loop is None:
+            return
+        if self._rooms_handle is not None:
+            self._rooms_handle.cancel()
+        self._rooms_handle = self._loop.call_later(self._rooms.timeout(HEARTBEAT), self._tick)
+
+    def _tick(self):
+        self._rooms_handle = None
+        self._rooms.advance()  # type: ignore
+        self._plan_ticks()
+
+    async def _serve(self):
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        self._stopping = asyncio.Event()
+        server = await loop.create_server(lambda: _Connection(self), sock=self._socket)
+        self._timers.append(Repeating(HEARTBEAT, self._sweep))
+        for timer in self._timers:
+            timer.start(loop)
+        self._plan_ticks()
+        self._running.set()
+        try:
+            await self._stopping.wait()
+        finally:
+            for timer in self._timers:
+                timer.cancel()
+            if self._rooms_handle is not None:
+                self._rooms_handle.cancel()
+            server.close()
+            for conn in [*self._clients, *self._closing]:
+                conn.abort()
+            await server.wait_closed()
+
+    def _serve_forever(self):
+        asyncio.run(self._serve())
+
+    def _shutdown(self):
+        self._loop = None
+
+    def _request_stop(self):
+        self._running.wait(5)
+        loop, stopping = self._loop, self._stopping
+        if loop is not None and stopping is not None:
+            loop.call_soon_threadsafe(stopping.set)
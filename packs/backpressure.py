@@ -0,0 +1,60 @@
+"""Outbound backpressure policy"""
+from time import monotonic
+
+from .connection import BINARY, OUTBOX_LIMIT, IOMessage, Message
+from .errors import ValidationError
+
+# Header marking a message as a snapshot, newer message with the same value supersedes it.
+SNAPSHOT_HEADER = "Snapshot"
+
+
+def snapshot_key(request: Message) -> str | None:
+    """Return snapshot key of a message, None if it is not a snapshot."""
+    try:
+        data = request.json()
+    except ValidationError:
+        return None
+    if SNAPSHOT_HEADER in data['headers']:
+        return str(data['headers'][SNAPSHOT_HEADER])
+    kind = BINARY.type_of(data['body'])
+    if kind is None:
+        return None
+    return kind.snapshot_key(data['body'])
+
+
+class Backpressure:
+    """Slow client policy. Caps bytes queued per client, a newer game state snapshot
+    replaces the queued stale one and a client staying over budget for `grace` seconds
+    is evicted."""
+
+    def __init__(self, budget: int = OUTBOX_LIMIT, grace: float = 2) -> None:
+        self.budget = budget
+        self.grace = grace
+
+    def admit(self, holder: IOMessage, data: bytes, key: str | None = None):
+        """Queue data on holder if the budget allows. Return True if queued."""
+        if holder.enqueue(data, key=key):
+            return True
+        if holder.over_since is None:
+            holder.over_since = monotonic()
+        return False
+
+    def relieve(self, holder: IOMessage):
+        """Holder has sent some of its queue, clear over budget state if it is back under."""
+        if holder.queued < self.budget:
+            holder.over_since = None
+
+    def should_evict(self, holder: IOMessage):
+        """Has holder been over budget for too long?"""
+        if holder.over_since is None:
+            return False
+        return monotonic() - holder.over_since >= self.grace
+
+    def expired(self, holder: IOMessage):
+        """Has a closing holder had enough time to flush its last words?"""
+        if holder.closing_since is None:
+            return False
+        return monotonic() - holder.closing_since >= self.grace * 2
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} budget={self.budget} grace={self.grace}>"
@@ -1,14 +1,17 @@
 """Client library"""
 from binascii import Error as BinasciiError
+from select import select
 from selectors import DefaultSelector, SelectorKey
 from socket import AF_INET, SOCK_STREAM
 from socket import socket as SocketClass
-from threading import Event, Thread
-from time import sleep
+from threading import Event, Lock, Thread
+from time import monotonic, sleep
 from typing import Any
 
-from .connection import (EVENT_READ, IOMessage, Message, event_read,
-                         make_message)
+from .connection import (CHOICE_HEADER, DEFAULT_CODEC, EVENT_READ,
+                         OFFER_HEADER, RELAY_HEADER, ROOM_HEADER, IOMessage,
+                         Message, event_read, frame, make_message)
+from .errors import ValidationError
 from .logging import FileConfig, SetupConfig, setup_logger
 from .typings import ServerAddr
 from .utils import TruthEvent, map_addr
@@ -16,13 +19,23 @@ from .utils import TruthEvent, map_addr
 ClientLog, FileHandler, Console = setup_logger("client", SetupConfig(
     FileConfig("client-log.txt", 'w')
 ))
+# Seconds a send may wait for the server to read before giving up.
+SEND_TIMEOUT = 5
 
 
 class Client:  # pylint: disable=too-many-instance-attributes
     """Base client class"""
 
-    def __init__(self, addr: ServerAddr) -> None:
+    def __init__(self,
+                 addr: ServerAddr,
+                 codecs: tuple[str, ...] = ("binary", DEFAULT_CODEC),
+                 room: str | None = None,
+                 relay: bool = False) -> None:
         self._addr = addr
+        self._codecs = codecs
+        self._room = room
+        self._relay = relay
+        self._codec = DEFAULT_CODEC
         self._placeholder = addr == ("", 0)
         self._host = addr[0]
         self._port = addr[1]
@@ -40,20 +53,42 @@ class Client:  # pylint: disable=too-many-instance-attributes
         self._running = Event()
         self._running.clear()
         self._reading = TruthEvent()
+        self._sending = Lock()
 
     @property
     def running(self):
         """Is client running?"""
         return self._running.is_set()
 
-    def push(self, data: Any):
+    @property
+    def codec(self):
+        """Codec negotiated with server"""
+        return self._codec
+
+    def push(self, data: Any, headers: dict[str, Any] | None = None):
         """Push data to server"""
         if self._placeholder:
             raise RuntimeError("Cannot push in placeholder client")
         ClientLog.debug("Sending data")
-        x = self._socket.send(make_message(data, {}))
-        # ClientLog.debug(x)
-        return x
+        return self._send(frame(make_message(data, headers or {}, self._codec)))
+
+    def _send(self, data: bytes, timeout: float = SEND_TIMEOUT):
+        """Write all of data, a partial frame would corrupt the stream. The socket is
+        non-blocking: wait for it to drain when full. Return bytes sent."""
+        view = memoryview(data)
+        deadline = monotonic() + timeout
+        with self._sending:
+            while view:
+                try:
+                    sent = self._socket.send(view)
+                except BlockingIOError:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("Server is not reading, send timed out") from None
+                    select((), (self._socket,), (), remaining)
+                    continue
+                view = view[sent:]
+        return len(data)
 
     def read(self) -> bytes:
         """Read data from server"""
@@ -62,10 +97,10 @@ class Client:  # pylint: disable=too-many-instance-attributes
         ClientLog.debug("Reading data")
         while self._response.output == b'':
             sleep(0.1)
-        self._data._data = self._response.output  # pylint: disable=protected-access
+        self._data = Message(self._response.output)
         # ClientLog.debug(f"Done reading. {self._data.unpack_raw()}")
         self._response.reset_output()
-        return self._data.unpack_raw(False)  # type: ignore
+        return self._data.codec.unpack(self._data.raw_body())
 
     def json(self):
         """Read data from server and return JSON object"""
@@ -74,7 +109,21 @@ class Client:  # pylint: disable=too-many-instance-attributes
         self.read()
         return self._data.json()
 
+    def messages(self) -> list[Any]:
+        """Bodies of every message received since the last call, without waiting.
+        Invalid messages are skipped."""
+        if self._placeholder:
+            raise RuntimeError("Cannot read in placeholder client")
+        bodies = []
+        for payload in self._response.frames():
+            try:
+                bodies.append(Message(payload).body())
+            except ValidationError:
+                continue
+        return bodies
+
     def _do_read(self, key: SelectorKey):
+        # Complete frames are queued on the response holder, read() takes them one by one.
         with self._reading:
             event_read(key, self._selector)
 
@@ -84,7 +133,7 @@ class Client:  # pylint: disable=too-many-instance-attributes
         self._running.set()
         try:
             while self._running.is_set():
-                events = self._selector.select()
+                events = self._selector.select(0.5)
                 for key, mask in events:
                     if mask & EVENT_READ:
                         self._do_read(key)
@@ -94,11 +143,46 @@ class Client:  # pylint: disable=too-many-instance-attributes
             self._selector.close()
             self._socket.close()
 
+    def _negotiate(self, timeout: float = 2):
+        """Offer codecs to server and wait for its choice. Keep the default codec on timeout.
+        Room, if any, is joined in the same message."""
+        headers: dict[str, Any] = {OFFER_HEADER: list(self._codecs)}
+        headers.update(self._join_headers())
+        self._send(frame(make_message("", headers)))
+        deadline = monotonic() + timeout
+        while monotonic() < deadline:
+            for key, _ in self._selector.select(deadline - monotonic()):
+                event_read(key, self._selector)
+            for payload in self._response.pending():
+                try:
+                    headers = Message(payload).headers()
+                except ValidationError:
+                    continue
+                if CHOICE_HEADER in headers:
+                    self._response.discard(payload)
+                    self._codec = headers[CHOICE_HEADER]
+                    ClientLog.info("Server chose %s codec", self._codec)
+                    return
+        ClientLog.info("No codec answer from server, using %s", self._codec)
+
     def start(self):
         """Start client thread"""
         ClientLog.info("Starting connect to server")
+        if self._codecs:
+            self._negotiate()
+        elif self._room is not None:
+            self._send(frame(make_message("", self._join_headers())))
         self._thread.start()
 
+    def _join_headers(self) -> dict[str, Any]:
+        """Headers joining the room, if any. A relay room is not simulated by the server,
+        for peers running the match themselves (lockstep, rollback)."""
+        if self._room is None:
+            return {}
+        if self._relay:
+            return {ROOM_HEADER: self._room, RELAY_HEADER: True}
+        return {ROOM_HEADER: self._room}
+
     def stop(self):
         """Stop client thread"""
         if self._placeholder:
@@ -122,9 +206,9 @@ class AppClient(Client):
         """Read data from server"""
         if self._placeholder:
             raise RuntimeError("Cannot push in placeholder client")
-        self._data._data = self._response.output  # pylint: disable=protected-access
+        self._data = Message(self._response.output)
         try:
-            return self._data.unpack_raw(False)  # type: ignore
+            return self._data.codec.unpack(self._data.raw_body())
         except BinasciiError:
             return make_message("No data is provided for now or server sent invalid response.", {
                 "Origin": map_addr(self._socket.getsockname())
@@ -1,29 +1,164 @@
 """Universal module for managing connections"""
 from base64 import b64decode, b64encode
 from binascii import Error as BinasciiError
+from collections import deque
 from json import JSONDecodeError, dumps, loads
 from logging import Logger
 from selectors import EVENT_READ, EVENT_WRITE, DefaultSelector, SelectorKey
 from socket import AF_INET, SOCK_STREAM
 from socket import socket as SocketClass
+from struct import Struct
+from struct import error as StructError
 from typing import Any, TypeGuard
 
 
-from .errors import ValidationError
+from .errors import FrameError, ValidationError
 from .typings import Addr, SelectSock, ServerAddr, TMessage
 from .utils import map_addr
 from .logging import debug
 
 READ_WRITE = EVENT_READ | EVENT_WRITE
+RECV_SIZE = 4096
+# Outbound bytes a connection may have queued before enqueue refuses more.
+OUTBOX_LIMIT = 1 << 20
+
+# Every message on the wire is prefixed by its payload length (unsigned, big-endian).
+FRAME_HEADER = Struct("!I")
+MAX_FRAME_SIZE = 1 << 24
+
+
+def frame(payload: bytes) -> bytes:
+    """Prefix payload with its length header, ready to send."""
+    if len(payload) > MAX_FRAME_SIZE:
+        raise FrameError(f"Frame is too large ({len(payload)} bytes)")
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+class FrameDecoder:
+    """Incremental length-prefixed frame decoder. Keep one per connection.
+
+    Received data lands in a preallocated buffer (`recv_into`), frames are parsed
+    through memoryview slices and the unread tail is compacted in place. The buffer
+    only grows when a single frame does not fit in it. `copied` counts every byte
+    copied inside the decoder, frames handed out included."""
+
+    def __init__(self, capacity: int = RECV_SIZE * 4, max_size: int = MAX_FRAME_SIZE) -> None:
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+        self._need = FRAME_HEADER.size
+        self._max_size = max_size
+        self.copied = 0
+
+    def _reserve(self, size: int):
+        """Make room for `size` bytes after the unread data."""
+        if len(self._buffer) - self._end >= size:
+            return
+        unread = self._end - self._start
+        if unread + size <= len(self._buffer):
+            if unread <= self._start:
+                self._buffer[:unread] = self._view[self._start:self._end]
+            else:
+                # Overlapping regions, go through a temporary copy.
+                self._buffer[:unread] = bytes(self._view[self._start:self._end])
+                self.copied += unread
+            self.copied += unread
+            self._start, self._end = 0, unread
+            return
+        capacity = len(self._buffer) * 2
+        while capacity < unread + size:
+            capacity *= 2
+        buffer = bytearray(capacity)
+        buffer[:unread] = self._view[self._start:self._end]
+        self.copied += unread
+        self._view.release()
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+        self._start, self._end = 0, unread
+
+    def writable(self, sizehint: int = -1) -> memoryview:
+        """Free part of the buffer to receive into, follow up with `commit`."""
+        self._reserve(max(RECV_SIZE, sizehint, self._need - self.pending))
+        return self._view[self._end:]
+
+    def commit(self, received: int):
+        """Mark bytes received into `writable` as filled."""
+        self._end += received
+
+    def recv_into(self, socket: SocketClass) -> int:
+        """Receive straight into the buffer. Return received bytes count."""
+        received = socket.recv_into(self.writable())
+        self.commit(received)
+        return received
+
+    def feed(self, data: bytes) -> list[bytes]:
+        """Feed received data, return zero or more complete frames."""
+        self._reserve(len(data))
+        self._view[self._end:self._end + len(data)] = data
+        self._end += len(data)
+        self.copied += len(data)
+        return self.frames()
+
+    def frames(self) -> list[bytes]:
+        """Return every complete frame received so far."""
+        frames = []
+        header = FRAME_HEADER.size
+        while self._end - self._start >= header:
+            (length,) = FRAME_HEADER.unpack_from(self._buffer, self._start)
+            if length > self._max_size:
+                raise FrameError(f"Frame is too large ({length} bytes)")
+            stop = self._start + header + length
+            if stop > self._end:
+                self._need = header + length
+                break
+            frames.append(bytes(self._view[self._start + header:stop]))
+            self.copied += length
+            self._start = stop
+        else:
+            self._need = header
+        if self._start == self._end:
+            self._start = self._end = 0
+        return frames
+
+    @property
+    def capacity(self):
+        """Allocated buffer size"""
+        return len(self._buffer)
+
+    @property
+    def pending(self):
+        """Bytes held back waiting for the rest of a frame"""
+        return self._end - self._start
+
+    def unread(self) -> bytes:
+        """Copy of the bytes held back"""
+        return bytes(self._view[self._start:self._end])
+
+    def reset(self):
+        """Drop any partial frame"""
+        self._start = self._end = 0
+        self._need = FRAME_HEADER.size
 
 
 class IOMessage:
     """Base class of basic Message. No headers just body."""
 
-    def __init__(self, address: Addr) -> None:
-        self._input: bytes = b""
-        self._output: bytes = b""
+    def __init__(self, address: Addr, limit: int = OUTBOX_LIMIT) -> None:
+        self._input: deque[memoryview] = deque()
+        self._keyed: dict[str, memoryview] = {}
+        self._queued = 0
+        self._partial = False
+        self._limit = limit
+        self.over_since: float | None = None
+        self.closing = False
+        # When last words were queued, apart from over_since that draining clears
+        self.closing_since: float | None = None
+        self._output: deque[bytes] = deque()
+        self._decoder = FrameDecoder()
         self._address = address
+        self.codec = DEFAULT_CODEC
+        self.room: str | None = None
         self._socket = None
         self._input_upheld = False
         self._output_upheld = False
@@ -59,39 +194,149 @@ class IOMessage:
 
     @property
     def input(self):
-        """Input buffer"""
-        return self._input
+        """Input buffer, the unsent part of the oldest queued data."""
+        if not self._input:
+            return b""
+        return self._input[0]
 
     @property
     def output(self):
-        """Output buffer"""
-        return self._output
+        """Output buffer, the oldest complete frame not consumed yet."""
+        if not self._output:
+            return b""
+        return self._output[0]
 
     @input.setter
     def input(self, value: str | bytes):
-        """Input buffer"""
+        """Input buffer, queue data to send."""
+        self.enqueue(value)
+
+    @property
+    def queued(self):
+        """Bytes queued to send"""
+        return self._queued
+
+    @property
+    def limit(self):
+        """Maximum bytes queued to send"""
+        return self._limit
+
+    def _find_keyed(self, key: str | None):
+        """Index of the queued data stored under key, None if gone or already being sent."""
+        if key is None or key not in self._keyed:
+            return None
+        view = self._keyed[key]
+        for index, queued in enumerate(self._input):
+            if queued is view:
+                return index
+        return None
+
+    def enqueue(self, value: str | bytes, force: bool = False, key: str | None = None):
+        """Queue data to send. Data is not copied, the same buffer can be queued on many
+        connections. Data queued with a key replaces older data still waiting under the
+        same key. Return False if it would go over the limit, unless forced."""
         if isinstance(value, str):
             value = value.encode('utf-8')
         if self._input_upheld:
-            return
-        self._input = value
+            return False
+        stale = self._find_keyed(key)
+        freed = len(self._input[stale]) if stale is not None else 0
+        if not force and self._queued - freed + len(value) > self._limit:
+            return False
+        if stale is not None:
+            del self._input[stale]
+            self._queued -= freed
+        view = memoryview(value)
+        self._input.append(view)
+        self._queued += len(value)
+        if key is not None:
+            self._keyed[key] = view
+        return True
+
+    def advance(self, sent: int):
+        """Mark `sent` bytes of queued data as sent. Partially sent data keeps its rest."""
+        self._queued -= sent
+        while sent:
+            head = self._input[0]
+            if sent < len(head):
+                self._input[0] = head[sent:]
+                self._partial = True
+                return
+            sent -= len(head)
+            self._input.popleft()
+            self._partial = False
+        if not self._input:
+            self._keyed.clear()
+
+    def queued_bytes(self) -> bytes:
+        """Copy of everything queued to send"""
+        return b"".join(self._input)
+
+    def drop_queued(self):
+        """Drop queued data that has not started sending. Return dropped bytes count."""
+        head = self._input[0] if self._input and self._partial else None
+        dropped = self._queued - (len(head) if head is not None else 0)
+        self._input.clear()
+        self._keyed.clear()
+        if head is not None:
+            self._input.append(head)
+        self._queued -= dropped
+        return dropped
 
     @output.setter
     def output(self, value: str | bytes):
-        """Output Buffer"""
+        """Output Buffer, queue a complete frame."""
         if isinstance(value, str):
             value = value.encode('utf-8')
         if self._output_upheld:
             return
-        self._output = value
+        self._output.append(value)
+
+    def feed(self, data: bytes):
+        """Feed raw received data, queue every complete frame. Return frames count."""
+        frames = self._decoder.feed(data)
+        for payload in frames:
+            self.output = payload
+        return len(frames)
+
+    def recv_into(self, socket: SocketClass):
+        """Receive from socket into the frame decoder, queue every complete frame.
+        Return received bytes count, 0 means the peer has closed."""
+        received = self._decoder.recv_into(socket)
+        if received:
+            for payload in self._decoder.frames():
+                self.output = payload
+        return received
+
+    @property
+    def decoder(self):
+        """Frame decoder of this connection"""
+        return self._decoder
+
+    def frames(self):
+        """Consume queued frames one at a time."""
+        while self._output:
+            yield self._output.popleft()
+
+    def pending(self):
+        """Queued frames, not consumed."""
+        return tuple(self._output)
+
+    def discard(self, payload: bytes):
+        """Drop a queued frame"""
+        self._output.remove(payload)
 
     def reset_input(self):
-        """Reset input buffer"""
-        self._input = b""
+        """Reset input buffer, drop everything queued to send."""
+        self._input.clear()
+        self._keyed.clear()
+        self._queued = 0
+        self._partial = False
 
     def reset_output(self):
-        """Reset output buffer"""
-        self._output = b''
+        """Reset output buffer, drop the oldest frame."""
+        if self._output:
+            self._output.popleft()
 
     @property
     def socket(self):
@@ -112,7 +357,7 @@ class IOMessage:
 
     def __repr__(self) -> str:
         return f"<{type(self).__name__} upheld-input={self._input_upheld} \
-upheld-output={self._output_upheld} length=({len(self._input)}, {len(self._output)}) \
+upheld-output={self._output_upheld} length=({self._queued}, {len(self._output)}) \
 target={self._map_addr()}>"
 
 
@@ -166,16 +411,25 @@ class Message(BaseMessage):
     def __init__(self, data: bytes | str) -> None:
         super().__init__(data)
         self._invalid = False
+        self._message: TMessage | None = None
+
+    @property
+    def codec(self):
+        """Codec this message was encoded with"""
+        return detect_codec(self._data)
 
     def json(self) -> TMessage:
         """Return data as valid Message data"""
-        data = super().json()
         if self._invalid:
             raise ValidationError("Message data is not valid.")
-        if not validate_message(data):  # type: ignore
+        if self._message is not None:
+            return self._message
+        try:
+            self._message = self.codec.decode(self._data)
+        except ValidationError:
             self._invalid = True
-            raise ValidationError("Message data is not valid.")
-        return data
+            raise
+        return self._message
 
     def body(self) -> Any:
         """Return body data"""
@@ -199,26 +453,32 @@ class Message(BaseMessage):
 #             pass
 
 def event_read(key: SelectorKey, selector: DefaultSelector, __logger: Logger | None = None):
-    """Read event function"""
+    """Read event function. Complete frames are queued on the holder output."""
     holder: IOMessage = key.data
     socket: SocketClass = key.fileobj  # type: ignore
-    # holder.reset_output()
     ioerror = False
-    data = b''
+    broken = False
 
     while True:
         debug(__logger, holder)
         try:
-            data += socket.recv(1024)
+            received = holder.recv_into(socket)
         except BlockingIOError:
             ioerror = True
             break
+        except FrameError as exc:
+            debug(__logger, exc)
+            broken = True
+            break
         except OSError:
             break
 
-        if not data:
+        if not received:
             break
-    holder.output = data
+    if broken:
+        selector.unregister(socket)
+        socket.close()
+        return True
     if holder.output:
         return None
     if holder.output_upheld:
@@ -231,20 +491,23 @@ def event_read(key: SelectorKey, selector: DefaultSelector, __logger: Logger | N
 
 
 def event_write(key: SelectorKey, selector: DefaultSelector):
-    """Write Event function"""
+    """Write event function. Send queued data until the socket would block, a partial
+    write resumes on the next event. Once the queue is empty the socket goes back to
+    read events only. Return True if the connection is closed."""
     holder: IOMessage = key.data
     socket: SocketClass = key.fileobj  # type: ignore
 
-    try:
-        sent = socket.send(holder.input)
-        print(sent)
-        holder.reset_input()
-    except ConnectionAbortedError:
-        socket.close()
-        selector.unregister(socket)
-        return True
-    except OSError:
-        return True
+    while holder.queued:
+        try:
+            sent = socket.send(holder.input)
+        except BlockingIOError:
+            return None
+        except OSError:
+            selector.unregister(socket)
+            socket.close()
+            return True
+        holder.advance(sent)
+    selector.modify(socket, EVENT_READ, holder)
     return None
 
 
@@ -312,6 +575,236 @@ def _make_message(body: Any, headers: dict[str, Any]) -> TMessage:
     return request
 
 
-def make_message(body: Any, headers: dict[str, Any]):
-    """Create a message with body and headers."""
-    return pack(dumps(_make_message(body, headers)))
+def make_message(body: Any, headers: dict[str, Any], codec: str | None = None):
+    """Create a message with body and headers. Uses the compatibility codec by default."""
+    return get_codec(codec or DEFAULT_CODEC).encode(body, headers)
+
+
+def encode_as(request: "Message", codec: str) -> bytes:
+    """Payload of a valid request in codec, as received if it already is"""
+    if request.codec.name == codec:
+        return request.raw_body()
+    message = request.json()
+    return make_message(message["body"], message["headers"], codec)
+
+
+# Codecs. Every payload carries enough to tell its codec apart: base64 blobs only
+# contain printable characters, binary payloads start with a tag byte below 0x20.
+
+DEFAULT_CODEC = "b64json"
+# Client offers its codecs in preference order, server answers with its choice.
+OFFER_HEADER = "Codecs"
+CHOICE_HEADER = "Codec"
+# Client asks to join a room (match), only clients of the same room see its messages.
+ROOM_HEADER = "Room"
+# Sent with Room: the room only relays messages between its peers (lockstep, rollback),
+# the server does not simulate a match for it.
+RELAY_HEADER = "Relay"
+# Message types only the other peers of a room need, never sent back to their sender.
+PEER_TYPES = ("step", "checksum")
+
+
+class Codec:
+    """Base wire codec. Subclass it, give it a name and register it with `register_codec`."""
+    name = ""
+
+    def encode(self, body: Any, headers: dict[str, Any]) -> bytes:
+        """Encode body and headers to a payload"""
+        raise NotImplementedError
+
+    def decode(self, payload: bytes) -> TMessage:
+        """Decode payload to a valid message, raise ValidationError if it can't"""
+        raise NotImplementedError
+
+    def unpack(self, payload: bytes) -> bytes:
+        """Strip transport encoding from payload"""
+        return payload
+
+    def accepts(self, payload: bytes) -> bool:
+        """Does payload look like it was encoded by this codec?"""
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} name={self.name}>"
+
+
+class Base64JsonCodec(Codec):
+    """Compatibility codec, base64 blob of a JSON message."""
+    name = "b64json"
+
+    def encode(self, body: Any, headers: dict[str, Any]) -> bytes:
+        return pack(dumps(_make_message(body, headers)))
+
+    def decode(self, payload: bytes) -> TMessage:
+        try:
+            data = loads(b64decode(payload))
+        except (BinasciiError, UnicodeDecodeError, JSONDecodeError) as exc:
+            raise ValidationError("Message data is not valid.") from exc
+        if not isinstance(data, dict) or not validate_message(data):
+            raise ValidationError("Message data is not valid.")
+        return data
+
+    def unpack(self, payload: bytes) -> bytes:
+        return b64decode(payload)
+
+    def accepts(self, payload: bytes) -> bool:
+        return not payload or payload[0] >= 0x20
+
+
+class BinaryType:
+    """Fixed layout message type of the binary codec."""
+
+    def __init__(self,
+                 tag: int,
+                 name: str,
+                 fmt: str,
+                 fields: tuple[str, ...],
+                 key: tuple[str, ...] | None = None) -> None:
+        self.tag = tag
+        self.name = name
+        self.fields = fields
+        self.key = key
+        self.struct = Struct("!B" + fmt)
+        self.size = self.struct.size
+
+    def snapshot_key(self, body: dict[str, Any]) -> str | None:
+        """Key of a snapshot type message, a newer one with the same key supersedes it.
+        None if this type is not a snapshot."""
+        if self.key is None:
+            return None
+        return ":".join((self.name, *(str(body[field]) for field in self.key)))
+
+    def pack(self, body: dict[str, Any]) -> bytes:
+        """Pack body fields"""
+        return self.struct.pack(self.tag, *(body[field] for field in self.fields))
+
+    def unpack(self, payload: bytes) -> dict[str, Any]:
+        """Unpack payload to body"""
+        body: dict[str, Any] = {"type": self.name}
+        body.update(zip(self.fields, self.struct.unpack(payload)[1:]))
+        return body
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.name} tag={self.tag} size={self.size}>"
+
+
+class BinaryCodec(Codec):
+    """Compact codec. Bodies of a registered type (`{"type": name, **fields}`, no headers)
+    are struct-packed, anything else is sent as plain JSON behind tag 0."""
+    name = "binary"
+    JSON_TAG = 0
+
+    def __init__(self) -> None:
+        self._by_tag: dict[int, BinaryType] = {}
+        self._by_name: dict[str, BinaryType] = {}
+
+    def register(self,
+                 tag: int,
+                 name: str,
+                 fmt: str,
+                 fields: tuple[str, ...],
+                 key: tuple[str, ...] | None = None):
+        """Register a fixed layout message type. Snapshot types give the fields
+        identifying them as key, empty if there is only one of them."""
+        if not self.JSON_TAG < tag < 0x20:
+            raise ValueError("Tag must be between 1 and 31")
+        if tag in self._by_tag or name in self._by_name:
+            raise ValueError(f"Type {name} ({tag}) is already registered")
+        kind = BinaryType(tag, name, fmt, fields, key)
+        self._by_tag[tag] = kind
+        self._by_name[name] = kind
+        return kind
+
+    def type_of(self, body: Any) -> BinaryType | None:
+        """Return registered type of body, if any"""
+        if not isinstance(body, dict):
+            return None
+        return self._by_name.get(body.get("type"))  # type: ignore
+
+    def encode(self, body: Any, headers: dict[str, Any]) -> bytes:
+        kind = self.type_of(body)
+        if kind is not None and not headers:
+            try:
+                return kind.pack(body)
+            except (KeyError, StructError):
+                pass
+        return bytes((self.JSON_TAG,)) + dumps(_make_message(body, headers)).encode('utf-8')
+
+    def decode(self, payload: bytes) -> TMessage:
+        if not payload:
+            raise ValidationError("Message data is not valid.")
+        if payload[0] == self.JSON_TAG:
+            try:
+                data = loads(payload[1:])
+            except (UnicodeDecodeError, JSONDecodeError) as exc:
+                raise ValidationError("Message data is not valid.") from exc
+            if not isinstance(data, dict) or not validate_message(data):
+                raise ValidationError("Message data is not valid.")
+            return data
+        kind = self._by_tag.get(payload[0])
+        if kind is None or len(payload) != kind.size:
+            raise ValidationError("Message data is not valid.")
+        return {"body": kind.unpack(payload), "headers": {}}
+
+    def unpack(self, payload: bytes) -> bytes:
+        """JSON text of the message, like the compatibility codec gives"""
+        if payload[:1] == bytes((self.JSON_TAG,)):
+            return payload[1:]
+        return dumps(self.decode(payload)).encode('utf-8')
+
+    def accepts(self, payload: bytes) -> bool:
+        return bool(payload) and payload[0] < 0x20
+
+
+CODECS: dict[str, Codec] = {}
+
+
+def register_codec(codec: Codec):
+    """Register a codec by its name"""
+    CODECS[codec.name] = codec
+    return codec
+
+
+def get_codec(name: str) -> Codec:
+    """Return registered codec"""
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValidationError(f"Unknown codec: {name}") from None
+
+
+def detect_codec(payload: bytes) -> Codec:
+    """Return the codec payload was encoded with"""
+    for codec in CODECS.values():
+        if codec.accepts(payload):
+            return codec
+    return CODECS[DEFAULT_CODEC]
+
+
+def choose_codec(offered: Any) -> str:
+    """Pick the first offered codec this side knows, fallback to the default one"""
+    if isinstance(offered, list):
+        for name in offered:
+            if isinstance(name, str) and name in CODECS:
+                return name
+    return DEFAULT_CODEC
+
+
+BINARY = BinaryCodec()
+register_codec(Base64JsonCodec())
+register_codec(BINARY)
+
+# Game state, a handful of ints per tick.
+BINARY.register(1, "paddle", "Bhb", ("player", "y", "movement"), ("player",))
+BINARY.register(2, "ball", "hhbb", ("x", "y", "dx", "dy"), ())
+BINARY.register(3, "state", "IhhhhHH", ("tick", "ball_x", "ball_y",
+                                        "player1", "player2", "score1", "score2"), ())
+# Client side prediction: numbered inputs, and the state with the last input applied
+# for each player, see `packs.netcode`.
+BINARY.register(4, "input", "BbI", ("player", "movement", "seq"))
+BINARY.register(5, "sync", "IhhhhHHII", ("tick", "ball_x", "ball_y", "player1", "player2",
+                                         "score1", "score2", "ack1", "ack2"), ())
+# Lockstep: one input per player per tick and a periodic state digest, see
+# `packs.lockstep`. Ticks are sent modulo 2 ** 16.
+BINARY.register(6, "step", "HBb", ("tick", "player", "movement"))
+BINARY.register(7, "checksum", "HBI", ("tick", "player", "digest"))
@@ -7,4 +7,4 @@ def load_from_file(filepath: str):
     """Load and store toml data from file"""
     with open(filepath, encoding='utf-8') as file:
         loaded = loads(file.read())
-        environ.update(loaded)
+        environ.update({key: str(value) for key, value in loaded.items()})
@@ -7,3 +7,7 @@ class StateError(ValueError):
 
 class ValidationError(ValueError):
     """validation did not pass"""
+
+
+class FrameError(ValueError):
+    """Received or sent frame is not valid"""
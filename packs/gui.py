@@ -6,10 +6,14 @@ import pygame
 from pygame.event import Event
 
 from ._gui import BaseApp
-from ._gui.typings import Color, CommonConstants, Coordinate, Size
+from ._gui.config import AppConfig
+from ._gui.text import TEXT
+from ._gui.typings import Color, CommonConstants, Coordinate
 from .game_locals import DOWN, K_DOWN, K_UP, NONE, UP, K_s, K_w
 from .logging import setup_logger
 from .logging.config import FileConfig, SetupConfig
+from .sim import SCORE, BallState, Court, Engine, PaddleState
+from .sim.bot import NORMAL, Bot
 
 DEFAULTFONT = pygame.font.get_default_font()
 
@@ -17,29 +21,67 @@ BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
 GREEN = (0, 255, 0)
 RED = (255, 0, 0)
+GREY = (96, 96, 96)
+NET_DASH = 12
 GameLog, FileHandler, ConsoleHandler = setup_logger("GameLog", SetupConfig(
     FileConfig("gamelog.txt", 'w')
 ))
 
 
 class BaseSpd:
-    """Base Speedable ANY shape."""
+    """Base Speedable ANY shape. Draws a `packs.sim` state object, the engine moves it."""
 
     def __init__(self,
                  surface: pygame.Surface,
-                 pos: Coordinate,
-                 size: Size,
-                 speed: int,
+                 body: PaddleState | BallState,
                  color: Color,
                  config: CommonConstants) -> None:
         self._surface = surface
         self._config = config
-        self._posx = pos[0]
-        self._posy = pos[1]
-        self._width = size[0]
-        self._height = size[1]
-        self._speed = speed
+        self._state = body
         self._color = color
+        body.color = color
+        self._previous = (body.x, body.y)
+        self._drawn: pygame.Rect | None = None
+
+    @property
+    def state(self):
+        """Simulation state drawn by this entity"""
+        return self._state
+
+    @property
+    def surface(self):
+        """Surface drawn on"""
+        return self._surface
+
+    @surface.setter
+    def surface(self, surface: pygame.Surface):
+        self._surface = surface
+        self._drawn = None
+
+    def remember(self):
+        """Keep the current position, call before a simulation step"""
+        self._previous = (self._state.x, self._state.y)
+
+    def position(self, alpha: float = 1.):
+        """Position interpolated between the last two simulation steps"""
+        prevx, prevy = self._previous
+        state = self._state
+        return (round(prevx + (state.x - prevx) * alpha),
+                round(prevy + (state.y - prevy) * alpha))
+
+    def erase(self, background: pygame.Surface):
+        """Copy the background over what was drawn last frame. Return its bounds, None if
+        nothing was drawn."""
+        drawn = self._drawn
+        if drawn is not None:
+            self._surface.blit(background, drawn, drawn)
+        self._drawn = None
+        return drawn
+
+    def display(self, alpha: float = 1.) -> pygame.Rect:
+        """Display, return drawn bounds"""
+        raise NotImplementedError
 
 
 class BaseSpdRect(BaseSpd):
@@ -47,25 +89,25 @@ class BaseSpdRect(BaseSpd):
 
     def __init__(self,
                  surface: pygame.Surface,
-                 pos: Coordinate,
-                 size: Size,
-                 speed: int,
+                 body: PaddleState,
                  color: Color,
                  config: CommonConstants) -> None:
-        super().__init__(surface, pos, size, speed, color, config)
-        self._rawbody = pygame.Rect(pos[0], pos[1], size[0], size[1])
-        self._body = pygame.draw.rect(surface, color, self._rawbody)
+        super().__init__(surface, body, color, config)
+        self._state: PaddleState = body
+        self._body = pygame.Rect(body.rect)
 
     @property
     def rect(self):
         """Return self rectangle"""
-        return self._rawbody
+        return self._state.rect
 
-    def display(self):
+    def display(self, alpha: float = 1.):
         """Display current rectangle"""
+        state = self._state
         self._body = pygame.draw.rect(
-            self._surface, self._color, self._rawbody
+            self._surface, self._color, (*self.position(alpha), state.width, state.height)
         )
+        self._drawn = self._body
         return self._body
 
 
@@ -74,24 +116,23 @@ class BaseSpdCircle(BaseSpd):
 
     def __init__(self,
                  surface: pygame.Surface,
-                 pos: Coordinate,
-                 radius: int,
-                 speed: int,
+                 body: BallState,
                  color: Color,
                  config: CommonConstants) -> None:
-        super().__init__(surface, pos, (0, 0), speed, color, config)
-        self._radius = radius
-        self._circle = pygame.draw.circle(surface, color, pos, radius)
+        super().__init__(surface, body, color, config)
+        self._state: BallState = body
+        self._circle = pygame.Rect(body.rect)
 
     @property
     def circle(self):
         """Return self circle"""
         return self._circle
 
-    def display(self):
+    def display(self, alpha: float = 1.):
         """Display current circle"""
         self._circle = pygame.draw.circle(
-            self._surface, self._color, (self._posx, self._posy), self._radius)
+            self._surface, self._color, self.position(alpha), self._state.radius)
+        self._drawn = self._circle
         return self._circle
 
 
@@ -100,45 +141,41 @@ class Player(BaseSpdRect):
 
     def __init__(self,
                  surface: pygame.Surface,
-                 pos: Coordinate,
-                 size: Size,
-                 speed: int,
+                 body: PaddleState,
                  color: Color,
                  config: CommonConstants) -> None:
-        super().__init__(surface, pos, size, speed, color, config)
-        self._movements = NONE
-        self._score = 0
-
-    def update(self):
-        """Update player position by y-factor"""
-        y_factor = self.movements
-        self._posy = self._posy + self._speed*y_factor
+        super().__init__(surface, body, color, config)
+        self._label: pygame.Rect | None = None
+        self._shown_score = -1
 
-        # GameLog.debug("Pos-y -> %s, RES %s, More? %s",
-        #   self._posy, self._config.HEIGHT, self._posy + self._height >= self._config.HEIGHT)
-        if self._posy <= 0:
-            self._posy = 0
-
-        elif self._posy + self._height >= self._config.HEIGHT:
-            self._posy = self._config.HEIGHT - self._height
-
-        self._rawbody = (
-            self._posx, self._posy, self._width, self._height)
+    def erase_score(self, background: pygame.Surface):
+        """Copy the background over the last label. Call before anything under the label
+        is drawn: antialiased text blended over itself frame after frame would get
+        bolder."""
+        if self._label is not None:
+            self._surface.blit(background, self._label, self._label)
 
     def display_score(self, text: str, pos: Coordinate, color: Color):
-        """Display score"""
-        score = self._score
-        data = self._config.FONT.render(f"{text}: {score}", True, color)
+        """Display score. Return the bounds to update, None if the label did not change."""
+        score = self.score
+        data = TEXT.render(self._config.FONT, f"{text}: {score}", color)
         rect = data.get_rect()
         rect.center = pos
 
+        changed = score != self._shown_score
+        dirty = rect
+        if changed and self._label is not None:
+            dirty = rect.union(self._label)
         self._surface.blit(data, rect)
+        self._label = rect
+        self._shown_score = score
+        return dirty if changed else None
 
     @property
     def movements(self):
         """Player movements"""
         # GameLog.debug("Movements getattr %s", self._movements)
-        return self._movements
+        return self._state.movement
 
     @movements.setter
     def movements(self, value: Literal[0, -1, 1]):
@@ -146,95 +183,67 @@ class Player(BaseSpdRect):
         # GameLog.debug("Movements setattr -> %s", str(value))
         if not value in (NONE, UP, DOWN):
             raise ValueError("Expected NONE, DOWN, UP constant or 0, -1, 1")
-        self._movements = value
+        self._state.movement = value
 
     @property
     def score(self) -> int:
         """Player score"""
-        return self._score
+        return self._state.score
 
     @score.setter
     def score(self, value: int):
         """Player score"""
         if not isinstance(value, int):
             raise TypeError("Required integer type")
-        self._score = value
+        self._state.score = value
 
 
 class Ball(BaseSpdCircle):
     """Ball"""
 
-    def __init__(self,
-                 surface: pygame.Surface,
-                 pos: Coordinate,
-                 radius: int,
-                 speed: int,
-                 color: Color,
-                 config: CommonConstants) -> None:
-        super().__init__(surface, pos, radius, speed, color, config)
-        self._x_factor = 1
-        self._y_factor = -1
-        self._firsttime = 1
-
-    def update(self):
-        """Update position"""
-        self._posx += self._speed*self._x_factor
-        self._posy += self._speed*self._y_factor
-
-        # let's reflect the direction if hit some corner
-        if self._posy <= 0 or self._posy >= self._config.HEIGHT:
-            self._y_factor *= -1
-
-        # if the ball touch left wall for the first time, set it (firstime) to 0
-        # then return 0
-
-        # If player 2 has scored, let's set firsttime to 0.
-        if self._posx <= 0 and self._firsttime:
-            self._firsttime = 0
-            return 1  # Magic number 1
-        if self._posx >= self._config.WIDTH and self._firsttime:
-            self._firsttime = 0
-            return -1  # Magic Number -1
-        return 0
-
-    def reset(self):
-        """Reset ball position"""
-        self._posx = self._config.WIDTH // 2
-        self._posy = self._config.HEIGHT // 2
-        self._x_factor *= -1
-        self._firsttime = 1
-
-    def hit(self):
-        """Reflect on x-axis"""
-        self._x_factor *= -1
-
 
 class Application(BaseApp):
-    """Application"""
+    """Application. With `bot` set to a paddle index, a bot plays that paddle."""
+
+    def __init__(self, config: AppConfig, bot: int | None = None) -> None:
+        super().__init__(config)
+        self._bot_paddle = bot
+        self._bot: Bot | None = None
 
     def init(self):
         GameLog.info("Game initialising")
         super().init()
         self._font = pygame.font.Font(DEFAULTFONT, 20)
-        self._gamedata = CommonConstants(*self._config.resolution, self._font)
-        self._ball = Ball(self._surface,
-                          (self._config.resolution[0]//2,
-                           self._config.resolution[1]//2),
-                          7,
-                          7,
-                          WHITE,
-                          self._gamedata)
-        self._player1 = Player(self._surface, (20, 0),
-                               (10, 100), 10, GREEN, self._gamedata)
-        self._player2 = Player(
-            self._surface, (self._config.resolution[0]-30, 0), (10, 100), 10, RED, self._gamedata)
+        self._gamedata = CommonConstants(*self.resolution, self._font)
+        # Speeds scaled to the tick rate, the game plays at the same pace at any rate
+        self._engine = Engine(Court(*self.resolution).at(self._config.TICKRATE))
+        state = self._engine.state
+        self._ball = Ball(self._surface, state.ball, WHITE, self._gamedata)
+        self._player1 = Player(self._surface, state.paddles[0], GREEN, self._gamedata)
+        self._player2 = Player(self._surface, state.paddles[1], RED, self._gamedata)
 
         self._players = [self._player1, self._player2]
+        self._entities = [self._player1, self._player2, self._ball]
+        if self._bot_paddle is not None:
+            reaction = round(NORMAL[0] * self._config.TICKRATE / 60)
+            self._bot = Bot(state, self._bot_paddle, reaction)
         GameLog.info("Game initialised. Setting running to true")
         self._running = True
 
+    def on_background(self, surface: pygame.Surface):
+        """Court: a dashed net down the middle"""
+        width, height = surface.get_size()
+        for top in range(0, height, NET_DASH * 2):
+            pygame.draw.rect(surface, GREY, (width // 2 - 1, top, 2, NET_DASH))
+
+    def on_display(self):
+        for entity in getattr(self, "_entities", ()):
+            entity.surface = self._surface
+
     def on_exit(self):
         super().on_exit()
+        GameLog.info("Text cache: %s hits, %s misses (%.1f%% hit rate)",
+                     TEXT.hits, TEXT.misses, TEXT.hit_rate * 100)
         GameLog.info("Received exit event... closing.")
 
     def on_keydown(self, event: Event):
@@ -257,6 +266,17 @@ class Application(BaseApp):
         if event.key in (K_w, K_s):
             self._player1.movements = NONE
 
+    def on_step(self):
+        """Advance the simulation one tick"""
+        for entity in self._entities:
+            entity.remember()
+        if self._bot is not None:
+            self._players[self._bot_paddle].movements = self._bot.decide()  # type: ignore
+        for event in self._engine.step():
+            if event.kind == SCORE:
+                # Served from the middle, do not slide across the court
+                self._ball.remember()
+
     def on_main(self):
         """Anything besides on_event, update, etc."""
         # self._player1.movements = NONE
@@ -265,28 +285,23 @@ class Application(BaseApp):
 
         # self._exit()
         # raise SystemExit
-        self._surface.fill(BLACK)
-        for player in self._players:
-            if pygame.Rect.colliderect(self._ball.circle, player.rect):
-                self._ball.hit()
-
-        self._player1.update()
-        self._player2.update()
-
-        point = self._ball.update()
-
-        if point == -1:
-            self._player1.score += 1
-        if point == 1:
-            self._player2.score += 1
-
-        if point:
-            self._ball.reset()
-
-        self._player1.display()
-        self._player2.display()
-        self._ball.display()
-
-        self._player1.display_score("Player1", (100, 20), WHITE)
-        self._player2.display_score(
-            "Player2", (self._config.resolution[0]-100, 20), WHITE)
+        alpha = self.alpha
+        background = self._layers.background
+        if not self.dirty_rects:
+            self._layers.clear(self._surface)
+            for entity in self._entities:
+                entity.display(alpha)
+        else:
+            erased = [entity.erase(background) for entity in self._entities]
+            # Labels are drawn again below, over whatever passes under them, like a
+            # full redraw. Only what moved or changed is pushed to the display.
+            for player in self._players:
+                player.erase_score(background)
+            for entity, old in zip(self._entities, erased):
+                drawn = entity.display(alpha)
+                self.mark(drawn if old is None else drawn.union(old))
+
+        # Labels go last, the ball passes under them.
+        self.mark(self._player1.display_score("Player1", (100, 20), WHITE))
+        self.mark(self._player2.display_score(
+            "Player2", (self.resolution[0]-100, 20), WHITE))
@@ -0,0 +1,125 @@
+"""Deterministic lockstep. Both peers run the same seeded engine and exchange nothing
+but their paddle movement for each tick, plus a state digest now and then to catch a
+desync. Play through a relay-only room (`Client(..., relay=True)`), the server passes
+each message on to the other peer."""
+# pylint: disable=too-many-instance-attributes
+from .sim import DOWN, NONE, UP, Court, Engine, Event
+from .typings import Link
+
+# Ticks between taking an input and simulating it, hides that much latency. 50 ms at 60 Hz.
+INPUT_DELAY = 3
+# Ticks between state digests.
+HASH_EVERY = 60
+TICK_WRAP = 1 << 16
+
+
+def unwrap(tick: int, near: int) -> int:
+    """Full tick of a tick sent modulo TICK_WRAP, the one closest to near"""
+    return near + (tick - near + TICK_WRAP // 2) % TICK_WRAP - TICK_WRAP // 2
+
+
+class Lockstep:
+    """One peer of a lockstep match, playing player (1 or 2). Call `advance` once per
+    tick with the local movement: it is sent for `delay` ticks later, and the next tick
+    is simulated if the other peer's input for it has arrived. Peers must share seed and
+    court. `desync` is the first tick whose digests differed, None while in sync."""
+
+    def __init__(self,
+                 link: Link,
+                 player: int,
+                 seed: int,
+                 court: Court = Court(),
+                 delay: int = INPUT_DELAY,
+                 hash_every: int = HASH_EVERY) -> None:  # pylint: disable=too-many-arguments
+        if player not in (1, 2):
+            raise ValueError("Player must be 1 or 2")
+        if not 0 < delay < TICK_WRAP // 2:
+            raise ValueError("Delay must be positive and below half the tick wrap")
+        self.link = link
+        self.player = player
+        self.engine = Engine.deterministic(seed, court)
+        self.delay = delay
+        self.hash_every = hash_every
+        # Movement by tick, the first `delay` ticks are still on both sides
+        self._local = dict.fromkeys(range(delay), NONE)
+        self._remote = dict.fromkeys(range(delay), NONE)
+        # Last tick of the other peer's input received, inputs arrive in order
+        self._confirmed = delay - 1
+        self._digests: dict[int, int] = {}
+        self._theirs: dict[int, int] = {}
+        self.desync: int | None = None
+        self.stalls = 0
+        self.events: list[Event] = []
+
+    @property
+    def tick(self):
+        """Next tick to simulate"""
+        return self.engine.state.tick
+
+    def poll(self):
+        """Take every message received so far. Return how many were from the other peer.
+        Anything malformed, out of range or too late is ignored."""
+        received = 0
+        for body in self.link.messages():
+            if not isinstance(body, dict) or body.get("player") in (None, self.player) \
+                    or not isinstance(body.get("tick"), int):
+                continue
+            kind, tick = body.get("type"), unwrap(body["tick"], self.tick)
+            if kind == "step":
+                movement = body.get("movement")
+                if not isinstance(movement, int) or movement not in (NONE, UP, DOWN) \
+                        or tick < self.tick:
+                    continue
+                self._remote[tick] = movement
+                self._confirmed = max(self._confirmed, tick)
+            elif kind == "checksum":
+                # Ours for a tick passed is already compared, or pruned
+                if not isinstance(body.get("digest"), int) \
+                        or (tick <= self.tick and tick not in self._digests):
+                    continue
+                self._theirs[tick] = body["digest"]
+                self._compare(tick)
+            else:
+                continue
+            received += 1
+        self._prune()
+        return received
+
+    def _prune(self):
+        # The other peer sends its digest of a tick before its input for `delay` ticks
+        # later: ours still waiting past that will never be matched.
+        stale = self._confirmed - self.delay
+        for tick in [tick for tick in self._digests if tick <= stale]:
+            del self._digests[tick]
+
+    def _compare(self, tick: int):
+        if tick not in self._digests or tick not in self._theirs:
+            return
+        if self._digests.pop(tick) != self._theirs.pop(tick) and self.desync is None:
+            self.desync = tick
+
+    def advance(self, movement: int) -> bool:
+        """Simulate the next tick if both inputs for it are in. Return whether it was."""
+        if movement not in (NONE, UP, DOWN):
+            raise ValueError("Expected NONE, DOWN, UP constant or 0, -1, 1")
+        self.poll()
+        tick = self.tick
+        if tick not in self._remote:
+            self.stalls += 1
+            return False
+        local, remote = self._local.pop(tick), self._remote.pop(tick)
+        self.events = self.engine.step((local, remote) if self.player == 1 else (remote, local))
+        ahead = tick + self.delay
+        self._local[ahead] = movement
+        self.link.push({"type": "step", "tick": ahead % TICK_WRAP,
+                        "player": self.player, "movement": movement})
+        if self.tick % self.hash_every == 0:
+            self._digests[self.tick] = digest = self.engine.digest()
+            self.link.push({"type": "checksum", "tick": self.tick % TICK_WRAP,
+                            "player": self.player, "digest": digest})
+            self._compare(self.tick)
+        return True
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} player={self.player} tick={self.tick} \
+stalls={self.stalls} desync={self.desync}>"
@@ -0,0 +1,184 @@
+"""Client side netcode. The local paddle moves as soon as it is pressed and is corrected
+by the server state, the ball and the other paddle are drawn a little in the past,
+interpolated between server states."""
+from collections import deque
+from itertools import islice
+from time import monotonic
+from typing import Any, Callable
+
+from .sim import DOWN, NONE, UP, Court
+from .typings import Link
+
+# Seconds remote entities are drawn behind the server, three states at 30 Hz.
+INTERP_DELAY = 0.1
+SNAPSHOTS = 32
+# Inputs not acknowledged yet kept for replay, two seconds at 30 Hz.
+HISTORY = 64
+# A state arriving this much later than expected means the server clock jumped, a
+# match that slept for instance: take its clock again.
+RESYNC_AFTER = 1.
+INTERPOLATED = ("ball_x", "ball_y", "player1", "player2")
+
+
+class Prediction:
+    """Local paddle of a networked match. `apply` moves it at once and numbers the
+    input, `reconcile` puts it where the server has it and replays the inputs the server
+    has not applied yet. `court` must be the one the server simulates."""
+
+    def __init__(self, court: Court, y: int = 0) -> None:
+        self.court = court
+        self.y = y
+        self.seq = 0
+        self.history: deque[tuple[int, int]] = deque(maxlen=HISTORY)
+        self.error = 0
+
+    def _move(self, y: int, movement: int):
+        # Same clamp as Engine.step
+        court = self.court
+        top = y + court.paddle_speed * movement
+        if top <= 0:
+            return 0
+        if top + court.paddle_height >= court.height:
+            return court.height - court.paddle_height
+        return top
+
+    def apply(self, movement: int) -> int:
+        """Move the paddle now. Return the input sequence number."""
+        if movement not in (NONE, UP, DOWN):
+            raise ValueError("Expected NONE, DOWN, UP constant or 0, -1, 1")
+        self.seq += 1
+        self.history.append((self.seq, movement))
+        self.y = self._move(self.y, movement)
+        return self.seq
+
+    def reconcile(self, y: int, ack: int):
+        """Take y, the server position once input ack is applied, and replay the newer
+        inputs on top. Return the correction in pixels, 0 if the prediction was right."""
+        history = self.history
+        while history and history[0][0] <= ack:
+            history.popleft()
+        for _, movement in history:
+            y = self._move(y, movement)
+        self.error = y - self.y
+        self.y = y
+        return self.error
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} y={self.y} seq={self.seq} unacked={len(self.history)}>"
+
+
+class SnapshotBuffer:
+    """Server states in tick order, read back `delay` seconds behind the server clock and
+    interpolated between the two states around that time. The server clock is the
+    state tick over the tick rate, offset by the quickest arrival seen."""
+
+    def __init__(self, tickrate: int, delay: float = INTERP_DELAY, size: int = SNAPSHOTS) -> None:
+        self.tickrate = tickrate
+        self.delay = delay
+        self._states: deque[dict[str, Any]] = deque(maxlen=size)
+        self._offset: float | None = None
+
+    def __len__(self):
+        return len(self._states)
+
+    @property
+    def latest(self):
+        """Newest state, None if there is none"""
+        return self._states[-1] if self._states else None
+
+    def push(self, state: dict[str, Any], now: float):
+        """Store a state received at now. Older or repeated ticks are ignored."""
+        states = self._states
+        if states and state["tick"] <= states[-1]["tick"]:
+            return False
+        offset = now - state["tick"] / self.tickrate
+        if self._offset is None or offset < self._offset or offset - self._offset > RESYNC_AFTER:
+            self._offset = offset
+        states.append(state)
+        return True
+
+    def sample(self, now: float) -> dict[str, Any] | None:
+        """State at now minus delay, None before the first state. Held at the oldest or
+        newest state outside the buffer, never extrapolated."""
+        states = self._states
+        if not states or self._offset is None:
+            return None
+        tick = (now - self._offset - self.delay) * self.tickrate
+        if tick <= states[0]["tick"]:
+            return states[0]
+        if tick >= states[-1]["tick"]:
+            return states[-1]
+        # tick is before the newest state, the loop breaks on it at the latest
+        older, newer = states[0], states[-1]
+        for state in islice(states, 1, None):
+            if state["tick"] >= tick:
+                newer = state
+                break
+            older = state
+        if (older["score1"], older["score2"]) != (newer["score1"], newer["score2"]):
+            # The ball was served in between, do not draw it crossing the court
+            return older
+        fraction = (tick - older["tick"]) / (newer["tick"] - older["tick"])
+        sample = dict(older)
+        for field in INTERPOLATED:
+            sample[field] = older[field] + (newer[field] - older[field]) * fraction
+        return sample
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} states={len(self)} delay={self.delay}>"
+
+
+class NetPlay:
+    """A server simulated match as seen by player (1 or 2). Call `tick` at the match tick
+    rate with the local movement, `poll` whenever convenient and `view` once per frame.
+    `court` and `tickrate` must match the server's, `Court().at(tickrate)` for
+    `RoomManager(engine=Engine.at)`."""
+
+    def __init__(self,
+                 link: Link,
+                 player: int,
+                 court: Court,
+                 tickrate: int,
+                 delay: float = INTERP_DELAY,
+                 clock: Callable[[], float] = monotonic) -> None:  # pylint: disable=too-many-arguments
+        if player not in (1, 2):
+            raise ValueError("Player must be 1 or 2")
+        self.link = link
+        self.player = player
+        self.prediction = Prediction(court)
+        self.snapshots = SnapshotBuffer(tickrate, delay)
+        self._clock = clock
+        self._paddle = f"player{player}"
+        self._ack = f"ack{player}"
+
+    def tick(self, movement: int):
+        """Move the local paddle and send the input. Return its sequence number."""
+        seq = self.prediction.apply(movement)
+        self.link.push({"type": "input", "player": self.player,
+                        "movement": movement, "seq": seq})
+        return seq
+
+    def poll(self):
+        """Take every state received so far. Return how many there were."""
+        now = self._clock()
+        received = 0
+        for body in self.link.messages():
+            if not isinstance(body, dict) or body.get("type") != "sync":
+                continue
+            if self.snapshots.push(body, now):
+                self.prediction.reconcile(body[self._paddle], body[self._ack])
+                received += 1
+        return received
+
+    def view(self) -> dict[str, Any] | None:
+        """State to draw now: remote entities interpolated, the local paddle predicted.
+        None until the first state arrives."""
+        state = self.snapshots.sample(self._clock())
+        if state is None:
+            return None
+        state = dict(state)
+        state[self._paddle] = self.prediction.y
+        return state
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} player={self.player} {self.prediction!r}>"
@@ -0,0 +1,133 @@
+"""Rollback netcode. Like lockstep both peers run the same seeded engine and exchange
+only inputs, but a peer does not wait for the other's input: it predicts it (the last
+one received, repeated) and simulates on. When the real input differs from the
+prediction, the state of that tick is restored from a snapshot ring and the ticks since
+are simulated again, all before the next frame is drawn."""
+# pylint: disable=too-many-instance-attributes
+from array import array
+
+from .lockstep import TICK_WRAP, unwrap
+from .sim import DOWN, NONE, UP, Court, Engine, Event, SnapshotRing
+from .sim.ring import RING_SIZE
+from .typings import Link
+
+# Ticks a peer simulates past the last input received from the other one at most, it
+# stalls beyond. Bounds the ticks simulated again by one rollback, 133 ms at 60 Hz.
+MAX_PREDICTION = 8
+# Ticks between taking an input and simulating it. One keeps most rollbacks short.
+ROLLBACK_DELAY = 1
+
+
+class Rollback:
+    """One peer of a rollback match, playing player (1 or 2). Call `advance` once per
+    tick with the local movement, then draw `engine.state`. Peers must share seed and
+    court. Inputs live in preallocated arrays and snapshots in a `SnapshotRing`, a tick
+    allocates nothing but what `Engine.step` does."""
+
+    def __init__(self,
+                 link: Link,
+                 player: int,
+                 seed: int,
+                 court: Court = Court(),
+                 delay: int = ROLLBACK_DELAY,
+                 max_prediction: int = MAX_PREDICTION,
+                 size: int = RING_SIZE) -> None:  # pylint: disable=too-many-arguments
+        if player not in (1, 2):
+            raise ValueError("Player must be 1 or 2")
+        if delay < 0 or max_prediction < 0 or delay + max_prediction >= size:
+            raise ValueError("Delay and prediction must fit in the ring")
+        self.link = link
+        self.player = player
+        self.engine = Engine.deterministic(seed, court)
+        self.delay = delay
+        self.max_prediction = max_prediction
+        self.ring = SnapshotRing(self.engine.state, size)
+        # The other peer runs up to its own prediction window ahead, inputs need twice
+        # the ring to cover both.
+        self._span = span = size * 2
+        self._local = array('b', [NONE] * span)
+        self._remote = array('b', [NONE] * span)
+        self._used = array('b', [NONE] * span)
+        # Last tick of the other peer's input received, inputs arrive in order
+        self._confirmed = delay - 1
+        self._rollback: int | None = None
+        self.events: list[Event] = []
+        self.stalls = 0
+        self.rollbacks = 0
+        self.resimulated = 0
+
+    @property
+    def tick(self):
+        """Next tick to simulate"""
+        return self.engine.state.tick
+
+    @property
+    def confirmed(self):
+        """Last tick the other peer's input is known for"""
+        return self._confirmed
+
+    def _predict(self, tick: int) -> int:
+        if tick <= self._confirmed:
+            return self._remote[tick % self._span]
+        if self._confirmed < 0:
+            return NONE
+        return self._remote[self._confirmed % self._span]
+
+    def _simulate(self):
+        tick = self.tick
+        slot = tick % self._span
+        self.ring.save()
+        local, remote = self._local[slot], self._predict(tick)
+        self._used[slot] = remote
+        self.events = self.engine.step((local, remote) if self.player == 1 else (remote, local))
+
+    def poll(self):
+        """Take every input received so far, roll back and simulate again from the first
+        one predicted wrong. Return how many ticks were simulated again. Malformed or
+        out of range inputs are ignored."""
+        for body in self.link.messages():
+            if not isinstance(body, dict) or body.get("type") != "step" \
+                    or body.get("player") in (None, self.player) \
+                    or not isinstance(body.get("tick"), int):
+                continue
+            tick, movement = unwrap(body["tick"], self.tick), body.get("movement")
+            if tick <= self._confirmed or not isinstance(movement, int) \
+                    or movement not in (NONE, UP, DOWN):
+                continue
+            slot = tick % self._span
+            self._remote[slot] = movement
+            self._confirmed = tick
+            if tick < self.tick and self._used[slot] != movement \
+                    and (self._rollback is None or tick < self._rollback):
+                self._rollback = tick
+        if self._rollback is None:
+            return 0
+        end, tick = self.tick, self._rollback
+        self._rollback = None
+        self.ring.restore(tick)
+        self.rollbacks += 1
+        self.resimulated += end - tick
+        while self.tick < end:
+            self._simulate()
+        return end - tick
+
+    def advance(self, movement: int) -> bool:
+        """Simulate the next tick unless too far ahead of the other peer. Return whether
+        it was."""
+        if movement not in (NONE, UP, DOWN):
+            raise ValueError("Expected NONE, DOWN, UP constant or 0, -1, 1")
+        self.poll()
+        tick = self.tick
+        if tick - self._confirmed > self.max_prediction:
+            self.stalls += 1
+            return False
+        ahead = tick + self.delay
+        self._local[ahead % self._span] = movement
+        self.link.push({"type": "step", "tick": ahead % TICK_WRAP,
+                        "player": self.player, "movement": movement})
+        self._simulate()
+        return True
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} player={self.player} tick={self.tick} \
+confirmed={self._confirmed} rollbacks={self.rollbacks} stalls={self.stalls}>"
@@ -0,0 +1,253 @@
+"""Server side room manager. Hosts many matches in one process, a single heap scheduler
+advances each of them at its own tick rate."""
+# pylint: disable=too-many-instance-attributes
+from collections import deque
+from heapq import heappop, heappush
+from itertools import count
+from logging import getLogger
+from time import monotonic
+from typing import Callable
+
+from .sim import DOWN, NONE, UP, Engine, Event
+from .sim.bot import NORMAL, Bot
+
+Logger = getLogger("server.rooms")
+
+# Matches with no input for this long stop ticking until the next input.
+IDLE_AFTER = 10
+# A match late by more than this many ticks skips them instead of catching up.
+MAX_CATCHUP = 5
+JITTER_SAMPLES = 4096
+# Tick rate of simulated matches. Swept collision keeps 30 Hz as accurate as 60 Hz.
+TICKRATE = 30
+# Numbered inputs queued per player, the oldest are dropped past this.
+MAX_PENDING = 8
+
+
+class Match:
+    """A match hosted in a room. `on_tick` is called once per tick with the match. With an
+    engine the match is simulated server side, players 1 and 2 drive its paddles."""
+
+    def __init__(self,
+                 room: str,
+                 tickrate: int = 60,
+                 on_tick: Callable[["Match"], object] | None = None,
+                 engine: Engine | None = None) -> None:
+        if tickrate <= 0:
+            raise ValueError("Tick rate must be positive")
+        self.room = room
+        self.tickrate = tickrate
+        self.interval = 1 / tickrate
+        self.on_tick = on_tick
+        self.tick = 0
+        self.inputs: dict[int, int] = {}
+        self.last_input = 0.
+        self.deadline = 0.
+        self.asleep = False
+        self.closed = False
+        self.generation = 0
+        self.engine = engine
+        self.events: list[Event] = []
+        self.bots: dict[int, Bot] = {}
+        self.pending: dict[int, deque[tuple[int, int]]] = {}
+        self.acks: dict[int, int] = {}
+
+    def push_input(self, player: int, movement: int, now: float, seq: int | None = None):
+        """Store player input, applied on the next tick. Numbered inputs (`seq`) are
+        queued instead and applied one per tick, in order, the last applied is in `acks`."""
+        if seq is None:
+            self.inputs[player] = movement
+        else:
+            self.pending.setdefault(player, deque(maxlen=MAX_PENDING)).append((seq, movement))
+        self.last_input = now
+
+    def add_bot(self, player: int, reaction: int | None = None, error: int = NORMAL[1]):
+        """Let a bot play player (1 or 2), its input replaces the player's. The reaction
+        defaults to the NORMAL one, in ticks of this match like in `packs.gui`."""
+        if self.engine is None:
+            raise ValueError("Bots need a simulated match")
+        if reaction is None:
+            reaction = round(NORMAL[0] * self.tickrate / 60)
+        bot = Bot(self.engine.state, player - 1, reaction, error)
+        self.bots[player] = bot
+        return bot
+
+    def step(self):
+        """Advance one tick"""
+        self.tick += 1
+        for player, queue in self.pending.items():
+            # Every numbered input moves the paddle exactly once, the client predicted
+            # just that. None due means no movement, not the last one repeated.
+            if queue:
+                self.acks[player], self.inputs[player] = queue.popleft()
+            else:
+                self.inputs[player] = 0
+        for player, bot in self.bots.items():
+            self.inputs[player] = bot.decide()
+        if self.engine is not None:
+            self.events = self.engine.step((self.inputs.get(1, 0), self.inputs.get(2, 0)))
+        if self.on_tick is not None:
+            self.on_tick(self)
+
+    def snapshot(self):
+        """State of a simulated match as a "sync" message body: the engine snapshot and
+        the last numbered input applied for each player"""
+        if self.engine is None:
+            raise ValueError("Only simulated matches have a state")
+        body = self.engine.snapshot()
+        body.update(type="sync", ack1=self.acks.get(1, 0), ack2=self.acks.get(2, 0))
+        return body
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} room={self.room} tick={self.tick} \
+rate={self.tickrate} asleep={self.asleep}>"
+
+
+class RoomManager:
+    """Hosts matches by room name and schedules their ticks on one heap. `engine` makes
+    a simulation engine for every match opened, given its tick rate (`Engine.at`), None
+    hosts relay-only matches."""
+
+    def __init__(self,
+                 idle_after: float = IDLE_AFTER,
+                 clock: Callable[[], float] = monotonic,
+                 engine: Callable[[int], Engine] | None = None,
+                 tickrate: int = TICKRATE) -> None:
+        self._matches: dict[str, Match] = {}
+        self._heap: list[tuple[float, int, int, Match]] = []
+        self._order = count()
+        self._idle_after = idle_after
+        self._clock = clock
+        self._engine = engine
+        self.tickrate = tickrate
+        self.jitter: deque[float] = deque(maxlen=JITTER_SAMPLES)
+        self.steps = 0
+        # Ticks dropped by matches too late to catch up, see MAX_CATCHUP
+        self.skipped = 0
+
+    def __len__(self):
+        return len(self._matches)
+
+    def __contains__(self, room: str):
+        return room in self._matches
+
+    @property
+    def awake(self):
+        """Count of matches ticking"""
+        return sum(not match.asleep for match in self._matches.values())
+
+    def get(self, room: str):
+        """Return match of room, None if there is none"""
+        return self._matches.get(room)
+
+    def _schedule(self, match: Match, deadline: float):
+        match.deadline = deadline
+        heappush(self._heap, (deadline, next(self._order), match.generation, match))
+
+    def open(self,
+             room: str,
+             tickrate: int | None = None,
+             on_tick: Callable[[Match], object] | None = None,
+             relay: bool = False):
+        """Open a match in room, return the existing one if already open. Ticks at the
+        manager tick rate unless given. A relay match has no engine and never ticks, its
+        peers simulate it themselves."""
+        if room in self._matches:
+            return self._matches[room]
+        tickrate = tickrate or self.tickrate
+        engine = self._engine(tickrate) if self._engine is not None and not relay else None
+        match = Match(room, tickrate, on_tick, engine)
+        now = self._clock()
+        match.last_input = now
+        self._matches[room] = match
+        if not relay:
+            self._schedule(match, now + match.interval)
+        return match
+
+    def close(self, room: str):
+        """Close match of room"""
+        match = self._matches.pop(room, None)
+        if match is not None:
+            match.closed = True
+        return match
+
+    def wake(self, match: Match):
+        """Wake a sleeping match, it ticks again from now"""
+        if not match.asleep or match.closed:
+            return
+        match.asleep = False
+        match.generation += 1
+        self._schedule(match, self._clock() + match.interval)
+
+    def push_input(self, room: str, player: int, movement: int, seq: int | None = None):
+        """Route player input to the match of room, waking it up if asleep"""
+        match = self._matches.get(room)
+        if match is None:
+            return None
+        match.push_input(player, movement, self._clock(), seq)
+        self.wake(match)
+        return match
+
+    def route_input(self, room: str, body):
+        """Route a "paddle" or numbered "input" message body to the match of room.
+        Anything else, or out of range, is ignored. Return the match if routed."""
+        if not isinstance(body, dict) or body.get("type") not in ("paddle", "input"):
+            return None
+        player, movement = body.get("player"), body.get("movement")
+        if not isinstance(player, int) or not isinstance(movement, int):
+            return None
+        if player not in (1, 2) or movement not in (NONE, UP, DOWN):
+            return None
+        seq = body.get("seq") if body["type"] == "input" else None
+        if seq is not None and not isinstance(seq, int):
+            return None
+        return self.push_input(room, player, movement, seq)
+
+    def next_deadline(self) -> float | None:
+        """Deadline of the next due tick, None if nothing is scheduled"""
+        while self._heap:
+            _, _, generation, match = self._heap[0]
+            if match.closed or match.asleep or generation != match.generation:
+                heappop(self._heap)
+                continue
+            return match.deadline
+        return None
+
+    def timeout(self, maximum: float) -> float:
+        """Seconds until the next due tick, capped to maximum. Use as select timeout."""
+        deadline = self.next_deadline()
+        if deadline is None:
+            return maximum
+        return min(maximum, max(0., deadline - self._clock()))
+
+    def advance(self) -> int:
+        """Run every tick that is due. Return ticks run."""
+        now = self._clock()
+        ran = 0
+        while self._heap and self._heap[0][0] <= now:
+            deadline, _, generation, match = heappop(self._heap)
+            if match.closed or match.asleep or generation != match.generation:
+                continue
+            self.jitter.append(now - deadline)
+            try:
+                match.step()
+            except Exception:  # pylint: disable=broad-exception-caught
+                # A broken match must not stop the others sharing the scheduler
+                Logger.exception("Match of room %s failed, closing it", match.room)
+                self.close(match.room)
+                continue
+            ran += 1
+            # Bots playing both sides never run out of input, such a match never idles.
+            if now - match.last_input >= self._idle_after and not {1, 2} <= match.bots.keys():
+                match.asleep = True
+                continue
+            deadline += match.interval
+            if now - deadline > match.interval * MAX_CATCHUP:
+                self.skipped += int((now - deadline) // match.interval) + 1
+                deadline = now + match.interval
+            self._schedule(match, deadline)
+        self.steps += ran
+        return ran
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} matches={len(self._matches)} awake={self.awake}>"
@@ -1,21 +1,26 @@
 """Server library"""
-from binascii import Error as BinasciiError
 from selectors import DefaultSelector, SelectorKey
 from socket import AF_INET, SOCK_STREAM
 from socket import socket as SocketClass
 from threading import Event, Thread
-from time import sleep
+from time import monotonic, perf_counter
 from traceback import format_exception
+from typing import Any
 
 
-from .connection import (EVENT_READ, BaseMessage, IOMessage, Message,
-                         event_read, make_message,
-                         validate_message)
-from .errors import StateError
+from .connection import (CHOICE_HEADER, EVENT_READ, EVENT_WRITE,
+                         OFFER_HEADER, PEER_TYPES, READ_WRITE, RELAY_HEADER,
+                         ROOM_HEADER, IOMessage,
+                         Message,
+                         choose_codec, encode_as, event_read, event_write, frame,
+                         make_message, validate_message)
+from .backpressure import Backpressure, snapshot_key
+from .errors import StateError, ValidationError
 from .locals import LOG_DIR
 from .logging import FileConfig, SetupConfig, setup_logger
+from .rooms import Match, RoomManager
 from .status import StatusEnum
-from .typings import Addr, ServerAddr
+from .typings import ServerAddr
 from .tools import transform_error
 from .utils import map_addr
 
@@ -30,118 +35,178 @@ Logger, FileHandler, Console = setup_logger("server", CONFIG)
 # DEVNOTE: I hate this.
 
 
-class Server:  # pylint: disable=too-many-instance-attributes
-    """Base Server class"""
+class BaseServer:  # pylint: disable=too-many-instance-attributes
+    """Protocol shared by the server backends: codec negotiation, rooms, broadcast and
+    the server lifecycle. Backends own the transport, they implement `_do_send`,
+    `_last_words` and the `_serve_forever`/`_shutdown` pair, and call `_add_client`,
+    `_remove_client` and `_do_read` as connections come, go and send frames."""
 
-    def __init__(self, addr: ServerAddr, listen_for: int = 0) -> None:
+    def __init__(self,
+                 addr: ServerAddr,
+                 listen_for: int = 0,
+                 policy: Backpressure | None = None,
+                 rooms: RoomManager | None = None) -> None:
         self._addr = addr
         self._host, self._port = addr
         self._socket = SocketClass(AF_INET, SOCK_STREAM)
         # self._socket = LoggedSocket(AF_INET, SOCK_STREAM)
         # self._socket.put_logger(Logger)
         self._has_binded = False
-        self._selector = DefaultSelector()
         self._closed = False
         self._running = Event()
-        self._thread = None
+        self._thread: Thread | None = None
         self._connections = listen_for
-        self._clients: list[SocketClass] = []
+        # Connection (socket or protocol) to its holder, in connection order
+        self._clients: dict[Any, IOMessage] = {}
+        # Clients by room (None, those in no room), a room broadcast only visits its own
+        self._members: dict[str | None, dict[Any, IOMessage]] = {}
+        self._policy = policy or Backpressure()
+        self._rooms = rooms
         self._placeholder = addr == ("", 0)
 
-    def _reject_accept(self, client: SocketClass, addr: Addr):
-        client.send(transform_error(
-            "Server is full", StatusEnum.ENOROOM))  # type: ignore
+    @property
+    def closed(self):
+        """Is server closed?"""
+        return self._closed
+
+    @property
+    def running(self):
+        """Is server running?"""
+        return self._running.is_set()
+
+    @property
+    def policy(self):
+        """Backpressure policy of client connections"""
+        return self._policy
+
+    def _full(self):
+        return 0 < self._connections <= len(self._clients)
+
+    def _add_client(self, conn, holder: IOMessage):
+        self._clients[conn] = holder
+        self._members.setdefault(holder.room, {})[conn] = holder
+
+    def _remove_client(self, conn):
+        """Forget a client, closing its match if it was the last one in the room. Return
+        whether it was still a client."""
+        holder = self._clients.pop(conn, None)
+        if holder is None:
+            return False
+        self._unlist(conn, holder)
+        self._leave(holder)
+        return True
+
+    def _unlist(self, conn, holder: IOMessage):
+        members = self._members.get(holder.room)
+        if members is None:
+            return
+        members.pop(conn, None)
+        if not members and holder.room is not None:
+            del self._members[holder.room]
+
+    def _move(self, conn, holder: IOMessage, room: str | None):
+        """Put a client in room, the room index follows"""
+        if conn in self._clients:
+            self._unlist(conn, holder)
+            self._members.setdefault(room, {})[conn] = holder
+        holder.room = room
+
+    def _do_send(self, conn, data: bytes, force: bool = False, key: str | None = None) -> bool:
+        raise NotImplementedError
+
+    def _last_words(self, conn, holder: IOMessage, data: bytes):
+        raise NotImplementedError
+
+    def _evict(self, conn, holder: IOMessage):
+        Logger.warning("Client %s stayed over its outbound budget (%s bytes queued), evicting",
+                       map_addr(holder.address), holder.queued)
+        holder.drop_queued()
+        self._last_words(conn, holder, transform_error(
+            "Connection is too slow", StatusEnum.EOVERLOAD, holder.codec))  # type: ignore
+
+    def _refuse(self, conn, holder: IOMessage):
         Logger.info(
             "Connection at client: %s aborted, only allows %s connected clients",
-            map_addr(addr),
+            map_addr(holder.address),
             self._connections)
-        sleep(0.2)
-        client.close()
-
-    def _accept(self):
-        client, address = self._socket.accept()
-        client.setblocking(False)
-        if len(self._clients) == self._connections and self._connections > 0:
-            self._reject_accept(client, address)
-            return
-        Logger.info("Connected at client: %s", map_addr(address))
-        request = IOMessage(address)
-        request.socket = client
-        self._selector.register(client, EVENT_READ, request)
-        self._clients.append(client)
+        self._last_words(conn, holder, transform_error(
+            "Server is full", StatusEnum.ENOROOM))  # type: ignore
 
-    def _serve_client(self, key: SelectorKey, mask: int):
-        Logger.debug(
-            "Client %s attempt to %s", map_addr(key.data), "READ" if mask & EVENT_READ else 'NULL')
-        if mask & EVENT_READ:
-            closed = event_read(key, self._selector)
-            data: IOMessage = key.data
-            if closed:
-                Logger.info(
-                    "Connection to client %s has been closed", map_addr(data.address))
-                self._clients.remove(key.fileobj)  # type: ignore
-                return
-            # Logger.debug(data.output)
-            self._do_read(key.fileobj, Message(data.output))  # type: ignore
-        # if mask & EVENT_WRITE:
-        #     closed = event_write(key, self._selector)
-        #     data: IORequest = key.data
-        #     if closed:
-        #         Logger.info(
-        #             F"Connection to client {data.address[0]}:{data.address[1]} has been closed"
-        #         )
-        #         self._client_sock = None
-        #         return
+    def _negotiate(self, conn, holder: IOMessage, offered):
+        holder.codec = choose_codec(offered)
+        Logger.info("Client %s uses %s codec", map_addr(holder.address), holder.codec)
+        self._do_send(conn, frame(make_message("", {CHOICE_HEADER: holder.codec})))
 
-    def _close_client(self, client: SocketClass):
+    def _do_read(self, conn, holder: IOMessage, request: Message):
         try:
-            client.send(make_message("You there?", {}))
-        except ConnectionResetError:
-            pass
-        else:
-            return
-        client.close()
-        self._clients.remove(client)
-        self._selector.unregister(client)
-
-    def _do_read(self, socket: SocketClass, request: BaseMessage):
-        data = request.json()
-        Logger.debug(
-            "Current socket is main socket? %s", socket == self._socket)
+            data = request.json()
+        except ValidationError:
+            data = {}
         if not validate_message(data):  # type: ignore
-            # Logger.debug("what?")
-            socket.send(transform_error(
-                "Invalid message data", StatusEnum.EBADREQ))  # type: ignore
+            self._do_send(conn, frame(transform_error(
+                "Invalid message data", StatusEnum.EBADREQ, holder.codec)))  # type: ignore
             return
-        events = self._selector.get_map()
-        for _, key in events.items():
-            if key.data is None:
-                continue
-            sock: SocketClass = key.data.socket
-            self._do_send(sock, request=request, echo=data != "")
+        headers = data['headers']
+        if OFFER_HEADER in headers:
+            self._negotiate(conn, holder, headers[OFFER_HEADER])
+        if ROOM_HEADER in headers:
+            self._join(conn, holder, headers[ROOM_HEADER], bool(headers.get(RELAY_HEADER)))
+        if OFFER_HEADER in headers or ROOM_HEADER in headers:
+            return
+        body = data['body']
+        if self._rooms is not None and holder.room is not None:
+            self._route_input(holder.room, body)
+        peer = isinstance(body, dict) and body.get("type") in PEER_TYPES
+        self.broadcast(request, holder.room, conn if peer else None)
 
-    def _do_send(self, socket: SocketClass, request: BaseMessage, echo: bool = True):
-        if echo:
-            try:
-                # Logger.debug(
-                # f"{ip} -> Decoded {request.unpack_raw()} RAW -> {request.raw_body()}")
-                request.unpack_raw()
-                socket.send(request.raw_body())
-            except BinasciiError:
-                socket.send(transform_error(
-                    "Invalid message data", StatusEnum.EBADREQ))  # type: ignore
-            except ConnectionResetError:
-                self._close_client(socket)
+    def _route_input(self, room: str, body):
+        """Hand paddle input to the match hosted in room"""
+        self._rooms.route_input(room, body)  # type: ignore
 
-    @property
-    def closed(self):
-        """Is server closed?"""
-        return self._closed
+    def _join(self, conn, holder: IOMessage, room,  # pylint: disable=unused-argument
+              relay: bool = False):
+        self._move(conn, holder, str(room) if room is not None else None)
+        Logger.info("Client %s joined room %s", map_addr(holder.address), holder.room)
+        if self._rooms is not None and holder.room is not None:
+            self._rooms.open(holder.room, on_tick=self._publish, relay=relay)
 
-    @property
-    def running(self):
-        """Is server running?"""
-        return self._running.is_set()
+    def _publish(self, match: Match):
+        """Broadcast the state of a simulated match to its room"""
+        if match.engine is None:
+            return
+        self.broadcast(Message(make_message(match.snapshot(), {}, "binary")), match.room)
+
+    def _leave(self, holder: IOMessage):
+        """Close the match of holder room once its last client is gone"""
+        if self._rooms is None or holder.room is None:
+            return
+        if self._members.get(holder.room):
+            return
+        if self._rooms.close(holder.room) is not None:
+            Logger.info("Room %s is empty, match closed", holder.room)
+
+    def broadcast(self, request: Message, room: str | None = None, exclude=None):
+        """Broadcast a message to every client in room (None, those in no room) but exclude.
+        The message is validated once and framed once per codec, every client using a codec
+        is sent the same buffer. Return count of clients sent to."""
+        started = perf_counter()
+        try:
+            request.json()
+        except ValidationError:
+            return 0
+        framed: dict[str, bytes] = {}
+        key = snapshot_key(request)
+        sent = 0
+        for conn, holder in tuple(self._members.get(room, {}).items()):
+            if conn is exclude:
+                continue
+            data = framed.get(holder.codec)
+            if data is None:
+                data = framed[holder.codec] = frame(encode_as(request, holder.codec))
+            sent += self._do_send(conn, data, key=key)
+        Logger.debug("Broadcast %s codecs to %s clients in %.1f us",
+                     len(framed), sent, (perf_counter() - started) * 1e6)
+        return sent
 
     def setup(self):
         """Setup server"""
@@ -152,28 +217,26 @@ class Server:  # pylint: disable=too-many-instance-attributes
         self._socket.bind((self._host, self._port))
         self._socket.setblocking(False)
         self._socket.listen()
+        self._has_binded = True
         Logger.info("Listening at %s", map_addr(self._addr))
-        self._selector.register(self._socket, EVENT_READ)
+
+    def _serve_forever(self):
+        """Serve until stopped, set `_running` once listening"""
+        raise NotImplementedError
+
+    def _shutdown(self):
+        """Release what `_serve_forever` left behind"""
 
     def _main_loop(self):
         if self._placeholder:
             raise RuntimeError("Cannot run on placeholder server")
-        self._running.set()
         if self.closed:
             raise StateError(
                 "Cannot re-run server, it has run the task before.")
         try:
             if not self._has_binded:
                 self.setup()
-            while self._running.is_set():
-                events = self._selector.select(1)
-                for key, mask in events:
-                    # print(key.fileobj, mask, f"{mask | EVENT_READ = }",
-                    #   f"{mask | EVENT_WRITE = }")
-                    if key.data is None:
-                        self._accept()
-                    else:
-                        self._serve_client(key, mask)
+            self._serve_forever()
         except (EOFError, KeyboardInterrupt):
             Logger.info("Closing on EOF/Keyboard Interrupt.")
         except Exception as exc:  # pylint: disable=broad-exception-caught
@@ -181,7 +244,8 @@ class Server:  # pylint: disable=too-many-instance-attributes
             (LOG_DIR / "traceback.txt").write_text(''.join(format_exception(exc)))
             Logger.info("Traceback is saved. Loop will be closed.")
         finally:
-            self._selector.close()
+            self._running.clear()
+            self._shutdown()
             self._closed = True
 
         Logger.info("Finished server instance.")
@@ -205,6 +269,146 @@ class Server:  # pylint: disable=too-many-instance-attributes
             return
 
         Logger.info("Stop thread is called. Attempting to close server thread")
+        self._request_stop()
+        self._thread.join()
+
+    def _request_stop(self):
+        """Ask the serving thread to stop"""
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {len(self._clients)}/{self._connections}\
+run={map_addr(self._addr)}>"
+
+
+class Server(BaseServer):
+    """Base Server class"""
+
+    def __init__(self,
+                 addr: ServerAddr,
+                 listen_for: int = 0,
+                 policy: Backpressure | None = None,
+                 rooms: RoomManager | None = None) -> None:
+        super().__init__(addr, listen_for, policy, rooms)
+        self._selector = DefaultSelector()
+        self._closing: dict[SocketClass, IOMessage] = {}
+
+    def _last_words(self, conn: SocketClass, holder: IOMessage, data: bytes):
+        """Send data then close the connection once it is flushed. Nothing else is sent
+        to or read from the client in the meantime."""
+        holder.closing = True
+        holder.closing_since = monotonic()
+        self._remove_client(conn)
+        self._closing[conn] = holder
+        self._do_send(conn, frame(data), force=True)
+
+    def _sweep(self):
+        """Close evicted/rejected clients that could not flush in time"""
+        for client, holder in tuple(self._closing.items()):
+            if self._policy.expired(holder):
+                self._close_client(client)
+
+    def _accept(self):
+        client, address = self._socket.accept()
+        client.setblocking(False)
+        request = IOMessage(address, self._policy.budget)
+        request.socket = client
+        self._selector.register(client, EVENT_READ, request)
+        if self._full():
+            self._refuse(client, request)
+            return
+        Logger.info("Connected at client: %s", map_addr(address))
+        self._add_client(client, request)
+
+    def _serve_client(self, key: SelectorKey, mask: int):
+        Logger.debug(
+            "Client %s attempt to %s", map_addr(key.data), "READ" if mask & EVENT_READ else 'NULL')
+        data: IOMessage = key.data
+        if mask & EVENT_READ:
+            closed = event_read(key, self._selector)
+            if closed:
+                self._client_closed(key)
+                return
+            for payload in data.frames():
+                if data.closing:
+                    continue
+                self._do_read(key.fileobj, data, Message(payload))
+        if mask & EVENT_WRITE and data.queued:
+            closed = event_write(key, self._selector)
+            if closed:
+                self._client_closed(key)
+                return
+            self._policy.relieve(data)
+        if data.closing and not data.queued:
+            self._close_client(key.fileobj)  # type: ignore
+
+    def _client_closed(self, key: SelectorKey):
+        data: IOMessage = key.data
+        Logger.info(
+            "Connection to client %s has been closed", map_addr(data.address))
+        self._remove_client(key.fileobj)
+        self._closing.pop(key.fileobj, None)  # type: ignore
+
+    def _close_client(self, client: SocketClass):
+        self._remove_client(client)
+        self._closing.pop(client, None)
+        try:
+            self._selector.unregister(client)
+        except (KeyError, ValueError):
+            pass
+        client.close()
+
+    def _do_send(self,
+                 conn: SocketClass,
+                 data: bytes,
+                 force: bool = False,
+                 key: str | None = None):
+        """Queue data on the client outbound queue, within the backpressure policy budget
+        unless forced. The client is registered for write events only while it has
+        something queued."""
+        holder: IOMessage = self._selector.get_key(conn).data
+        idle = not holder.queued
+        if force:
+            queued = holder.enqueue(data, True, key)
+        else:
+            queued = self._policy.admit(holder, data, key)
+        if not queued:
+            Logger.warning("Outbound queue of %s is full (%s bytes), dropped %s bytes",
+                           map_addr(holder.address), holder.queued, len(data))
+            if self._policy.should_evict(holder):
+                self._evict(conn, holder)
+            return False
+        if idle:
+            self._selector.modify(conn, READ_WRITE, holder)
+        return True
+
+    def setup(self):
+        super().setup()
+        self._selector.register(self._socket, EVENT_READ)
+
+    def _serve_forever(self):
+        # Running once listening, like AsyncServer
+        self._running.set()
+        while self._running.is_set():
+            timeout = self._rooms.timeout(1) if self._rooms is not None else 1
+            events = self._selector.select(timeout)
+            for key, mask in events:
+                # print(key.fileobj, mask, f"{mask | EVENT_READ = }",
+                #   f"{mask | EVENT_WRITE = }")
+                if key.data is None:
+                    self._accept()
+                elif callable(key.data):
+                    key.data(key, mask)
+                else:
+                    self._serve_client(key, mask)
+            if self._rooms is not None:
+                self._rooms.advance()
+            self._sweep()
+
+    def _shutdown(self):
+        self._selector.close()
+
+    def _request_stop(self):
         # if not self._peer:
         #     client = SocketClass(AF_INET, SOCK_STREAM)
         #     client.connect((self._host, self._port))
@@ -214,14 +418,9 @@ class Server:  # pylint: disable=too-many-instance-attributes
         #     client.recv(1024)
         #     sleep(1)
         #     client.close()
-        # self._running.clear()
-        for sock in self._clients:
+        self._running.clear()
+        for sock in [*self._clients, *self._closing]:
             try:
                 sock.close()
             except Exception:  # pylint: disable=broad-exception-caught
                 pass
-        self._thread.join()
-
-    def __repr__(self) -> str:
-        return f"<{type(self).__name__} {len(self._clients)}/{self._connections}\
-run={map_addr(self._addr)}>"
@@ -0,0 +1,290 @@
+"""Headless Pong simulation. Owns the match rules, `packs.gui` only renders its state,
+servers can step as many engines as they like without pygame."""
+from typing import Sequence
+from zlib import crc32
+
+from .state import (DOWN, HIT, NONE, SCORE, UP, WALL, BallState, Court, Event,
+                    MatchState, PaddleState)
+from .grid import SpatialGrid
+from .ring import SnapshotRing
+from .store import BALL, OBSTACLE, PADDLE, EntityStore
+
+__all__ = ["Engine", "Court", "Event", "MatchState", "BallState", "PaddleState",
+           "EntityStore", "SpatialGrid", "SnapshotRing", "UP", "DOWN", "NONE", "HIT", "WALL",
+           "SCORE", "PADDLE", "BALL", "OBSTACLE", "collide"]
+
+
+def collide(first: tuple[int, int, int, int], second: tuple[int, int, int, int]):
+    """Do two (x, y, width, height) rectangles overlap? Same rule as pygame `colliderect`."""
+    x1, y1, w1, h1 = first
+    x2, y2, w2, h2 = second
+    if not (w1 and h1 and w2 and h2):
+        return False
+    return x1 < x2 + w2 and x2 < x1 + w1 and y1 < y2 + h2 and y2 < y1 + h1
+
+
+# Impacts resolved per ball per step at most, the rest of the step is dropped.
+MAX_IMPACTS = 4
+# Serve direction generator of seeded engines, a 32 bit LCG (Numerical Recipes).
+LCG_MULTIPLIER = 1664525
+LCG_INCREMENT = 1013904223
+
+
+def _impact(x: float, y: float, vx: float, vy: float,
+            left: float, top: float, right: float, bottom: float):
+    """Time in [0, 1] a point moving by (vx, vy) per step enters the box, and whether it
+    enters through a vertical face. None if it does not, or is inside moving out."""
+    if vx:
+        near_x, far_x = (left - x) / vx, (right - x) / vx
+        if near_x > far_x:
+            near_x, far_x = far_x, near_x
+    elif left < x < right:
+        near_x, far_x = float("-inf"), float("inf")
+    else:
+        return None
+    if vy:
+        near_y, far_y = (top - y) / vy, (bottom - y) / vy
+        if near_y > far_y:
+            near_y, far_y = far_y, near_y
+    elif top < y < bottom:
+        near_y, far_y = float("-inf"), float("inf")
+    else:
+        return None
+    enter, leave = max(near_x, near_y), min(far_x, far_y)
+    if enter >= leave or leave <= 0 or enter > 1:
+        return None
+    if enter < 0:
+        # Already overlapping, the paddle moved onto the ball. Bounce once, only while
+        # heading for the paddle centre, so it cannot flip back and forth.
+        if (left + right) / 2 - x and ((left + right) / 2 - x > 0) == (vx > 0):
+            return 0., True
+        return None
+    return enter, near_x >= near_y
+
+
+class Engine:
+    """Steps one match. Call `step` once per tick with the paddle movements. A step runs
+    over the entity store arrays, not over the state views.
+
+    Swept collision (default) moves each ball along its path and resolves paddle and wall
+    impacts at their exact time within the step, so a fast ball or a low tick rate cannot
+    tunnel through a paddle. `swept=False` keeps the per-frame overlap test of the
+    original game, which `BatchEngine` reproduces.
+
+    Paddles and obstacles are colliders. Every ball tests every collider unless a `grid`
+    is given, then a ball only tests those near its path: use one with many balls or
+    obstacles.
+
+    A `seed` makes serves random but reproducible, otherwise a serve sends the ball back
+    the way it came. Two seeded engines without swept collision use integer math only and
+    stay identical given the same inputs, see `deterministic`."""
+
+    def __init__(self,
+                 court: Court = Court(),
+                 swept: bool = True,
+                 grid: SpatialGrid | None = None,
+                 seed: int | None = None) -> None:
+        self.court = court
+        self.swept = swept
+        self.seed = seed
+        self.state = MatchState(court)
+        self._paddles = [paddle.index for paddle in self.state.paddles]
+        self._balls = [self.state.ball.index]
+        self._players = {index: player for player, index in enumerate(self._paddles)}
+        self._colliders = list(self._paddles)
+        self._grid = grid
+        for index in self._colliders:
+            self._register(index)
+        if seed is not None:
+            self.state.rng = seed & 0xFFFFFFFF
+            self.serve()
+
+    def _register(self, index: int):
+        if self._grid is None:
+            return
+        store = self.state.store
+        x, y = store.x[index], store.y[index]
+        self._grid.insert(index, x, y, x + store.w[index], y + store.h[index])
+
+    def add_ball(self, x: int, y: int, dx: int = 1, dy: int = -1):
+        """Put another ball in play. Return its state."""
+        court = self.court
+        ball = BallState.create(self.state.store, x, y, court.ball_radius, court.ball_speed)
+        ball.dx, ball.dy = dx, dy
+        self._balls.append(ball.index)
+        return ball
+
+    def add_obstacle(self, x: int, y: int, width: int, height: int):
+        """Put a fixed box on the court, balls bounce off it. Return its index."""
+        index = self.state.store.add(OBSTACLE, x, y, width, height, 0)
+        self._colliders.append(index)
+        self._register(index)
+        return index
+
+    @classmethod
+    def at(cls, tickrate: int):
+        """Engine for a match stepped tickrate times per second, plays like the 60 Hz game"""
+        return cls(Court().at(tickrate))
+
+    @classmethod
+    def deterministic(cls, seed: int, court: Court = Court()):
+        """Engine for lockstep play: integer math, serves drawn from seed"""
+        return cls(court, swept=False, seed=seed)
+
+    def step(self, inputs: Sequence[int] | None = None) -> list[Event]:
+        """Advance one tick. `inputs` holds a movement (UP, DOWN, NONE) per paddle, the
+        previous movement is kept if omitted. Return what happened."""
+        state = self.state
+        store = state.store
+        xs, ys, ws, hs = store.x, store.y, store.w, store.h
+        vxs, vys, speeds, kinds = store.vx, store.vy, store.speed, store.kind
+        paddles = self._paddles
+        events: list[Event] = []
+        if inputs is not None:
+            for index, movement in zip(paddles, inputs):
+                if movement not in (NONE, UP, DOWN):
+                    raise ValueError("Expected NONE, DOWN, UP constant or 0, -1, 1")
+                vys[index] = movement
+
+        players = self._players
+        for ball in () if self.swept else self._balls:
+            size = ws[ball]
+            left, top = xs[ball] - size // 2, ys[ball] - size // 2
+            for index in self._colliders:
+                # collide(), inlined: this runs for every ball and collider pair
+                if left < xs[index] + ws[index] and xs[index] < left + size \
+                        and top < ys[index] + hs[index] and ys[index] < top + size \
+                        and size and ws[index] and hs[index]:
+                    vxs[ball] = -vxs[ball]
+                    events.append(Event(HIT, players.get(index, -1)))
+
+        width, height = self.court.width, self.court.height
+        scorers: list[tuple[int, int]] = []
+        for index, kind in enumerate(kinds):
+            if kind == OBSTACLE:
+                continue
+            speed = speeds[index]
+            if kind == PADDLE:
+                top = ys[index] + speed * vys[index]
+                if top <= 0:
+                    top = 0
+                elif top + hs[index] >= height:
+                    top = height - hs[index]
+                if top != ys[index]:
+                    ys[index] = top
+                    self._register(index)
+                continue
+            if self.swept:
+                x, _ = self._sweep(index, events)
+            else:
+                x, _ = self._move(index, events)
+            if x <= 0:
+                scorers.append((1, index))
+            elif x >= width:
+                scorers.append((0, index))
+
+        for scorer, ball in scorers:
+            store.score[paddles[scorer]] += 1
+            events.append(Event(SCORE, scorer))
+            self.serve(ball)
+        state.tick += 1
+        return events
+
+    def _move(self, index: int, events: list[Event]):
+        """Move ball, reflect off the top or bottom wall once past it. Return position."""
+        store = self.state.store
+        speed = store.speed[index]
+        x = store.x[index] = store.x[index] + speed * store.vx[index]
+        y = store.y[index] = store.y[index] + speed * store.vy[index]
+        if y <= 0 or y >= self.court.height:
+            store.vy[index] = -store.vy[index]
+            events.append(Event(WALL, -1))
+        return x, y
+
+    def _sweep(self, index: int, events: list[Event]):
+        """Move ball along its path this step, reflecting at the exact time it meets a
+        wall or a paddle (as a box grown by the ball radius). Return position."""
+        store = self.state.store
+        xs, ys, ws, hs = store.x, store.y, store.w, store.h
+        speed, radius, height = store.speed[index], store.w[index] // 2, self.court.height
+        x, y = float(xs[index]), float(ys[index])
+        vx, vy = speed * store.vx[index], speed * store.vy[index]
+        if self._grid is None:
+            candidates = self._colliders
+        else:
+            # Bounces only fold the path back, it stays within a step of the start
+            reach_x, reach_y = abs(vx) + radius, abs(vy) + radius
+            candidates = self._grid.query(x - reach_x, y - reach_y, x + reach_x, y + reach_y)
+        remaining = 1.
+        for _ in range(MAX_IMPACTS):
+            when, what, normal_x = remaining, None, False
+            if vy:
+                wall = max(0., ((0 if vy < 0 else height) - y) / vy)
+                if wall <= when:
+                    when, what = wall, WALL
+            for collider in candidates:
+                impact = _impact(x, y, vx, vy, xs[collider] - radius, ys[collider] - radius,
+                                 xs[collider] + ws[collider] + radius,
+                                 ys[collider] + hs[collider] + radius)
+                if impact is not None and impact[0] < when:
+                    when, what, normal_x = impact[0], collider, impact[1]
+            x += vx * when
+            y += vy * when
+            if what is None:
+                break
+            remaining -= when
+            if what == WALL:
+                vy = -vy
+                events.append(Event(WALL, -1))
+            elif normal_x:
+                vx = -vx
+                events.append(Event(HIT, self._players.get(what, -1)))
+            else:
+                vy = -vy
+                events.append(Event(HIT, self._players.get(what, -1)))
+        store.vx[index] = (vx > 0) - (vx < 0)
+        store.vy[index] = (vy > 0) - (vy < 0)
+        xs[index], ys[index] = round(x), round(y)
+        return xs[index], ys[index]
+
+    def serve(self, index: int | None = None):
+        """Put a ball (the first one by default) back in the middle, heading the other way,
+        or a random way if seeded"""
+        state = self.state
+        store = state.store
+        index = state.ball.index if index is None else index
+        store.x[index] = self.court.width // 2
+        store.y[index] = self.court.height // 2
+        if self.seed is None:
+            store.vx[index] = -store.vx[index]
+            return
+        state.rng = (state.rng * LCG_MULTIPLIER + LCG_INCREMENT) & 0xFFFFFFFF
+        # High bits, the low ones of an LCG have short periods
+        store.vx[index] = 1 if state.rng & 0x80000000 else -1
+        store.vy[index] = 1 if state.rng & 0x40000000 else -1
+
+    def digest(self) -> int:
+        """CRC32 of the whole state, equal on peers in sync (of the same byte order)"""
+        state = self.state
+        value = crc32(state.tick.to_bytes(4, "little") + state.rng.to_bytes(4, "little"))
+        for column in state.store.columns:
+            value = crc32(column, value)
+        return value
+
+    def snapshot(self):
+        """State as a "state" message body, see `packs.connection.BINARY`"""
+        state = self.state
+        first, second = state.paddles
+        return {
+            "type": "state",
+            "tick": state.tick,
+            "ball_x": state.ball.x,
+            "ball_y": state.ball.y,
+            "player1": first.y,
+            "player2": second.y,
+            "score1": first.score,
+            "score2": second.score
+        }
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.state!r}>"
@@ -0,0 +1,90 @@
+"""Batched simulation on NumPy. Holds many matches as arrays and advances all of them per
+step, with the same rules as `Engine(swept=False)`. For bot training and balance testing,
+nothing is rendered. Requires numpy."""
+from typing import NamedTuple
+
+import numpy as np
+
+from .state import Court
+
+
+class BatchEvents(NamedTuple):
+    """What happened in a step, one row per match. `hits` (matches, 2) ball hit paddle,
+    `walls` ball bounced off the top or bottom wall, `scorers` index of the paddle that
+    scored, -1 if none did."""
+    hits: np.ndarray
+    walls: np.ndarray
+    scorers: np.ndarray
+
+
+class BatchEngine:
+    """Steps `matches` matches at once. Every match starts like a fresh `Engine`. Collision
+    is the per-step overlap test, keep the step rate high enough for the ball speed."""
+
+    def __init__(self, matches: int, court: Court = Court()) -> None:
+        self.court = court
+        self.matches = matches
+        self.tick = 0
+        self.paddle_x = np.array([court.paddle_margin,
+                                  court.width - court.paddle_margin - court.paddle_width],
+                                 dtype=np.int32)
+        self.paddle_y = np.zeros((matches, 2), dtype=np.int32)
+        self.movement = np.zeros((matches, 2), dtype=np.int32)
+        self.score = np.zeros((matches, 2), dtype=np.int32)
+        self.ball_x = np.full(matches, court.width // 2, dtype=np.int32)
+        self.ball_y = np.full(matches, court.height // 2, dtype=np.int32)
+        self.dx = np.ones(matches, dtype=np.int32)
+        self.dy = np.full(matches, -1, dtype=np.int32)
+
+    def step(self, inputs: np.ndarray | None = None) -> BatchEvents:
+        """Advance every match one tick. `inputs` is a (matches, 2) array of movements
+        (UP, DOWN, NONE), the previous movements are kept if omitted."""
+        court = self.court
+        if inputs is not None:
+            if np.any(np.abs(inputs) > 1):
+                raise ValueError("Expected NONE, DOWN, UP constant or 0, -1, 1")
+            self.movement[:] = inputs
+
+        radius, size = court.ball_radius, court.ball_radius * 2
+        left = (self.ball_x - radius)[:, None]
+        top = (self.ball_y - radius)[:, None]
+        paddle_x = self.paddle_x[None, :]
+        hits = (left < paddle_x + court.paddle_width) & (paddle_x < left + size) \
+            & (top < self.paddle_y + court.paddle_height) & (self.paddle_y < top + size)
+        # Every paddle hit reflects, like Engine does one paddle after the other
+        self.dx *= 1 - 2 * (hits.sum(axis=1, dtype=np.int32) & 1)
+
+        self.paddle_y += court.paddle_speed * self.movement
+        np.clip(self.paddle_y, 0, court.height - court.paddle_height, out=self.paddle_y)
+
+        self.ball_x += court.ball_speed * self.dx
+        self.ball_y += court.ball_speed * self.dy
+        walls = (self.ball_y <= 0) | (self.ball_y >= court.height)
+        self.dy[walls] *= -1
+
+        scorers = np.full(self.matches, -1, dtype=np.int8)
+        scorers[self.ball_x >= court.width] = 0
+        scorers[self.ball_x <= 0] = 1
+        scored = scorers >= 0
+        self.score[scored, scorers[scored]] += 1
+        self.ball_x[scored] = court.width // 2
+        self.ball_y[scored] = court.height // 2
+        self.dx[scored] *= -1
+        self.tick += 1
+        return BatchEvents(hits, walls, scorers)
+
+    def row(self, match: int):
+        """State of one match, as `Engine.snapshot` gives it"""
+        return {
+            "type": "state",
+            "tick": self.tick,
+            "ball_x": int(self.ball_x[match]),
+            "ball_y": int(self.ball_y[match]),
+            "player1": int(self.paddle_y[match, 0]),
+            "player2": int(self.paddle_y[match, 1]),
+            "score1": int(self.score[match, 0]),
+            "score2": int(self.score[match, 1])
+        }
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} matches={self.matches} tick={self.tick}>"
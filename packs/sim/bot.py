@@ -0,0 +1,90 @@
+"""Bot opponent. Predicts where the ball crosses its paddle analytically, folding the
+bounces off the top and bottom walls, once per change of direction. Cheap enough to run
+hundreds on a server."""
+# pylint: disable=too-many-instance-attributes
+from random import Random
+
+from .state import DOWN, NONE, UP, MatchState
+
+# Reaction delay (ticks) and aim error (pixels) of the difficulty presets.
+EASY = (30, 90)
+NORMAL = (12, 60)
+HARD = (4, 20)
+
+
+def fold(y: float, height: int) -> float:
+    """Fold an unbounded y into [0, height] the way bounces off both walls do"""
+    period = height * 2
+    y %= period
+    return y if y <= height else period - y
+
+
+class Bot:
+    """Drives one paddle of a match. Call `decide` once per tick, before the step, and
+    use the result as that paddle's movement. `reaction` delays the response to a new
+    ball direction by that many ticks, `error` shifts the aim by up to that many pixels."""
+
+    def __init__(self,
+                 state: MatchState,
+                 paddle: int,
+                 reaction: int = NORMAL[0],
+                 error: int = NORMAL[1],
+                 seed: int | None = None) -> None:
+        self._state = state
+        self._paddle = state.paddles[paddle]
+        self._left = paddle == 0
+        self.reaction = reaction
+        self.error = error
+        self._random = Random(seed)
+        self._heading: tuple[int, int] | None = None
+        self._wait = 0
+        self._target = state.court.height / 2
+        self.predictions = 0
+
+    @property
+    def target(self):
+        """Y the paddle centre is heading for"""
+        return self._target
+
+    def intercept(self) -> float | None:
+        """Y where the ball centre reaches this paddle, None if it is moving away"""
+        ball = self._state.ball
+        paddle = self._paddle
+        if (ball.dx < 0) != self._left:
+            return None
+        face = paddle.x + paddle.width + ball.radius if self._left else paddle.x - ball.radius
+        ticks = (face - ball.x) / (ball.speed * ball.dx)
+        if ticks < 0:
+            return None
+        return fold(ball.y + ball.speed * ball.dy * ticks, self._state.court.height)
+
+    def _predict(self):
+        self.predictions += 1
+        crossing = self.intercept()
+        if crossing is None:
+            self._target = self._state.court.height / 2
+            return
+        self._target = crossing + self._random.uniform(-self.error, self.error)
+
+    def decide(self) -> int:
+        """Movement for this tick"""
+        ball = self._state.ball
+        heading = (ball.dx, ball.dy)
+        if heading != self._heading:
+            self._heading = heading
+            self._wait = self.reaction + 1
+        if self._wait:
+            self._wait -= 1
+            if not self._wait:
+                self._predict()
+        paddle = self._paddle
+        offset = self._target - (paddle.y + paddle.height / 2)
+        if offset > paddle.speed / 2:
+            return DOWN
+        if offset < -paddle.speed / 2:
+            return UP
+        return NONE
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} paddle={'left' if self._left else 'right'} \
+target={self._target:.0f}>"
@@ -0,0 +1,57 @@
+"""Uniform grid broad phase. Colliders are registered in the cells their bounds cover,
+a ball only tests the colliders sharing a cell with its path."""
+
+CELL_SIZE = 64
+
+
+class SpatialGrid:
+    """Entity indexes bucketed by grid cell"""
+
+    def __init__(self, cell: int = CELL_SIZE) -> None:
+        self.cell = cell
+        self._cells: dict[tuple[int, int], list[int]] = {}
+        self._keys: dict[int, tuple[tuple[int, int], ...]] = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, index: int):
+        return index in self._keys
+
+    def _span(self, left: float, top: float, right: float, bottom: float):
+        cell = self.cell
+        return tuple((column, row)
+                     for column in range(int(left // cell), int(right // cell) + 1)
+                     for row in range(int(top // cell), int(bottom // cell) + 1))
+
+    def insert(self, index: int, left: float, top: float, right: float, bottom: float):
+        """Register index over the box, moving it if it was registered"""
+        keys = self._span(left, top, right, bottom)
+        if self._keys.get(index) == keys:
+            return
+        self.remove(index)
+        self._keys[index] = keys
+        for key in keys:
+            self._cells.setdefault(key, []).append(index)
+
+    def remove(self, index: int):
+        """Unregister index"""
+        for key in self._keys.pop(index, ()):
+            bucket = self._cells[key]
+            bucket.remove(index)
+            if not bucket:
+                del self._cells[key]
+
+    def query(self, left: float, top: float, right: float, bottom: float):
+        """Indexes registered in any cell the box covers"""
+        cells = self._cells
+        found: set[int] = set()
+        for key in self._span(left, top, right, bottom):
+            bucket = cells.get(key)
+            if bucket:
+                found.update(bucket)
+        return found
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} cell={self.cell} entities={len(self)} \
+cells={len(self._cells)}>"
@@ -0,0 +1,48 @@
+"""Snapshot ring buffer for rollback. Every slot is preallocated with arrays shaped like
+the entity store, so saving or restoring a tick is a few in-place copies."""
+from array import array
+
+from .state import MatchState
+
+RING_SIZE = 16
+
+
+class SnapshotRing:
+    """The last `size` ticks of a match. Slot of a tick is tick modulo size, a newer tick
+    overwrites it. Entities must not be added once the ring is made."""
+
+    def __init__(self, state: MatchState, size: int = RING_SIZE) -> None:
+        if size <= 0:
+            raise ValueError("Size must be positive")
+        self.state = state
+        self.size = size
+        self._slots = [tuple(array(column.typecode, column) for column in state.store.columns)
+                       for _ in range(size)]
+        self._ticks = array('q', [-1] * size)
+        self._rngs = array('L', [0] * size)
+
+    def __contains__(self, tick: int):
+        return tick >= 0 and self._ticks[tick % self.size] == tick
+
+    def save(self):
+        """Store the state at its current tick"""
+        state = self.state
+        slot = state.tick % self.size
+        for saved, column in zip(self._slots[slot], state.store.columns):
+            saved[:] = column
+        self._ticks[slot] = state.tick
+        self._rngs[slot] = state.rng
+
+    def restore(self, tick: int):
+        """Put the state back as it was at tick. Raise KeyError if it is not stored."""
+        if tick not in self:
+            raise KeyError(f"Tick {tick} is not in the ring")
+        state = self.state
+        slot = tick % self.size
+        for saved, column in zip(self._slots[slot], state.store.columns):
+            column[:] = saved
+        state.tick = tick
+        state.rng = self._rngs[slot]
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} size={self.size} newest={max(self._ticks)}>"
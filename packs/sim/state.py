@@ -0,0 +1,198 @@
+"""Simulation state. Plain data, no pygame. The state classes are views over an
+`EntityStore`."""
+# pylint: disable=too-few-public-methods,too-many-instance-attributes,too-many-arguments
+from typing import NamedTuple
+
+from .store import BALL, PADDLE, EntityStore, pack_color, unpack_color
+
+UP = -1
+DOWN = 1
+NONE = 0
+
+# Event kinds
+HIT = "hit"
+WALL = "wall"
+SCORE = "score"
+
+
+class Court(NamedTuple):
+    """Court geometry and speeds, defaults match the desktop game"""
+    width: int = 1280
+    height: int = 720
+    ball_radius: int = 7
+    ball_speed: int = 7
+    paddle_width: int = 10
+    paddle_height: int = 100
+    paddle_speed: int = 10
+    paddle_margin: int = 20
+
+    def at(self, tickrate: int, base: int = 60):
+        """Same court with speeds scaled so gameplay at tickrate matches `base` Hz"""
+        factor = base / tickrate
+        return self._replace(ball_speed=round(self.ball_speed * factor),
+                             paddle_speed=round(self.paddle_speed * factor))
+
+
+class Event(NamedTuple):
+    """Something that happened during a step. `player` is the paddle index, -1 if none."""
+    kind: str
+    player: int
+
+
+class _View:
+    """An entity of an `EntityStore`"""
+    __slots__ = ("store", "index")
+
+    def __init__(self, store: EntityStore, index: int) -> None:
+        self.store = store
+        self.index = index
+
+    @property
+    def x(self) -> int:
+        """Position on x"""
+        return self.store.x[self.index]
+
+    @x.setter
+    def x(self, value: int):
+        self.store.x[self.index] = value
+
+    @property
+    def y(self) -> int:
+        """Position on y"""
+        return self.store.y[self.index]
+
+    @y.setter
+    def y(self, value: int):
+        self.store.y[self.index] = value
+
+    @property
+    def speed(self) -> int:
+        """Distance moved per tick"""
+        return self.store.speed[self.index]
+
+    @speed.setter
+    def speed(self, value: int):
+        self.store.speed[self.index] = value
+
+    @property
+    def color(self):
+        """(r, g, b)"""
+        return unpack_color(self.store.color[self.index])
+
+    @color.setter
+    def color(self, value):
+        self.store.color[self.index] = pack_color(value)
+
+
+class PaddleState(_View):
+    """Paddle position, movement and score"""
+    __slots__ = ()
+
+    @classmethod
+    def create(cls, store: EntityStore, x: int, y: int, width: int, height: int, speed: int):
+        """Add a paddle to store"""
+        return cls(store, store.add(PADDLE, x, y, width, height, speed))
+
+    @property
+    def width(self) -> int:
+        """Width"""
+        return self.store.w[self.index]
+
+    @property
+    def height(self) -> int:
+        """Height"""
+        return self.store.h[self.index]
+
+    @property
+    def movement(self) -> int:
+        """UP, DOWN or NONE"""
+        return self.store.vy[self.index]
+
+    @movement.setter
+    def movement(self, value: int):
+        self.store.vy[self.index] = value
+
+    @property
+    def score(self) -> int:
+        """Score"""
+        return self.store.score[self.index]
+
+    @score.setter
+    def score(self, value: int):
+        self.store.score[self.index] = value
+
+    @property
+    def rect(self):
+        """Bounds as (x, y, width, height)"""
+        store, index = self.store, self.index
+        return (store.x[index], store.y[index], store.w[index], store.h[index])
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} x={self.x} y={self.y} score={self.score}>"
+
+
+class BallState(_View):
+    """Ball position and direction"""
+    __slots__ = ()
+
+    @classmethod
+    def create(cls, store: EntityStore, x: int, y: int, radius: int, speed: int):
+        """Add a ball to store"""
+        return cls(store, store.add(BALL, x, y, radius * 2, radius * 2, speed, 1, -1))
+
+    @property
+    def radius(self) -> int:
+        """Radius"""
+        return self.store.w[self.index] // 2
+
+    @property
+    def dx(self) -> int:
+        """Direction on x, -1 or 1"""
+        return self.store.vx[self.index]
+
+    @dx.setter
+    def dx(self, value: int):
+        self.store.vx[self.index] = value
+
+    @property
+    def dy(self) -> int:
+        """Direction on y, -1 or 1"""
+        return self.store.vy[self.index]
+
+    @dy.setter
+    def dy(self, value: int):
+        self.store.vy[self.index] = value
+
+    @property
+    def rect(self):
+        """Bounds as (x, y, width, height)"""
+        store, index = self.store, self.index
+        width = store.w[index]
+        return (store.x[index] - width // 2, store.y[index] - width // 2, width, width)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} x={self.x} y={self.y} dx={self.dx} dy={self.dy}>"
+
+
+class MatchState:
+    """Everything needed to render or resume a match. Entities live in `store`, `ball`
+    and `paddles` are views over it."""
+
+    def __init__(self, court: Court) -> None:
+        self.court = court
+        self.tick = 0
+        # Random generator state of a seeded engine, see `Engine.serve`
+        self.rng = 0
+        self.store = EntityStore()
+        self.paddles = (
+            PaddleState.create(self.store, court.paddle_margin, 0,
+                               court.paddle_width, court.paddle_height, court.paddle_speed),
+            PaddleState.create(self.store, court.width - court.paddle_margin - court.paddle_width,
+                               0, court.paddle_width, court.paddle_height, court.paddle_speed)
+        )
+        self.ball = BallState.create(self.store, court.width // 2, court.height // 2,
+                                     court.ball_radius, court.ball_speed)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} tick={self.tick} \
+score={self.paddles[0].score}:{self.paddles[1].score}>"
@@ -0,0 +1,58 @@
+"""Struct-of-arrays entity store. Every entity is an index into contiguous arrays, so a
+step runs over all of them in one pass without touching per-entity objects."""
+from array import array
+
+PADDLE = 1
+BALL = 2
+OBSTACLE = 3
+
+
+class EntityStore:
+    """Contiguous x, y, w, h, velocity, speed, color, kind and score arrays. Positions are
+    the top left corner for paddles and the centre for balls, velocity is the direction
+    factor (-1, 0, 1) multiplied by speed when moving."""
+
+    def __init__(self) -> None:
+        self.x = array('i')
+        self.y = array('i')
+        self.w = array('i')
+        self.h = array('i')
+        self.vx = array('i')
+        self.vy = array('i')
+        self.speed = array('i')
+        self.color = array('I')
+        self.kind = array('B')
+        self.score = array('i')
+
+    def __len__(self):
+        return len(self.kind)
+
+    @property
+    def columns(self):
+        """Every array, in a fixed order"""
+        return (self.x, self.y, self.w, self.h, self.vx, self.vy,
+                self.speed, self.color, self.kind, self.score)
+
+    def add(self, kind: int, x: int, y: int, w: int, h: int, speed: int,
+            vx: int = 0, vy: int = 0, color: int = 0xFFFFFF):  # pylint: disable=too-many-arguments
+        """Add an entity. Return its index."""
+        for column, value in zip(self.columns, (x, y, w, h, vx, vy, speed, color, kind, 0)):
+            column.append(value)
+        return len(self.kind) - 1
+
+    def of_kind(self, kind: int):
+        """Indexes of every entity of kind"""
+        return [index for index, value in enumerate(self.kind) if value == kind]
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} entities={len(self)}>"
+
+
+def pack_color(color) -> int:
+    """(r, g, b) to 0xRRGGBB"""
+    return (color[0] << 16) | (color[1] << 8) | color[2]
+
+
+def unpack_color(value: int):
+    """0xRRGGBB to (r, g, b)"""
+    return ((value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF)
@@ -0,0 +1,242 @@
+"""Multi-process server. Worker processes share one port through SO_REUSEPORT, a client
+joining a room is handed off to the worker owning that room. Unix only."""
+# pylint: disable=too-many-arguments
+from json import dumps, loads
+from multiprocessing import get_context
+from multiprocessing.queues import Queue
+from multiprocessing.synchronize import Event as EventType
+from os import close, cpu_count
+from queue import Empty
+from selectors import SelectorKey
+from socket import (AF_UNIX, SO_REUSEPORT, SOCK_DGRAM, SOL_SOCKET, recv_fds,
+                    send_fds, socketpair)
+from socket import socket as SocketClass
+from time import monotonic
+from typing import NamedTuple
+from zlib import crc32
+
+from .backpressure import Backpressure
+from .connection import EVENT_READ, FrameDecoder, IOMessage, Message, frame
+from .errors import FrameError
+from .rooms import RoomManager
+from .server import Logger, Server
+from .sim import Engine
+from .typings import ServerAddr
+from .utils import map_addr
+
+# Handoff packet: framed metadata, unprocessed inbound data and queued outbound data.
+HANDOFF_LIMIT = 1 << 16
+REPORT_INTERVAL = 1
+HANDOFF_META = {"address", "codec", "room", "relay"}
+
+
+class WorkerLoad(NamedTuple):
+    """Load reported by a worker"""
+    index: int
+    clients: int
+    rooms: int
+    queued: int
+
+
+def room_owner(room: str, workers: int) -> int:
+    """Index of the worker owning room. Stable across processes and runs."""
+    return crc32(room.encode('utf-8')) % workers
+
+
+def unpack_handoff(packet: bytes):
+    """Metadata, inbox and outbox of a handoff packet, None if it is malformed"""
+    try:
+        frames = FrameDecoder().feed(packet)
+        if len(frames) != 3:
+            return None
+        info = loads(frames[0])
+    except (FrameError, ValueError):
+        return None
+    if not isinstance(info, dict) or not HANDOFF_META <= info.keys():
+        return None
+    return info, frames[1], frames[2]
+
+
+class Worker(Server):
+    """Server worker process. Listens on the shared port, keeps clients of the rooms it
+    owns and hands off the others to their owner through its Unix channel."""
+
+    def __init__(self,
+                 addr: ServerAddr,
+                 index: int,
+                 channels: list[tuple[SocketClass, SocketClass]],
+                 loads_queue: Queue,
+                 stop: EventType,
+                 listen_for: int = 0,
+                 policy: Backpressure | None = None,
+                 rooms: RoomManager | None = None) -> None:
+        super().__init__(addr, listen_for, policy, rooms)
+        self._index = index
+        self._inbox = channels[index][0]
+        self._outboxes = [channel[1] for channel in channels]
+        self._loads = loads_queue
+        self._stop = stop
+        self._reported = 0.
+
+    def setup(self):
+        self._socket.setsockopt(SOL_SOCKET, SO_REUSEPORT, 1)
+        super().setup()
+        self._inbox.setblocking(False)
+        self._selector.register(self._inbox, EVENT_READ, self._adopt)
+
+    def _join(self, conn: SocketClass, holder: IOMessage, room, relay: bool = False):
+        if room is not None:
+            owner = room_owner(str(room), len(self._outboxes))
+            if owner != self._index:
+                self._move(conn, holder, str(room))
+                self._handoff(conn, holder, owner, relay)
+                return
+        super()._join(conn, holder, room, relay)
+
+    def _handoff(self, client: SocketClass, holder: IOMessage, owner: int, relay: bool):
+        inbox = b"".join(frame(payload) for payload in holder.frames())
+        inbox += holder.decoder.unread()
+        meta = dumps({
+            "address": holder.address,
+            "codec": holder.codec,
+            "room": holder.room,
+            "relay": relay
+        }).encode('utf-8')
+        packet = frame(meta) + frame(inbox) + frame(holder.queued_bytes())
+        if len(packet) > HANDOFF_LIMIT:
+            Logger.warning("Client %s has too much pending data to hand off, kept",
+                           map_addr(holder.address))
+            for payload in FrameDecoder().feed(inbox):
+                holder.output = payload
+            return
+        send_fds(self._outboxes[owner], [packet], [client.fileno()])
+        Logger.info("Client %s handed off to worker %s for room %s",
+                    map_addr(holder.address), owner, holder.room)
+        holder.closing = True
+        holder.reset_input()
+        self._close_client(client)
+
+    def _adopt(self, key: SelectorKey, mask: int):  # pylint: disable=unused-argument
+        while True:
+            try:
+                packet, fds, _, _ = recv_fds(key.fileobj, HANDOFF_LIMIT, 1)  # type: ignore
+            except BlockingIOError:
+                return
+            if not fds:
+                continue
+            unpacked = unpack_handoff(packet)
+            if unpacked is None or len(fds) != 1:
+                Logger.warning("Dropped a malformed handoff packet")
+                for fd in fds:
+                    close(fd)
+                continue
+            info, inbox, outbox = unpacked
+            client = SocketClass(fileno=fds[0])
+            client.setblocking(False)
+            holder = IOMessage(tuple(info['address']), self._policy.budget)  # type: ignore
+            holder.socket = client
+            holder.codec = info['codec']
+            self._selector.register(client, EVENT_READ, holder)
+            self._add_client(client, holder)
+            Logger.info("Client %s adopted for room %s", map_addr(holder.address), info['room'])
+            self._join(client, holder, info['room'], info['relay'])
+            if outbox:
+                self._do_send(client, outbox, force=True)
+            holder.feed(inbox)
+            for payload in holder.frames():
+                self._do_read(client, holder, Message(payload))
+
+    def _sweep(self):
+        super()._sweep()
+        if self._stop.is_set():
+            self._running.clear()
+        now = monotonic()
+        if now - self._reported < REPORT_INTERVAL:
+            return
+        self._reported = now
+        holders = list(self._clients.values())
+        self._loads.put(WorkerLoad(self._index,
+                                   len(holders),
+                                   len({holder.room for holder in holders} - {None}),
+                                   sum(holder.queued for holder in holders)))
+
+
+def _run_worker(addr: ServerAddr,
+                index: int,
+                channels: list[tuple[SocketClass, SocketClass]],
+                loads_queue: Queue,
+                stop: EventType,
+                listen_for: int):
+    Worker(addr, index, channels, loads_queue, stop, listen_for,
+           rooms=RoomManager(engine=Engine.at)).main_loop()
+
+
+class Supervisor:
+    """Spawn and watch worker processes serving one address."""
+
+    def __init__(self, addr: ServerAddr, workers: int = 0, listen_for: int = 0) -> None:
+        if addr[1] == 0:
+            raise ValueError("Workers need an explicit port to share")
+        self._addr = addr
+        self._workers = workers or cpu_count() or 1
+        self._listen_for = listen_for
+        self._context = get_context("fork")
+        self._loads_queue = self._context.Queue()
+        self._stop = self._context.Event()
+        self._processes = []
+        self._loads: dict[int, WorkerLoad] = {}
+
+    @property
+    def workers(self):
+        """Worker count"""
+        return self._workers
+
+    @property
+    def running(self):
+        """Is any worker running?"""
+        return any(process.is_alive() for process in self._processes)
+
+    def route(self, room: str):
+        """Index of the worker owning room"""
+        return room_owner(room, self._workers)
+
+    def start(self):
+        """Start worker processes"""
+        if self._processes:
+            raise RuntimeError("Workers have already been started")
+        channels = [socketpair(AF_UNIX, SOCK_DGRAM) for _ in range(self._workers)]
+        for index in range(self._workers):
+            process = self._context.Process(
+                target=_run_worker,
+                args=(self._addr, index, channels, self._loads_queue,
+                      self._stop, self._listen_for),
+                name=f"pypong-worker-{index}",
+                daemon=True)
+            process.start()
+            self._processes.append(process)
+        for pair in channels:
+            for sock in pair:
+                sock.close()
+        Logger.info("Started %s workers at %s", self._workers, map_addr(self._addr))
+
+    def poll(self):
+        """Collect load reports, return the latest report of every worker"""
+        while True:
+            try:
+                load: WorkerLoad = self._loads_queue.get_nowait()
+            except Empty:
+                break
+            self._loads[load.index] = load
+        return dict(self._loads)
+
+    def stop(self, timeout: float = 5):
+        """Stop every worker"""
+        self._stop.set()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        Logger.info("Workers stopped")
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} workers={self._workers} run={map_addr(self._addr)}>"
@@ -3,13 +3,14 @@ from .typings import Status
 from .connection import make_message
 
 
-def transform_error(body: str, error: Status) -> bytes:
+def transform_error(body: str, error: Status, codec: str | None = None) -> bytes:
     # """Create a basic error response."""
     """Create a basic error response
 
     Args:
         body (str): Body message.
         error (Status): Error passed from `StatusEnum`
+        codec (str | None, optional): Codec name. Defaults to the compatibility codec.
 
     Returns:
         bytes: Packed message, ready to send
@@ -18,4 +19,4 @@ def transform_error(body: str, error: Status) -> bytes:
         "EMessage": error.description,
         "EName": error.value,
         "ECode": error.name
-    })
+    }, codec)
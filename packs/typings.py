@@ -27,3 +27,13 @@ class Status(Protocol):
     description: str
     value: str
     name: str
+
+
+class Link(Protocol):
+    """Anything a networked match can talk to the server through, like `packs.client.Client`"""
+
+    def push(self, data: Any, headers: dict[str, Any] | None = None) -> Any:
+        """Send data to the server"""
+
+    def messages(self) -> list[Any]:
+        """Bodies received since the last call, without waiting"""
@@ -3,8 +3,15 @@
 from cmd import Cmd
 from time import sleep
 from typing import IO
+from packs.async_server import AsyncServer
 from packs.server import Server, Logger as ServerLogger, Console
 from packs.client import Client
+from packs.supervisor import Supervisor
+
+BACKENDS = {
+    "selector": Server,
+    "async": AsyncServer
+}
 
 
 class ServerCLI(Cmd):
@@ -18,6 +25,8 @@ class ServerCLI(Cmd):
                  stdout: IO[str] | None = None) -> None:
         super().__init__(completekey, stdin, stdout)
         self.server = None
+        self.supervisor = None
+        self._backend = "selector"
         self._addr = (None, None)
         self._console = False
         self._noadd = True
@@ -48,6 +57,20 @@ class ServerCLI(Cmd):
         self.do_enable_console(arg)
         self._noadd = False
 
+    def do_backend(self, arg: str):
+        """Choose server backend: selector (default) or async"""
+        if not arg:
+            print(f"Current backend: {self._backend}")
+            return
+        if arg not in BACKENDS:
+            print(f"Unknown backend, choose one of: {', '.join(BACKENDS)}")
+            return
+        self._backend = arg
+        print(f"Backend set to {arg}")
+
+    def _make_server(self, listen_for: int = 0):
+        return BACKENDS[self._backend](self._addr, listen_for)  # type: ignore
+
     def do_run(self, arg: str):
         """Run the server"""
         try:
@@ -58,7 +81,7 @@ class ServerCLI(Cmd):
             return
         print(f"Server run at {host}:{port}")
         self._addr = (host, int(port))
-        self.server = Server(self._addr)
+        self.server = self._make_server()
         self.server.start_as_thread()
 
     def do_runpeer(self, arg: str):
@@ -71,9 +94,33 @@ class ServerCLI(Cmd):
             return
         print(f"Server run at {host}:{port}")
         self._addr = (host, int(port))
-        self.server = Server(self._addr, True)
+        self.server = self._make_server(True)
         self.server.start_as_thread()
 
+    def do_runworkers(self, arg: str):
+        """Run server as worker processes sharing one port: runworkers host port [count]
+        Clients joining a room are routed to the worker owning it. Count defaults to CPUs."""
+        try:
+            host, port, *count = arg.split(' ')
+            workers = int(count[0]) if count else 0
+            int(port)
+        except (ValueError, IndexError):
+            print("Port/count is not a number")
+            return
+        self._addr = (host, int(port))
+        self.supervisor = Supervisor(self._addr, workers)
+        self.supervisor.start()
+        print(f"{self.supervisor.workers} workers run at {host}:{port}")
+
+    def do_load(self, arg):
+        """Show load reported by workers"""
+        if not self.supervisor:
+            print("Workers were not started.")
+            return
+        for index, load in sorted(self.supervisor.poll().items()):
+            print(f"Worker {index}: {load.clients} clients, {load.rooms} rooms, \
+{load.queued} bytes queued")
+
     def do_runtest(self, arg):
         """Test run"""
         self.do_run("127.0.0.1 2000")
@@ -83,7 +130,7 @@ class ServerCLI(Cmd):
         """Test Server connection 2"""
         self._addr = ('127.0.0.1', 2000)
         # self.do_enable_console("")
-        self.server = Server(self._addr, True)
+        self.server = self._make_server(True)
         self.server.start_as_thread()
         sleep(1)
         self.do_test("")
@@ -103,8 +150,31 @@ class ServerCLI(Cmd):
         print(client.json())
         client.stop()
 
+    def do_testbroadcast(self, arg: str):
+        """Test Server broadcast, every client should receive each message"""
+        if self._addr == (None, None):
+            print("Server was not started.")
+            return
+        sent = ["Hello, World!", {"type": "ball", "x": 10, "y": 20, "dx": 1, "dy": -1}]
+        clients = [Client(self._addr) for _ in range(3)]  # type: ignore
+        for client in clients:
+            client.start()
+        clients[0].push(sent[0])
+        clients[1].push(sent[1])
+        for index, client in enumerate(clients):
+            bodies = [client.json()['body'] for _ in range(2)]
+            missing = [body for body in sent if body not in bodies]
+            result = f"MISSING {missing}" if missing else "OK"
+            print(f"Client {index} ({client.codec}): {result}")
+        for client in clients:
+            client.stop()
+
     def do_stop(self, arg):
         """Stop the server"""
+        if self.supervisor and self.supervisor.running:
+            self.supervisor.stop()
+            print("Workers stopped")
+            return
         if not self.server:
             print("Server was not started yet.")
             return
@@ -116,6 +186,8 @@ class ServerCLI(Cmd):
 
     def do_exit(self, arg):
         """Stop server session"""
+        if self.supervisor and self.supervisor.running:
+            self.supervisor.stop()
         if self.server is None:
             return True
         if self.server.running:
@@ -0,0 +1 @@
+"""Tests. Run them with `python -m pytest` from the project root."""
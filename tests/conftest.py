@@ -0,0 +1,21 @@
+"""Shared fixtures"""
+from socket import socket
+from time import monotonic, sleep
+
+import pytest
+
+
+@pytest.fixture
+def address():
+    """Local address with a free port"""
+    with socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()
+
+
+def wait_for(predicate, timeout: float = 3.):
+    """Poll predicate until true or timeout. Return its last result."""
+    deadline = monotonic() + timeout
+    while not (result := predicate()) and monotonic() < deadline:
+        sleep(0.01)
+    return result
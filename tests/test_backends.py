@@ -0,0 +1,113 @@
+"""Every server backend of the CLI relays and hosts matches alike"""
+import pytest
+
+from packs.async_server import AsyncServer
+from packs.client import Client
+from packs.rooms import RoomManager
+from packs.sim import Engine
+from server_cli import BACKENDS
+
+from .conftest import wait_for
+
+BODIES = ("Hello, World!", {"type": "ball", "x": 10, "y": 20, "dx": 1, "dy": -1})
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_each_client_receives_each_body(backend, address):
+    server = BACKENDS[backend](address)
+    server.start_as_thread()
+    clients: list[Client] = []
+    try:
+        assert wait_for(lambda: server.running)
+        for codecs in (("binary",), ("b64json",), ("binary", "b64json")):
+            clients.append(Client(address, codecs, room="r"))
+            clients[-1].start()
+        for client, body in zip(clients, BODIES):
+            client.push(body)
+        for client in clients:
+            received: list = []
+            assert wait_for(lambda c=client: received.extend(c.messages()) or
+                            len(received) >= len(BODIES))
+            assert sorted(map(str, received)) == sorted(map(str, BODIES))
+    finally:
+        for client in clients:
+            client.stop()
+        server.stop_thread()
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_rooms_are_simulated(backend, address):
+    rooms = RoomManager(engine=Engine.at)
+    server = BACKENDS[backend](address, rooms=rooms)
+    server.start_as_thread()
+    clients: list[Client] = []
+    try:
+        assert wait_for(lambda: server.running)
+        client = Client(address, room="m")
+        clients.append(client)
+        client.start()
+        assert wait_for(lambda: rooms.get("m") is not None)
+        client.push({"type": "input", "player": 1, "movement": 1, "seq": 7})
+        received: list = []
+        assert wait_for(lambda: any(body.get("ack1") == 7 for body in received
+                                    if isinstance(body, dict) and body.get("type") == "sync")
+                        or received.extend(client.messages()))
+        client.stop()
+        assert wait_for(lambda: rooms.get("m") is None)
+    finally:
+        for client in clients:
+            client.stop()
+        server.stop_thread()
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_relay_rooms_are_not_simulated(backend, address):
+    rooms = RoomManager(engine=Engine.at)
+    server = BACKENDS[backend](address, rooms=rooms)
+    server.start_as_thread()
+    clients: list[Client] = []
+    try:
+        assert wait_for(lambda: server.running)
+        for _ in range(2):
+            clients.append(Client(address, room="l", relay=True))
+            clients[-1].start()
+        assert wait_for(lambda: rooms.get("l") is not None)
+        assert rooms.get("l").engine is None
+        step = {"type": "step", "tick": 3, "player": 1, "movement": 1}
+        clients[0].push(step)
+        received: list = []
+        assert wait_for(lambda: received.extend(clients[1].messages()) or received)
+        assert received == [step]
+        clients[1].push("done")
+        echoed: list = []
+        assert wait_for(lambda: echoed.extend(clients[0].messages()) or echoed)
+        assert echoed == ["done"]
+    finally:
+        for client in clients:
+            client.stop()
+        server.stop_thread()
+
+
+def test_async_input_replans_only_woken_matches(address, monkeypatch):
+    rooms = RoomManager(engine=Engine.at)
+    server = AsyncServer(address, rooms=rooms)
+    planned = []
+    plan = server._plan_ticks  # pylint: disable=protected-access
+    monkeypatch.setattr(server, "_plan_ticks", lambda: planned.append(1) or plan())
+    server.start_as_thread()
+    clients: list[Client] = []
+    try:
+        assert wait_for(lambda: server.running)
+        clients.append(Client(address, room="m"))
+        clients[0].start()
+        assert wait_for(lambda: rooms.get("m") is not None)
+        before = len(planned)
+        for _ in range(20):
+            clients[0].push({"type": "paddle", "player": 1, "movement": 1})
+        assert wait_for(lambda: rooms.get("m").inputs.get(1) == 1)
+        # Ticks replan too, but not one per input
+        assert len(planned) - before < 10
+    finally:
+        for client in clients:
+            client.stop()
+        server.stop_thread()
@@ -0,0 +1,44 @@
+"""Backpressure policy and the closing of slow clients"""
+from time import sleep
+
+from packs.backpressure import Backpressure
+from packs.connection import IOMessage
+from packs.server import Server
+
+
+def test_evicted_client_expires_after_partial_drain(monkeypatch):
+    policy = Backpressure(budget=64, grace=0.05)
+    server = Server(("", 0), policy=policy)
+    holder = IOMessage(("127.0.0.1", 0), policy.budget)
+    conn = object()
+    server._add_client(conn, holder)  # pylint: disable=protected-access
+    monkeypatch.setattr(server, "_do_send",
+                        lambda conn, data, force=False, key=None: holder.enqueue(data, force, key))
+    closed: list = []
+    monkeypatch.setattr(server, "_close_client", closed.append)
+    holder.enqueue(b"x" * 48)
+    holder.advance(16)
+    assert not policy.admit(holder, b"y" * 48)
+    sleep(policy.grace)
+    assert policy.should_evict(holder)
+    server._evict(conn, holder)  # pylint: disable=protected-access
+    # Some of the last words go out, the client is back under budget, then stalls.
+    holder.advance(holder.queued - 8)
+    policy.relieve(holder)
+    assert holder.closing and holder.queued
+    server._sweep()  # pylint: disable=protected-access
+    assert not closed
+    sleep(policy.grace * 2)
+    server._sweep()  # pylint: disable=protected-access
+    assert closed == [conn]
+
+
+def test_relieve_clears_over_budget():
+    policy = Backpressure(budget=64, grace=0.05)
+    holder = IOMessage(("127.0.0.1", 0), policy.budget)
+    holder.enqueue(b"x" * 60)
+    assert not policy.admit(holder, b"y" * 8)
+    assert holder.over_since is not None
+    holder.advance(30)
+    policy.relieve(holder)
+    assert holder.over_since is None and not policy.should_evict(holder)
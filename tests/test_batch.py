@@ -0,0 +1,30 @@
+"""BatchEngine parity with scalar engines"""
+from random import Random
+
+import pytest
+
+from packs.sim import Engine
+
+np = pytest.importorskip("numpy")
+from packs.sim.batch import BatchEngine  # pylint: disable=wrong-import-position # noqa: E402
+
+MATCHES = 16
+STEPS = 3000
+
+
+@pytest.mark.parametrize("seed", (0, 1, 2))
+def test_batch_matches_scalar_engines(seed):
+    rng = Random(seed)
+    batch = BatchEngine(MATCHES)
+    engines = [Engine(swept=False) for _ in range(MATCHES)]
+    inputs = np.zeros((MATCHES, 2), dtype=np.int32)
+    for step in range(STEPS):
+        if step % 15 == 0:
+            inputs = np.array([[rng.choice((-1, 0, 1)) for _ in range(2)]
+                               for _ in range(MATCHES)], dtype=np.int32)
+        batch.step(inputs)
+        for match, (engine, row) in enumerate(zip(engines, inputs.tolist())):
+            engine.step(tuple(row))
+            assert engine.snapshot() == batch.row(match), f"match {match} step {step}"
+    assert any(batch.row(match)["score1"] or batch.row(match)["score2"]
+               for match in range(MATCHES))
@@ -0,0 +1,54 @@
+"""Bot intercept prediction"""
+import pytest
+
+from packs.sim import HIT, NONE, SCORE, Engine
+from packs.sim.bot import NORMAL, Bot
+
+
+@pytest.mark.parametrize("seed", (0, 1, 2))
+def test_exact_bots_never_miss(seed):
+    engine = Engine(seed=seed)
+    bots = [Bot(engine.state, paddle, reaction=0, error=0) for paddle in (0, 1)]
+    hits = 0
+    for _ in range(3000):
+        events = engine.step([bot.decide() for bot in bots])
+        assert SCORE not in [event.kind for event in events]
+        hits += sum(event.kind == HIT for event in events)
+    assert hits > 10
+
+
+def test_intercept_is_where_the_ball_arrives():
+    engine = Engine(seed=5)
+    bot = Bot(engine.state, 1, reaction=0, error=0)
+    ball, paddle = engine.state.ball, engine.state.paddles[1]
+    # Bounces off the top wall and comes down to the middle of the right side
+    ball.x, ball.y, ball.dx, ball.dy = 400, 300, 1, -1
+    predicted = bot.intercept()
+    assert 400 < predicted < 600
+    # Out of the way at the top, the ball crosses the paddle's face unhindered
+    paddle.y = 0
+    face = paddle.x - ball.radius
+    while ball.x < face:
+        engine.step()
+    assert abs(ball.y - predicted) <= ball.speed
+
+
+def test_normal_bot_returns_most_balls():
+    engine = Engine(seed=3)
+    bot = Bot(engine.state, 0, *NORMAL, seed=1)
+    exact = Bot(engine.state, 1, reaction=0, error=0)
+    hits = missed = 0
+    for _ in range(6000):
+        for event in engine.step((bot.decide(), exact.decide())):
+            hits += event.kind == HIT and event.player == 0
+            missed += event.kind == SCORE and event.player == 1
+    assert hits > missed * 3
+
+
+def test_still_paddle_misses():
+    engine = Engine(seed=3)
+    exact = Bot(engine.state, 1, reaction=0, error=0)
+    scored = 0
+    for _ in range(3000):
+        scored += sum(event.kind == SCORE for event in engine.step((NONE, exact.decide())))
+    assert scored
@@ -0,0 +1,27 @@
+"""Client"""
+from packs.backpressure import Backpressure
+from packs.client import Client
+from packs.server import Server
+
+from .conftest import wait_for
+
+
+def test_large_push_arrives_whole(address):
+    server = Server(address, policy=Backpressure(budget=16 << 20))
+    server.start_as_thread()
+    clients: list[Client] = []
+    try:
+        assert wait_for(lambda: server.running)
+        sender, receiver = Client(address, room="r"), Client(address, room="r")
+        clients.extend((sender, receiver))
+        for client in clients:
+            client.start()
+        # Far over the socket send buffer, the non-blocking send goes out in pieces
+        body = "x" * (4 << 20)
+        sent = sender.push(body)
+        assert sent > len(body)
+        assert wait_for(receiver.messages, 10) == [body]
+    finally:
+        for client in clients:
+            client.stop()
+        server.stop_thread()
@@ -0,0 +1,48 @@
+"""Codecs and per-codec broadcast"""
+from json import loads
+
+from packs.client import Client
+from packs.connection import BINARY, Message, encode_as, make_message
+from packs.server import Server
+
+from .conftest import wait_for
+
+PADDLE = {"type": "paddle", "player": 1, "y": 300, "movement": 1}
+
+
+def test_encode_as_converts_between_codecs():
+    request = Message(make_message(PADDLE, {}, "binary"))
+    converted = Message(encode_as(request, "b64json"))
+    assert converted.codec.name == "b64json"
+    assert converted.body() == PADDLE
+    assert encode_as(request, "binary") is request.raw_body()
+
+
+def test_binary_unpack_is_json():
+    assert loads(BINARY.unpack(make_message(PADDLE, {}, "binary")))["body"] == PADDLE
+    assert loads(BINARY.unpack(make_message("hi", {"a": 1}, "binary"))) == \
+        {"body": "hi", "headers": {"a": 1}}
+
+
+def test_broadcast_uses_each_client_codec(address):
+    server = Server(address)
+    server.start_as_thread()
+    clients: list[Client] = []
+    try:
+        assert wait_for(lambda: server.running)
+        binary = Client(address, ("binary",), room="r")
+        clients.append(binary)
+        legacy = Client(address, ("b64json",), room="r")
+        clients.append(legacy)
+        for client in clients:
+            client.start()
+        assert (binary.codec, legacy.codec) == ("binary", "b64json")
+        binary.push(PADDLE)
+        for client in clients:
+            assert wait_for(lambda c=client: c._response.output)  # pylint: disable=protected-access
+            assert Message(client._response.output).codec.name == client.codec  # pylint: disable=protected-access
+            assert loads(client.read())["body"] == PADDLE
+    finally:
+        for client in clients:
+            client.stop()
+        server.stop_thread()
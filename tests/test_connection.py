@@ -0,0 +1,125 @@
+"""Length-prefixed framing"""
+from selectors import DefaultSelector
+from socket import socketpair
+
+import pytest
+
+from packs.connection import (EVENT_READ, FRAME_HEADER, FrameDecoder, IOMessage,
+                              event_read, frame)
+from packs.errors import FrameError
+
+PAYLOADS = (b"a", b"", b"hello" * 100, bytes(range(256)))
+
+
+def test_glued_frames():
+    decoder = FrameDecoder()
+    assert decoder.feed(b"".join(map(frame, PAYLOADS))) == list(PAYLOADS)
+    assert decoder.pending == 0
+
+
+def test_split_frames():
+    decoder = FrameDecoder()
+    data = b"".join(map(frame, PAYLOADS))
+    received = []
+    for index in range(len(data)):
+        received += decoder.feed(data[index:index + 1])
+    assert received == list(PAYLOADS)
+    assert decoder.pending == 0
+
+
+def test_oversize_frame():
+    decoder = FrameDecoder(max_size=16)
+    assert decoder.feed(frame(b"x" * 16)) == [b"x" * 16]
+    with pytest.raises(FrameError):
+        decoder.feed(FRAME_HEADER.pack(17))
+    with pytest.raises(FrameError):
+        frame(bytes((1 << 24) + 1))
+
+
+def test_unread_tail_is_compacted_in_place():
+    decoder = FrameDecoder(capacity=64)
+    data = frame(b"x" * 40) + frame(b"y" * 40)
+    assert decoder.feed(data[:60]) == [b"x" * 40]
+    # 16 bytes of the second frame wait at offset 44, the rest does not fit after them.
+    assert decoder.feed(data[60:]) == [b"y" * 40]
+    assert decoder.capacity == 64
+
+
+def test_buffer_grows_for_a_large_frame():
+    decoder = FrameDecoder(capacity=64)
+    payload = bytes(range(256)) * 4
+    data = frame(payload)
+    assert decoder.feed(data[:100]) == []
+    assert decoder.feed(data[100:]) == [payload]
+    assert decoder.capacity >= len(data)
+
+
+def _read_end():
+    reader, writer = socketpair()
+    reader.setblocking(False)
+    selector = DefaultSelector()
+    holder = IOMessage(("127.0.0.1", 0))
+    key = selector.register(reader, EVENT_READ, holder)
+    return reader, writer, selector, holder, key
+
+
+def test_event_read_queues_glued_and_split_frames():
+    reader, writer, selector, holder, key = _read_end()
+    try:
+        data = b"".join(map(frame, PAYLOADS))
+        writer.sendall(data[:3])
+        assert event_read(key, selector) is None
+        assert not holder.pending()
+        writer.sendall(data[3:])
+        assert event_read(key, selector) is None
+        assert list(holder.frames()) == list(PAYLOADS)
+        assert reader.fileno() != -1
+    finally:
+        writer.close()
+        reader.close()
+        selector.close()
+
+
+def test_event_read_recv_into_large_frame():
+    reader, writer, selector, holder, key = _read_end()
+    try:
+        payload = bytes(range(256)) * 1024
+        writer.setblocking(False)
+        data, sent = frame(payload), 0
+        while sent < len(data):
+            try:
+                sent += writer.send(data[sent:])
+            except BlockingIOError:
+                pass
+            event_read(key, selector)
+        assert list(holder.frames()) == [payload]
+    finally:
+        writer.close()
+        reader.close()
+        selector.close()
+
+
+def test_event_read_closes_on_oversize_frame():
+    reader, writer, selector, _, key = _read_end()
+    try:
+        writer.sendall(FRAME_HEADER.pack((1 << 24) + 1))
+        assert event_read(key, selector) is True
+        assert reader.fileno() == -1
+        assert not selector.get_map()
+    finally:
+        writer.close()
+        selector.close()
+
+
+def test_event_read_closes_when_peer_closes():
+    reader, writer, selector, holder, key = _read_end()
+    try:
+        writer.sendall(frame(b"last"))
+        writer.close()
+        # The last frame is handed out before the close is reported
+        assert event_read(key, selector) is None
+        assert list(holder.frames()) == [b"last"]
+        assert event_read(key, selector) is True
+        assert reader.fileno() == -1
+    finally:
+        selector.close()
@@ -0,0 +1,35 @@
+"""Dirty rectangle drawing matches a full redraw"""
+# pylint: disable=protected-access
+import pytest
+
+pygame = pytest.importorskip("pygame")
+from benchmarks.render import AppConfig, BaseApp, Scripted  # pylint: disable=wrong-import-position # noqa: E402
+from packs.gui import WHITE  # pylint: disable=wrong-import-position # noqa: E402
+
+
+def _full_redraw(app: Scripted):
+    app._layers.clear(app._surface)
+    for entity in app._entities:
+        entity.display(app.alpha)
+    app._player1.display_score("Player1", (100, 20), WHITE)
+    app._player2.display_score("Player2", (app.resolution[0] - 100, 20), WHITE)
+    return pygame.image.tobytes(app._surface, "RGB")
+
+
+def test_ball_shows_through_score_label():
+    app = Scripted(AppConfig((900, 600), False, 0, 60, True))
+    app.init()
+    try:
+        app.on_main()
+        label, ball = app._player1._label, app._engine.state.ball
+        ball.x, ball.y = label.left - 20, label.centery
+        for entity in app._entities:
+            entity.remember()
+        for _ in range(40):
+            app.on_step()
+            ball.y = label.centery
+            app.on_main()
+            assert pygame.image.tobytes(app._surface, "RGB") == _full_redraw(app)
+        assert ball.x > label.right
+    finally:
+        BaseApp._exit()
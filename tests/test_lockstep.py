@@ -0,0 +1,99 @@
+"""Lockstep peers over an in-memory relay"""
+from random import Random
+
+from packs.lockstep import TICK_WRAP, Lockstep
+from packs.sim import DOWN, NONE, UP
+
+SEED = 7
+
+
+class Pipe:
+    """Link delivering whatever is pushed to every peer on the next poll, unless dropped"""
+
+    def __init__(self, peers: list, drop=()) -> None:
+        self.peers = peers
+        self.drop = drop
+        self.inbox: list = []
+
+    def push(self, data, headers=None):  # pylint: disable=unused-argument
+        """Hand data to every peer"""
+        if data.get("type") not in self.drop:
+            for pipe in self.peers:
+                pipe.inbox.append(data)
+
+    def messages(self):
+        """Bodies arrived so far"""
+        bodies = self.inbox[:]
+        self.inbox.clear()
+        return bodies
+
+
+def pair(drop=()):
+    """Two lockstep peers wired to each other"""
+    pipes: list = []
+    pipes.extend((Pipe(pipes, drop), Pipe(pipes, drop)))
+    return [Lockstep(pipe, player, SEED, hash_every=10) for player, pipe in zip((1, 2), pipes)]
+
+
+def test_bad_peer_input_is_ignored():
+    peer = Lockstep(Pipe([]), 1, SEED)
+    good = {"type": "step", "player": 2, "tick": peer.delay, "movement": UP}
+    peer.link.inbox.extend([
+        "not a dict",
+        {**good, "movement": 5},
+        {**good, "movement": "up"},
+        {**good, "movement": None},
+        {**good, "tick": "3"},
+        {"type": "checksum", "player": 2, "tick": 10, "digest": "x"},
+        {"type": "checksum", "player": 2, "tick": None, "digest": 1},
+        good,
+    ])
+    assert peer.poll() == 1
+    for _ in range(peer.delay + 1):
+        assert peer.advance(NONE)
+    assert peer.desync is None
+
+
+def test_late_peer_input_is_dropped():
+    peer = Lockstep(Pipe([]), 1, SEED)
+    peer.link.inbox.append({"type": "step", "player": 2, "tick": 0, "movement": UP})
+    assert peer.advance(NONE)
+    peer.link.inbox.append({"type": "step", "player": 2, "tick": 0, "movement": UP})
+    assert peer.poll() == 0
+    peer.link.inbox.append({"type": "step", "player": 2, "tick": TICK_WRAP, "movement": UP})
+    assert peer.poll() == 0
+
+
+def test_unanswered_digests_are_pruned():
+    peers = pair(drop=("checksum",))
+    for _ in range(500):
+        for peer in peers:
+            assert peer.advance(NONE)
+    for peer in peers:
+        assert peer.tick == 500
+        # pylint: disable=protected-access
+        assert len(peer._digests) <= 1 and not peer._theirs
+
+
+def play(peers, ticks: int, seed: int = 0):
+    """Advance both peers with random movements for ticks"""
+    rng = Random(seed)
+    for _ in range(ticks):
+        for peer in peers:
+            assert peer.advance(rng.choice((NONE, UP, DOWN)))
+
+
+def test_peers_stay_in_sync():
+    peers = pair()
+    play(peers, 600)
+    assert [peer.desync for peer in peers] == [None, None]
+    assert peers[0].engine.digest() == peers[1].engine.digest()
+    assert peers[0].engine.snapshot() == peers[1].engine.snapshot()
+
+
+def test_desync_is_detected():
+    peers = pair()
+    play(peers, 95)
+    peers[1].engine.state.ball.x += 1
+    play(peers, 20)
+    assert [peer.desync for peer in peers] == [100, 100]
@@ -0,0 +1,77 @@
+"""Client prediction and interpolation"""
+from random import Random
+
+from benchmarks.netcode import LaggyLink
+from packs.netcode import NetPlay, Prediction, SnapshotBuffer
+from packs.rooms import TICKRATE, Match
+from packs.sim import DOWN, NONE, UP, Court, Engine
+
+
+def test_right_prediction_needs_no_correction():
+    court = Court()
+    prediction = Prediction(court)
+    server = Prediction(court)
+    moves = [DOWN] * 10 + [UP] * 3 + [NONE] * 2
+    for movement in moves:
+        prediction.apply(movement)
+    for movement in moves[:8]:
+        server.apply(movement)
+    assert prediction.reconcile(server.y, 8) == 0
+    assert prediction.y == (len(moves) - 2 * 3 - 2) * court.paddle_speed
+    assert [seq for seq, _ in prediction.history] == list(range(9, len(moves) + 1))
+
+
+def test_wrong_prediction_is_corrected():
+    court = Court()
+    prediction = Prediction(court)
+    for _ in range(5):
+        prediction.apply(DOWN)
+    # The server dropped the second input: one step short
+    assert prediction.reconcile(2 * court.paddle_speed, 3) == -court.paddle_speed
+    assert prediction.y == 4 * court.paddle_speed
+    assert prediction.reconcile(4 * court.paddle_speed, 5) == 0
+
+
+def test_snapshots_interpolate():
+    snapshots = SnapshotBuffer(10, delay=0)
+    state = {"tick": 0, "ball_x": 0, "ball_y": 0, "player1": 0, "player2": 0,
+             "score1": 0, "score2": 0}
+    snapshots.push(state, 0.)
+    snapshots.push({**state, "tick": 1, "ball_x": 10, "player1": 20}, .1)
+    snapshots.push({**state, "tick": 2, "ball_x": 600, "score1": 1}, .2)
+    assert snapshots.sample(.05)["ball_x"] == 5 and snapshots.sample(.05)["player1"] == 10
+    # Served in between, held at the older state
+    assert snapshots.sample(.15)["ball_x"] == 10
+    assert snapshots.sample(1.)["tick"] == 2
+
+
+def test_prediction_reconciles_with_the_server():
+    now = [0.]
+    clock = lambda: now[0]  # pylint: disable=unnecessary-lambda-assignment
+    match = Match("test", TICKRATE, engine=Engine.at(TICKRATE))
+    link = LaggyLink(match, .1, clock)
+    match.on_tick = link.publish
+    play = NetPlay(link, 1, match.engine.court, TICKRATE, clock=clock)
+    rng = Random(0)
+    movement = NONE
+    corrections = 0
+    for tick in range(TICKRATE * 5):
+        if tick % 10 == 0:
+            movement = rng.choice((NONE, UP, DOWN))
+        play.tick(movement)
+        for _ in range(10):
+            now[0] += 1 / TICKRATE / 10
+            link.deliver()
+            play.poll()
+            corrections += play.prediction.error != 0
+        match.step()
+    # Inputs and states still in flight
+    for _ in range(TICKRATE):
+        now[0] += 1 / TICKRATE
+        link.deliver()
+        match.step()
+        play.poll()
+    assert corrections == 0
+    assert match.acks[1] == play.prediction.seq
+    assert play.prediction.y == match.engine.state.paddles[0].y
+    assert play.prediction.y == play.view()["player1"]
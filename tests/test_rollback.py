@@ -0,0 +1,81 @@
+"""Rollback peers over an in-memory relay"""
+from random import Random
+
+from packs.lockstep import Lockstep
+from packs.rollback import Rollback
+from packs.sim import DOWN, NONE, UP
+
+from .test_lockstep import SEED, Pipe
+
+
+def test_bad_peer_input_is_ignored():
+    peer = Rollback(Pipe([]), 1, SEED)
+    good = {"type": "step", "player": 2, "tick": peer.delay, "movement": UP}
+    peer.link.inbox.extend([
+        "not a dict",
+        {**good, "movement": 5},
+        {**good, "movement": 300},
+        {**good, "movement": "up"},
+        {**good, "tick": None},
+    ])
+    assert peer.poll() == 0
+    assert peer.confirmed == peer.delay - 1
+    peer.link.inbox.append(good)
+    peer.poll()
+    assert peer.confirmed == peer.delay
+    assert peer.advance(NONE)
+
+
+class Lag(Pipe):
+    """Pipe delivering a message only after the peers polled `polls` more times"""
+
+    def __init__(self, peers: list, polls: int) -> None:
+        super().__init__(peers)
+        self.polls = polls
+        self._polled = 0
+        self._queue: list = []
+
+    def push(self, data, headers=None):
+        """Hand data to every peer, late"""
+        for pipe in self.peers:
+            pipe.queue(self._polled + pipe.polls, data)
+
+    def queue(self, due: int, data):
+        """Take data due after due polls"""
+        self._queue.append((due, data))
+
+    def messages(self):
+        """Bodies due by now"""
+        self._polled += 1
+        bodies = [data for due, data in self._queue if due <= self._polled]
+        self._queue = [(due, data) for due, data in self._queue if due > self._polled]
+        return bodies
+
+
+def test_rollback_ends_like_lockstep():
+    rng = Random(3)
+    ticks = 400
+    moves = [[rng.choice((NONE, UP, DOWN)) for _ in range(ticks - 20)] + [NONE] * 20
+             for _ in range(2)]
+    lagging: list = []
+    lagging.extend((Lag(lagging, 5), Lag(lagging, 5)))
+    rollbacks = [Rollback(pipe, player, SEED) for player, pipe in zip((1, 2), lagging)]
+    done = [0, 0]
+    while done != [ticks, ticks]:
+        for index, peer in enumerate(rollbacks):
+            if done[index] < ticks and peer.advance(moves[index][done[index]]):
+                done[index] += 1
+    # Take every input still in flight
+    for _ in range(5):
+        for peer in rollbacks:
+            peer.poll()
+    pipes: list = []
+    pipes.extend((Pipe(pipes), Pipe(pipes)))
+    lockstep = [Lockstep(pipe, player, SEED, delay=1) for player, pipe in zip((1, 2), pipes)]
+    for tick in range(ticks):
+        for index, peer in enumerate(lockstep):
+            assert peer.advance(moves[index][tick])
+    assert sum(peer.rollbacks for peer in rollbacks)
+    assert {peer.engine.digest() for peer in rollbacks + lockstep} \
+        == {lockstep[0].engine.digest()}
+    assert rollbacks[0].engine.snapshot() == lockstep[0].engine.snapshot()
@@ -0,0 +1,102 @@
+"""Room manager and server input routing"""
+from packs.connection import IOMessage, Message, make_message
+from packs.rooms import RoomManager
+from packs.server import Server
+from packs.sim import Engine
+from packs.sim.bot import NORMAL
+
+
+class Clock:
+    """Clock moved by hand"""
+
+    def __init__(self) -> None:
+        self.now = 0.
+
+    def __call__(self):
+        return self.now
+
+
+def test_bad_input_is_not_routed():
+    clock = Clock()
+    rooms = RoomManager(clock=clock, engine=Engine.at)
+    server = Server(("", 0), rooms=rooms)
+    match = rooms.open("a")
+    for body in ({"type": "paddle", "player": 1, "movement": 5},
+                 {"type": "input", "player": 1, "movement": -7, "seq": 1},
+                 {"type": "paddle", "player": 3, "movement": 1},
+                 {"type": "paddle", "player": 1, "movement": 1.0}):
+        server._route_input("a", body)  # pylint: disable=protected-access
+    assert not match.inputs and not match.pending
+    server._route_input("a", {"type": "paddle", "player": 2, "movement": -1})  # pylint: disable=protected-access
+    assert match.inputs == {2: -1}
+
+
+def test_failing_match_does_not_stop_others():
+    clock = Clock()
+    rooms = RoomManager(clock=clock, engine=Engine.at)
+    broken, healthy = rooms.open("broken"), rooms.open("healthy")
+    broken.inputs[1] = 5
+    clock.now = 1
+    rooms.advance()
+    assert "broken" not in rooms and broken.closed
+    assert healthy.tick > 0
+    ticked = healthy.tick
+    clock.now = 2
+    rooms.advance()
+    assert healthy.tick > ticked
+
+
+def test_bot_only_match_does_not_idle():
+    clock = Clock()
+    rooms = RoomManager(idle_after=1, clock=clock, engine=Engine.at)
+    bots, half = rooms.open("bots"), rooms.open("half")
+    for player in (1, 2):
+        bots.add_bot(player)
+    half.add_bot(2)
+    for step in range(1, 31):
+        clock.now = step / 10
+        rooms.advance()
+    assert not bots.asleep and half.asleep
+
+
+def test_room_broadcast_visits_only_its_members():
+    rooms = RoomManager(clock=Clock(), engine=Engine.at)
+    server = Server(("", 0), rooms=rooms)
+    sent = []
+
+    def record(conn, data, force=False, key=None):  # pylint: disable=unused-argument
+        sent.append(conn)
+        return True
+    server._do_send = record  # type: ignore # pylint: disable=protected-access
+    conns = {room: [object() for _ in range(3)] for room in ("a", "b", None)}
+    for room, members in conns.items():
+        for conn in members:
+            holder = IOMessage(("127.0.0.1", 0))
+            server._add_client(conn, holder)  # pylint: disable=protected-access
+            server._join(conn, holder, room)  # pylint: disable=protected-access
+    sent.clear()
+    assert server.broadcast(Message(make_message("hi", {})), "a") == 3
+    assert sent == conns["a"]
+    for conn in conns["a"]:
+        server._remove_client(conn)  # pylint: disable=protected-access
+    assert rooms.get("a") is None and rooms.get("b") is not None
+    assert server.broadcast(Message(make_message("hi", {})), "a") == 0
+
+
+def test_late_match_skips_ticks():
+    clock = Clock()
+    rooms = RoomManager(clock=clock)
+    match = rooms.open("late", 10)
+    clock.now = 1.05
+    assert rooms.advance() == 1
+    # Due at 0.2 to 1.0, dropped, the next tick is one interval from now
+    assert rooms.skipped == 9 and abs(match.deadline - 1.15) < 1e-9
+    clock.now = 1.2
+    assert rooms.advance() == 1 and rooms.skipped == 9
+
+
+def test_bot_reaction_scales_with_tick_rate():
+    rooms = RoomManager(engine=Engine.at)
+    assert rooms.open("30").add_bot(1).reaction == NORMAL[0] // 2
+    assert rooms.open("60", 60).add_bot(1).reaction == NORMAL[0]
+    assert rooms.open("own").add_bot(1, reaction=3).reaction == 3
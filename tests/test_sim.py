@@ -0,0 +1,53 @@
+"""Simulation engine collisions"""
+from random import Random
+
+import pytest
+
+from benchmarks.broadphase import build
+from benchmarks.swept import SPEEDS, tunnels
+from packs.sim import HIT, SpatialGrid
+
+
+@pytest.mark.parametrize("speed", SPEEDS)
+def test_fast_ball_never_tunnels(speed):
+    assert tunnels(speed, True) == (0, speed)
+
+
+def test_overlap_test_tunnels():
+    through, _ = tunnels(max(SPEEDS), False)
+    assert through
+
+
+
+@pytest.mark.parametrize("seed", (0, 1, 2))
+def test_grid_matches_all_pairs(seed):
+    pairs, grid = build(100, False, seed), build(100, True, seed)
+    hits = 0
+    for _ in range(200):
+        events = pairs.step()
+        assert events == grid.step()
+        hits += sum(event.kind == HIT for event in events)
+        assert [bytes(column) for column in pairs.state.store.columns] \
+            == [bytes(column) for column in grid.state.store.columns]
+    assert hits
+
+
+def test_grid_query_finds_every_overlapping_box():
+    rng = Random(0)
+    grid = SpatialGrid(32)
+    boxes = {}
+    for index in range(300):
+        left, top = rng.uniform(0, 1000), rng.uniform(0, 1000)
+        boxes[index] = box = (left, top, left + rng.uniform(0, 80), top + rng.uniform(0, 80))
+        grid.insert(index, *box)
+    for index in range(0, 300, 3):
+        grid.remove(index)
+        del boxes[index]
+    for _ in range(200):
+        left, top = rng.uniform(0, 1000), rng.uniform(0, 1000)
+        area = (left, top, left + rng.uniform(0, 100), top + rng.uniform(0, 100))
+        found = grid.query(*area)
+        assert found <= boxes.keys()
+        assert {index for index, box in boxes.items()
+                if box[0] <= area[2] and area[0] <= box[2]
+                and box[1] <= area[3] and area[1] <= box[3]} <= found
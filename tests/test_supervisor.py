@@ -0,0 +1,90 @@
+"""Worker processes: handoff, adoption and load reports"""
+from json import dumps
+from queue import Queue
+from selectors import SelectorKey
+from socket import AF_UNIX, SOCK_DGRAM, send_fds, socketpair
+from threading import Event
+
+from packs.client import Client
+from packs.connection import EVENT_READ, frame
+from packs.supervisor import Supervisor, Worker, room_owner, unpack_handoff
+
+from .conftest import wait_for
+
+META = {"address": ["127.0.0.1", 1], "codec": "binary", "room": "a", "relay": False}
+
+
+def test_unpack_handoff():
+    packet = frame(dumps(META).encode('utf-8')) + frame(b"in") + frame(b"out")
+    assert unpack_handoff(packet) == (META, b"in", b"out")
+    assert unpack_handoff(packet[:-2]) is None
+    assert unpack_handoff(frame(b"not json") + frame(b"") + frame(b"")) is None
+    assert unpack_handoff(frame(b"{}") + frame(b"") + frame(b"")) is None
+
+
+def test_malformed_handoff_is_dropped():
+    channels = [socketpair(AF_UNIX, SOCK_DGRAM)]
+    worker = Worker(("127.0.0.1", 0), 0, channels, Queue(), Event())  # type: ignore
+    inbox, outbox = channels[0]
+    inbox.setblocking(False)
+    handed, peer = socketpair()
+    try:
+        send_fds(outbox, [frame(b"short")], [handed.fileno()])
+        handed.close()
+        worker._adopt(SelectorKey(inbox, inbox.fileno(), EVENT_READ, None), EVENT_READ)  # pylint: disable=protected-access
+        assert not worker._clients  # pylint: disable=protected-access
+        # Every copy of the handed socket is closed, the peer sees the end
+        peer.settimeout(1)
+        assert peer.recv(1) == b""
+    finally:
+        peer.close()
+        for pair in channels:
+            for sock in pair:
+                sock.close()
+
+
+def _join(address, room: str):
+    """Client in room, once a worker listens"""
+    joined: list[Client] = []
+
+    def connect():
+        try:
+            joined.append(Client(address, ("binary",), room=room, relay=True))
+        except ConnectionRefusedError:
+            return False
+        return True
+    assert wait_for(connect)
+    joined[0].start()
+    return joined[0]
+
+
+def test_clients_are_handed_off_to_room_owners(address):
+    rooms = ["room0"]
+    while room_owner(rooms[-1], 2) == room_owner(rooms[0], 2):
+        rooms.append(f"room{len(rooms)}")
+    rooms = [rooms[0], rooms[-1]]
+    supervisor = Supervisor(address, 2)
+    supervisor.start()
+    clients: dict[str, list[Client]] = {room: [] for room in rooms}
+    try:
+        for room in rooms:
+            for _ in range(3):
+                clients[room].append(_join(address, room))
+        for room in rooms:
+            clients[room][0].push({"room": room})
+        for room in rooms:
+            for client in clients[room][1:]:
+                received: list = []
+                assert wait_for(lambda c=client, r=received: r.extend(c.messages()) or r)
+                assert received == [{"room": room}]
+        # Each worker ends up with the clients of the room it owns
+        loads = wait_for(lambda: (report := supervisor.poll()) and len(report) == 2
+                         and all(load.clients == 3 for load in report.values()) and report,
+                         timeout=5)
+        assert loads
+        assert sorted(load.rooms for load in loads.values()) == [1, 1]
+    finally:
+        for room_clients in clients.values():
+            for client in room_clients:
+                client.stop()
+        supervisor.stop()
@@ -0,0 +1,45 @@
+"""Rendered text cache"""
+import pytest
+
+pytest.importorskip("pygame")
+from packs._gui.text import TextCache  # pylint: disable=wrong-import-position # noqa: E402
+
+WHITE = (255, 255, 255)
+
+
+class Font:
+    """Stands in for pygame.font.Font, counts renders"""
+
+    def __init__(self) -> None:
+        self.rendered: list[str] = []
+
+    def render(self, text, antialias, color):  # pylint: disable=unused-argument
+        """A new surface stand-in per call"""
+        self.rendered.append(text)
+        return object()
+
+
+def test_text_cache_keeps_lru_order_and_counts():
+    font, cache = Font(), TextCache(2)
+    first = cache.render(font, "a", WHITE)
+    cache.render(font, "b", WHITE)
+    assert cache.render(font, "a", WHITE) is first
+    # "b" is the least recently used, evicted
+    cache.render(font, "c", WHITE)
+    assert cache.render(font, "a", WHITE) is first
+    cache.render(font, "b", WHITE)
+    assert font.rendered == ["a", "b", "c", "b"]
+    assert (cache.hits, cache.misses, len(cache)) == (2, 4, 2)
+    assert cache.hit_rate == 2 / 6
+
+
+def test_text_cache_keys_on_color_and_antialias():
+    font, cache = Font(), TextCache()
+    cache.render(font, "a", WHITE)
+    cache.render(font, "a", [255, 255, 255])
+    cache.render(font, "a", (0, 0, 0))
+    cache.render(font, "a", WHITE, False)
+    cache.render(Font(), "a", WHITE)
+    assert (cache.hits, cache.misses) == (1, 4)
+    cache.clear()
+    assert not cache and cache.hits == 1